@@ -139,10 +139,13 @@ export interface Chapter extends _Base {
 
   is_done: boolean;
   is_available: boolean;
+  content_size?: number;
+  content_hash?: string;
   content_file: string;
 
   extra: {
     crawler_version?: number;
+    crawler_fingerprint?: string;
   };
 }
 
@@ -13,6 +13,7 @@ from .commands.search import app as search
 from .commands.server import app as server
 from .commands.sources import app as sources
 from .commands.version import app as version
+from .commands.worker import app as worker
 from .context import AppContext
 
 # My application context
@@ -39,6 +40,7 @@ app.add_typer(sources, name='sources')
 app.add_typer(crawl)
 app.add_typer(search)
 app.add_typer(server)
+app.add_typer(worker)
 
 
 # Define main command
@@ -5,7 +5,9 @@ import logging
 import ssl
 import sys
 import time
-from threading import Event
+from collections import Counter
+from functools import lru_cache
+from threading import Condition, Event, local
 from typing import Any
 from urllib.parse import urlparse
 
@@ -23,7 +25,7 @@ from .exceptions import (AbortedException, CloudflareIUAMError,
 from .proxy_manager import ProxyManager
 from .stealth import StealthMode
 from .turnstile import CloudflareTurnstile
-from .user_agent import User_Agent
+from .user_agent import User_Agent, load_catalogue
 
 # ------------------------------------------------------------------------------- #
 
@@ -50,6 +52,7 @@ class CipherSuiteAdapter(HTTPAdapter):
         self.source_address = kwargs.pop('source_address', None)
         self.server_hostname = kwargs.pop('server_hostname', None)
         self.ecdhCurve = kwargs.pop('ecdhCurve', 'prime256v1')
+        self.warm_hosts = set()
 
         if self.source_address:
             if isinstance(self.source_address, str):
@@ -102,6 +105,46 @@ class CipherSuiteAdapter(HTTPAdapter):
         kwargs['source_address'] = self.source_address
         return super(CipherSuiteAdapter, self).proxy_manager_for(*args, **kwargs)
 
+    # ------------------------------------------------------------------------------- #
+
+    def send(self, request, *args, **kwargs):
+        response = super(CipherSuiteAdapter, self).send(request, *args, **kwargs)
+        # Remember the hosts this adapter already holds a connection pool for
+        if not hasattr(self, 'warm_hosts'):
+            self.warm_hosts = set()
+        self.warm_hosts.add(urlparse(request.url).hostname)
+        return response
+
+# ------------------------------------------------------------------------------- #
+# TLS cipher rotation schedule, parsed and computed once per process
+# ------------------------------------------------------------------------------- #
+
+
+@lru_cache(maxsize=None)
+def cipher_rotation_schedule(browser, max_variants=0):
+    """
+    Returns the distinct cipher suite strings visited by the rotation for a browser,
+    in visiting order. A positive `max_variants` keeps only the first few of them.
+    """
+    available_ciphers = load_catalogue().cipher_suites.get(browser) or ()
+    if len(available_ciphers) <= 1:
+        return ()
+
+    # Use a subset of ciphers to create variation
+    num_ciphers = min(8, len(available_ciphers))  # Use up to 8 ciphers
+
+    schedule = []
+    for rotation in range(1, len(available_ciphers) + 1):
+        cipher_index = rotation % len(available_ciphers)
+        start_index = cipher_index % (len(available_ciphers) - num_ciphers + 1)
+        variant = ':'.join(available_ciphers[start_index:start_index + num_ciphers])
+        if variant not in schedule:
+            schedule.append(variant)
+
+    if max_variants > 0:
+        schedule = schedule[:max_variants]
+    return tuple(schedule)
+
 # ------------------------------------------------------------------------------- #
 
 
@@ -163,8 +206,14 @@ class CloudScraper(Session):
         self.min_request_interval = kwargs.pop('min_request_interval', 1.0)  # Minimum 1 second between requests
         self.max_concurrent_requests = kwargs.pop('max_concurrent_requests', 1)  # Limit concurrent requests
         self.current_concurrent_requests = 0
+        self._throttle = Condition()
+        self._throttle_depth = local()  # nested requests, e.g. solving challenges
         self.rotate_tls_ciphers = kwargs.pop('rotate_tls_ciphers', True)  # Enable TLS cipher rotation
+        self.reuse_tls_adapters = kwargs.pop('reuse_tls_adapters', True)  # Keep one warm adapter per cipher variant
+        self.max_cipher_variants = kwargs.pop('max_cipher_variants', 4)  # Number of warm adapters to rotate through
+        self.tls_handshakes_saved = Counter()  # Map of host -> handshakes avoided by adapter reuse
         self._cipher_rotation_count = 0
+        self._cipher_adapters = {}
 
         # Proxy management
         proxy_options = kwargs.pop('proxy_options', {})
@@ -204,16 +253,10 @@ class CloudScraper(Session):
             self.cipherSuite = ':'.join(self.cipherSuite)
 
         # Mount the HTTPS adapter with our custom cipher suite
-        self.mount(
-            'https://',
-            CipherSuiteAdapter(
-                cipherSuite=self.cipherSuite,
-                ecdhCurve=self.ecdhCurve,
-                server_hostname=self.server_hostname,
-                source_address=self.source_address,
-                ssl_context=self.ssl_context
-            )
-        )
+        adapter = self._create_cipher_adapter()
+        if self.reuse_tls_adapters:
+            self._cipher_adapters[self.cipherSuite] = adapter
+        self.mount('https://', adapter)
 
         # Initialize Cloudflare handlers
         self.cloudflare_v1 = Cloudflare(self)
@@ -231,6 +274,16 @@ class CloudScraper(Session):
     def __getstate__(self):
         return self.__dict__
 
+    # ------------------------------------------------------------------------------- #
+    # Close the warm adapters that are not mounted at the moment as well
+    # ------------------------------------------------------------------------------- #
+
+    def close(self):
+        for adapter in self._cipher_adapters.values():
+            adapter.close()
+        self._cipher_adapters.clear()
+        super(CloudScraper, self).close()
+
     # ------------------------------------------------------------------------------- #
     # Allow replacing actual web request call via subclassing
     # ------------------------------------------------------------------------------- #
@@ -282,13 +335,12 @@ class CloudScraper(Session):
     # ------------------------------------------------------------------------------- #
 
     def request(self, method, url, *args, **kwargs):
+        # Apply request throttling to prevent TLS blocking
+        self._apply_request_throttling()
         try:
-            # Apply request throttling to prevent TLS blocking
-            self._apply_request_throttling()
-
             # Rotate TLS cipher suites to avoid detection
             if self.rotate_tls_ciphers:
-                self._rotate_tls_cipher_suite()
+                self._rotate_tls_cipher_suite(url)
 
             # Check if session needs refresh due to age
             if self._should_refresh_session():
@@ -307,9 +359,6 @@ class CloudScraper(Session):
             # Track request count
             self.request_count += 1
 
-            # Track concurrent requests
-            self.current_concurrent_requests += 1
-
             # ------------------------------------------------------------------------------- #
             # Pre-Hook the request via user defined function.
             # ------------------------------------------------------------------------------- #
@@ -340,15 +389,6 @@ class CloudScraper(Session):
                 # Report failed proxy use if applicable
                 if kwargs.get('proxies') and hasattr(self, 'proxy_manager'):
                     self.proxy_manager.report_failure(kwargs['proxies'])
-
-                # CRITICAL FIX: Always decrement concurrent request counter on exception
-                if self.current_concurrent_requests > 0:
-                    self.current_concurrent_requests -= 1
-                raise e
-            except Exception as e:
-                # CRITICAL FIX: Always decrement concurrent request counter on any exception
-                if self.current_concurrent_requests > 0:
-                    self.current_concurrent_requests -= 1
                 raise e
 
             # ------------------------------------------------------------------------------- #
@@ -436,9 +476,7 @@ class CloudScraper(Session):
 
             return response
         finally:
-            # Decrement concurrent request counter
-            if self.current_concurrent_requests > 0:
-                self.current_concurrent_requests -= 1
+            self._release_request_throttling()
 
     # ------------------------------------------------------------------------------- #
     # Session health monitoring and refresh methods
@@ -532,85 +570,91 @@ class CloudScraper(Session):
 
     def _apply_request_throttling(self):
         """
-        Apply request throttling to prevent TLS blocking from concurrent requests
+        Apply request throttling to prevent TLS blocking from concurrent requests.
+        The waiting threads are woken up as soon as a request is finished, and the
+        time slots are reserved in order. A limit of 0 disables the throttling.
         """
-        current_time = time.time()
+        depth = getattr(self._throttle_depth, 'value', 0)
+        with self._throttle:
+            # Wait if too many concurrent requests, except for the nested ones
+            while depth == 0 and 0 < self.max_concurrent_requests <= self.current_concurrent_requests:
+                if self.debug:
+                    print(f'🚦 Concurrent request limit reached ({self.current_concurrent_requests}/{self.max_concurrent_requests}), waiting...')
+                self._throttle.wait(1)
+                if self.signal.is_set():
+                    raise AbortedException()
+            self.current_concurrent_requests += 1
+            self._throttle_depth.value = depth + 1
 
-        # Wait for minimum interval between requests
-        time_since_last_request = current_time - self.last_request_time
-        if time_since_last_request < self.min_request_interval:
-            sleep_time = self.min_request_interval - time_since_last_request
-            if self.debug:
-                print(f'⏱️ Request throttling: sleeping {sleep_time:.2f}s')
-            time.sleep(sleep_time)
-            if self.signal.is_set():
-                raise AbortedException()
+            # Reserve the next time slot after the minimum interval
+            current_time = time.time()
+            request_time = max(current_time, self.last_request_time + self.min_request_interval)
+            self.last_request_time = request_time
 
-        # Wait if too many concurrent requests
-        while self.current_concurrent_requests >= self.max_concurrent_requests:
+        sleep_time = request_time - current_time
+        if sleep_time > 0:
             if self.debug:
-                print(f'🚦 Concurrent request limit reached ({self.current_concurrent_requests}/{self.max_concurrent_requests}), waiting...')
-            time.sleep(0.1)
-            if self.signal.is_set():
+                print(f'⏱️ Request throttling: sleeping {sleep_time:.2f}s')
+            if self.signal.wait(sleep_time):
+                self._release_request_throttling()
                 raise AbortedException()
 
-        self.last_request_time = time.time()
+    def _release_request_throttling(self):
+        with self._throttle:
+            self._throttle_depth.value = getattr(self._throttle_depth, 'value', 1) - 1
+            if self.current_concurrent_requests > 0:
+                self.current_concurrent_requests -= 1
+            self._throttle.notify()
+
+    def _create_cipher_adapter(self):
+        return CipherSuiteAdapter(
+            cipherSuite=self.cipherSuite,
+            ecdhCurve=self.ecdhCurve,
+            server_hostname=self.server_hostname,
+            source_address=self.source_address,
+            ssl_context=self.ssl_context
+        )
 
-    def _rotate_tls_cipher_suite(self):
+    def _rotate_tls_cipher_suite(self, url=None):
         """
         Rotate TLS cipher suites to avoid detection patterns
+
+        When `reuse_tls_adapters` is enabled, every cipher variant keeps its own adapter
+        and they are mounted round-robin, so keep-alive connections survive the rotation.
         """
         if not hasattr(self, 'user_agent') or not hasattr(self.user_agent, 'cipherSuite'):
             return
 
         # Get available cipher suites for current browser
-        browser_name = getattr(self.user_agent, 'browser', 'chrome')
+        browser_name = getattr(self.user_agent, 'browser', None) or 'chrome'
+        max_variants = self.max_cipher_variants if self.reuse_tls_adapters else 0
+        schedule = cipher_rotation_schedule(browser_name, max_variants)
+        if len(schedule) <= 1:
+            return
 
-        try:
-            # Get cipher suites from browsers.json
-            import json
-            import os
-            browsers_file = os.path.join(os.path.dirname(__file__), 'user_agent', 'browsers.json')
-
-            with open(browsers_file, 'r') as f:
-                browsers_data = json.load(f)
-
-            available_ciphers = browsers_data.get('cipherSuite', {}).get(browser_name, [])
-
-            if available_ciphers and len(available_ciphers) > 1:
-                # Rotate through cipher suites
-                self._cipher_rotation_count += 1
-                cipher_index = self._cipher_rotation_count % len(available_ciphers)
-
-                # Use a subset of ciphers to create variation
-                num_ciphers = min(8, len(available_ciphers))  # Use up to 8 ciphers
-                start_index = cipher_index % (len(available_ciphers) - num_ciphers + 1)
-                selected_ciphers = available_ciphers[start_index:start_index + num_ciphers]
-
-                new_cipher_suite = ':'.join(selected_ciphers)
-
-                if new_cipher_suite != self.cipherSuite:
-                    self.cipherSuite = new_cipher_suite
-
-                    # Update the HTTPS adapter with new cipher suite
-                    self.mount(
-                        'https://',
-                        CipherSuiteAdapter(
-                            cipherSuite=self.cipherSuite,
-                            ecdhCurve=self.ecdhCurve,
-                            server_hostname=self.server_hostname,
-                            source_address=self.source_address,
-                            ssl_context=self.ssl_context
-                        )
-                    )
+        # Rotate through cipher suites
+        self._cipher_rotation_count += 1
+        new_cipher_suite = schedule[self._cipher_rotation_count % len(schedule)]
+        if new_cipher_suite == self.cipherSuite:
+            return
 
-                    if self.debug:
-                        print(f'🔐 Rotated TLS cipher suite (rotation #{self._cipher_rotation_count})')
-                        print(f'    Using {len(selected_ciphers)} ciphers starting from index {start_index}')
+        self.cipherSuite = new_cipher_suite
+        adapter = self._cipher_adapters.get(new_cipher_suite)
+        if adapter is None:
+            adapter = self._create_cipher_adapter()
+            if self.reuse_tls_adapters:
+                self._cipher_adapters[new_cipher_suite] = adapter
+        elif url:
+            host = urlparse(url).hostname
+            if host in getattr(adapter, 'warm_hosts', ()):
+                self.tls_handshakes_saved[host] += 1
 
-        except Exception as e:
-            if self.debug:
-                print(f'⚠️ TLS cipher rotation failed: {e}')
+        # Update the HTTPS adapter with new cipher suite
+        self.mount('https://', adapter)
+
+        if self.debug:
+            print(f'🔐 Rotated TLS cipher suite (rotation #{self._cipher_rotation_count})')
+            print(f'    Using variant {schedule.index(new_cipher_suite) + 1} of {len(schedule)}')
 
     # ------------------------------------------------------------------------------- #
 
@@ -635,8 +679,10 @@ class CloudScraper(Session):
         - auto_refresh_on_403: Whether to automatically refresh session on 403 errors (default: True)
         - max_403_retries: Maximum number of 403 retry attempts (default: 3)
         - min_request_interval: Minimum time in seconds between requests (default: 1.0)
-        - max_concurrent_requests: Maximum number of concurrent requests (default: 1)
+        - max_concurrent_requests: Maximum number of concurrent requests (default: 1, 0 for no limit)
         - rotate_tls_ciphers: Whether to rotate TLS cipher suites to avoid detection (default: True)
+        - reuse_tls_adapters: Whether to keep a warm adapter per cipher variant while rotating (default: True)
+        - max_cipher_variants: Number of cipher variants to rotate through when reusing adapters (default: 4)
         - disableCloudflareV3: Whether to disable Cloudflare v3 JavaScript VM challenge handling (default: False)
         - disableTurnstile: Whether to disable Cloudflare Turnstile challenge handling (default: False)
         """
@@ -6,6 +6,179 @@ import sys
 import ssl
 
 from collections import OrderedDict
+from functools import lru_cache
+from types import MappingProxyType
+
+# ------------------------------------------------------------------------------- #
+
+PLATFORMS = ('linux', 'windows', 'darwin', 'android', 'ios')
+BROWSERS = ('chrome', 'firefox')
+
+# Ultimate fallback - use comprehensive hardcoded user agents
+FALLBACK_USER_AGENTS = {
+    "headers": {
+        "chrome": {
+            "User-Agent": None,
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8",
+            "Accept-Language": "en-US,en;q=0.9",
+            "Accept-Encoding": "gzip, deflate, br"
+        },
+        "firefox": {
+            "User-Agent": None,
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            "Accept-Language": "en-US,en;q=0.5",
+            "Accept-Encoding": "gzip, deflate, br"
+        }
+    },
+    "cipherSuite": {
+        "chrome": [
+            "TLS_AES_128_GCM_SHA256",
+            "TLS_AES_256_GCM_SHA384",
+            "ECDHE-ECDSA-AES128-GCM-SHA256",
+            "ECDHE-RSA-AES128-GCM-SHA256",
+            "ECDHE-ECDSA-AES256-GCM-SHA384",
+            "ECDHE-RSA-AES256-GCM-SHA384"
+        ],
+        "firefox": [
+            "TLS_AES_128_GCM_SHA256",
+            "TLS_CHACHA20_POLY1305_SHA256",
+            "TLS_AES_256_GCM_SHA384",
+            "ECDHE-ECDSA-AES128-GCM-SHA256",
+            "ECDHE-RSA-AES128-GCM-SHA256",
+            "ECDHE-ECDSA-AES256-GCM-SHA384"
+        ]
+    },
+    "user_agents": {
+        "desktop": {
+            "windows": {
+                "chrome": [
+                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+                    "Mozilla/5.0 (Windows NT 10.0; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+                ],
+                "firefox": [
+                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:120.0) Gecko/20100101 Firefox/120.0",
+                    "Mozilla/5.0 (Windows NT 10.0; WOW64; rv:120.0) Gecko/20100101 Firefox/120.0"
+                ]
+            },
+            "linux": {
+                "chrome": [
+                    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+                    "Mozilla/5.0 (X11; Linux i686) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+                ],
+                "firefox": [
+                    "Mozilla/5.0 (X11; Linux x86_64; rv:120.0) Gecko/20100101 Firefox/120.0",
+                    "Mozilla/5.0 (X11; Linux i686; rv:120.0) Gecko/20100101 Firefox/120.0"
+                ]
+            },
+            "darwin": {
+                "chrome": [
+                    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+                ],
+                "firefox": [
+                    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:120.0) Gecko/20100101 Firefox/120.0"
+                ]
+            }
+        },
+        "mobile": {
+            "android": {
+                "chrome": [
+                    "Mozilla/5.0 (Linux; Android 10; SM-G973F) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36",
+                    "Mozilla/5.0 (Linux; Android 11; Pixel 5) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36"
+                ],
+                "firefox": [
+                    "Mozilla/5.0 (Mobile; rv:120.0) Gecko/120.0 Firefox/120.0"
+                ]
+            },
+            "ios": {
+                "chrome": [
+                    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) CriOS/120.0.0.0 Mobile/15E148 Safari/604.1"
+                ],
+                "firefox": [
+                    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) FxiOS/120.0.0.0 Mobile/15E148 Safari/605.1.15"
+                ]
+            }
+        }
+    }
+}
+
+# ------------------------------------------------------------------------------- #
+
+
+def _read_browsers_json():
+    try:
+        # Try to load from the normal location
+        browsers_json_path = os.path.join(os.path.dirname(__file__), 'browsers.json')
+        with open(browsers_json_path, 'r') as fp:
+            return json.load(fp)
+    except (FileNotFoundError, IOError):
+        # Fallback for executable environments
+        try:
+            # Try alternative paths for executables
+            if getattr(sys, 'frozen', False):
+                # Running in a PyInstaller bundle
+                bundle_dir = sys._MEIPASS  # type:ignore
+                browsers_json_path = os.path.join(bundle_dir, 'cloudscraper', 'user_agent', 'browsers.json')
+            else:
+                # Try current directory
+                browsers_json_path = os.path.join(os.getcwd(), 'browsers.json')
+
+            with open(browsers_json_path, 'r') as fp:
+                return json.load(fp)
+        except (FileNotFoundError, IOError):
+            return FALLBACK_USER_AGENTS
+
+# ------------------------------------------------------------------------------- #
+
+
+class UserAgentCatalogue():
+    """
+    Read-only view of `browsers.json` that is shared by every scraper of the process.
+
+    User agents are pre-filtered by (platform, desktop, mobile) into tuples, so picking
+    one is a dictionary lookup plus a random choice.
+    """
+
+    def __init__(self, user_agents):
+        self.headers = MappingProxyType({
+            browser: tuple(headers.items())
+            for browser, headers in user_agents['headers'].items()
+        })
+        self.cipher_suites = MappingProxyType({
+            browser: tuple(ciphers)
+            for browser, ciphers in user_agents['cipherSuite'].items()
+        })
+
+        # joined user agent strings of every browser to match a custom user agent
+        self.custom_index = tuple(
+            (browser, ' '.join(agents))
+            for device_type in user_agents['user_agents'].values()
+            for platform in device_type.values()
+            for browser, agents in platform.items()
+        )
+
+        agents = {}
+        device_types = user_agents['user_agents']
+        for platform in PLATFORMS:
+            for desktop, mobile in ((True, True), (True, False), (False, True)):
+                filtered = {}
+                if mobile and device_types.get('mobile', {}).get(platform):
+                    filtered.update(device_types['mobile'][platform])
+                if desktop and device_types.get('desktop', {}).get(platform):
+                    filtered.update(device_types['desktop'][platform])
+                agents[(platform, desktop, mobile)] = MappingProxyType({
+                    browser: tuple(items)
+                    for browser, items in filtered.items()
+                })
+        self.agents = MappingProxyType(agents)
+
+    def filter(self, platform, desktop=True, mobile=True):
+        return self.agents.get((platform, bool(desktop), bool(mobile)), MappingProxyType({}))
+
+
+@lru_cache(maxsize=None)
+def load_catalogue():
+    """Returns the process-wide user agent catalogue, loading it on first use"""
+    return UserAgentCatalogue(_read_browsers_json())
 
 # ------------------------------------------------------------------------------- #
 
@@ -21,30 +194,18 @@ class User_Agent():
 
     # ------------------------------------------------------------------------------- #
 
-    def filterAgents(self, user_agents):
-        filtered = {}
-
-        if self.mobile:
-            if self.platform in user_agents['mobile'] and user_agents['mobile'][self.platform]:
-                filtered.update(user_agents['mobile'][self.platform])
-
-        if self.desktop:
-            if self.platform in user_agents['desktop'] and user_agents['desktop'][self.platform]:
-                filtered.update(user_agents['desktop'][self.platform])
-
-        return filtered
+    def filterAgents(self, catalogue):
+        return catalogue.filter(self.platform, self.desktop, self.mobile)
 
     # ------------------------------------------------------------------------------- #
 
-    def tryMatchCustom(self, user_agents):
-        for device_type in user_agents['user_agents']:
-            for platform in user_agents['user_agents'][device_type]:
-                for browser in user_agents['user_agents'][device_type][platform]:
-                    if self.custom and re.search(re.escape(self.custom), ' '.join(user_agents['user_agents'][device_type][platform][browser])):
-                        self.headers = user_agents['headers'][browser]
-                        self.headers['User-Agent'] = self.custom
-                        self.cipherSuite = user_agents['cipherSuite'][browser]
-                        return True
+    def tryMatchCustom(self, catalogue):
+        for browser, agents in catalogue.custom_index:
+            if self.custom and re.search(re.escape(self.custom), agents):
+                self.headers = OrderedDict(catalogue.headers[browser])
+                self.headers['User-Agent'] = self.custom
+                self.cipherSuite = list(catalogue.cipher_suites[browser])
+                return True
         return False
 
     # ------------------------------------------------------------------------------- #
@@ -52,8 +213,8 @@ class User_Agent():
     def loadUserAgent(self, *args, **kwargs):
         self.browser = kwargs.pop('browser', None)
 
-        self.platforms = ['linux', 'windows', 'darwin', 'android', 'ios']
-        self.browsers = ['chrome', 'firefox']
+        self.platforms = list(PLATFORMS)
+        self.browsers = list(BROWSERS)
 
         if isinstance(self.browser, dict):
             self.custom = self.browser.get('custom', None)
@@ -71,121 +232,10 @@ class User_Agent():
             sys.tracebacklimit = 0
             raise RuntimeError("Sorry you can't have mobile and desktop disabled at the same time.")
 
-        try:
-            # Try to load from the normal location
-            browsers_json_path = os.path.join(os.path.dirname(__file__), 'browsers.json')
-            with open(browsers_json_path, 'r') as fp:
-                user_agents = json.load(
-                    fp,
-                    object_pairs_hook=OrderedDict
-                )
-        except (FileNotFoundError, IOError):
-            # Fallback for executable environments
-            try:
-                # Try alternative paths for executables
-                if getattr(sys, 'frozen', False):
-                    # Running in a PyInstaller bundle
-                    bundle_dir = sys._MEIPASS  # type:ignore
-                    browsers_json_path = os.path.join(bundle_dir, 'cloudscraper', 'user_agent', 'browsers.json')
-                else:
-                    # Try current directory
-                    browsers_json_path = os.path.join(os.getcwd(), 'browsers.json')
-
-                with open(browsers_json_path, 'r') as fp:
-                    user_agents = json.load(
-                        fp,
-                        object_pairs_hook=OrderedDict
-                    )
-            except (FileNotFoundError, IOError):
-                # Ultimate fallback - use comprehensive hardcoded user agents
-                user_agents = {
-                    "headers": {
-                        "chrome": {
-                            "User-Agent": None,
-                            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8",
-                            "Accept-Language": "en-US,en;q=0.9",
-                            "Accept-Encoding": "gzip, deflate, br"
-                        },
-                        "firefox": {
-                            "User-Agent": None,
-                            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                            "Accept-Language": "en-US,en;q=0.5",
-                            "Accept-Encoding": "gzip, deflate, br"
-                        }
-                    },
-                    "cipherSuite": {
-                        "chrome": [
-                            "TLS_AES_128_GCM_SHA256",
-                            "TLS_AES_256_GCM_SHA384",
-                            "ECDHE-ECDSA-AES128-GCM-SHA256",
-                            "ECDHE-RSA-AES128-GCM-SHA256",
-                            "ECDHE-ECDSA-AES256-GCM-SHA384",
-                            "ECDHE-RSA-AES256-GCM-SHA384"
-                        ],
-                        "firefox": [
-                            "TLS_AES_128_GCM_SHA256",
-                            "TLS_CHACHA20_POLY1305_SHA256",
-                            "TLS_AES_256_GCM_SHA384",
-                            "ECDHE-ECDSA-AES128-GCM-SHA256",
-                            "ECDHE-RSA-AES128-GCM-SHA256",
-                            "ECDHE-ECDSA-AES256-GCM-SHA384"
-                        ]
-                    },
-                    "user_agents": {
-                        "desktop": {
-                            "windows": {
-                                "chrome": [
-                                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                                    "Mozilla/5.0 (Windows NT 10.0; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-                                ],
-                                "firefox": [
-                                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:120.0) Gecko/20100101 Firefox/120.0",
-                                    "Mozilla/5.0 (Windows NT 10.0; WOW64; rv:120.0) Gecko/20100101 Firefox/120.0"
-                                ]
-                            },
-                            "linux": {
-                                "chrome": [
-                                    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                                    "Mozilla/5.0 (X11; Linux i686) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-                                ],
-                                "firefox": [
-                                    "Mozilla/5.0 (X11; Linux x86_64; rv:120.0) Gecko/20100101 Firefox/120.0",
-                                    "Mozilla/5.0 (X11; Linux i686; rv:120.0) Gecko/20100101 Firefox/120.0"
-                                ]
-                            },
-                            "darwin": {
-                                "chrome": [
-                                    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-                                ],
-                                "firefox": [
-                                    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:120.0) Gecko/20100101 Firefox/120.0"
-                                ]
-                            }
-                        },
-                        "mobile": {
-                            "android": {
-                                "chrome": [
-                                    "Mozilla/5.0 (Linux; Android 10; SM-G973F) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36",
-                                    "Mozilla/5.0 (Linux; Android 11; Pixel 5) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36"
-                                ],
-                                "firefox": [
-                                    "Mozilla/5.0 (Mobile; rv:120.0) Gecko/120.0 Firefox/120.0"
-                                ]
-                            },
-                            "ios": {
-                                "chrome": [
-                                    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) CriOS/120.0.0.0 Mobile/15E148 Safari/604.1"
-                                ],
-                                "firefox": [
-                                    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) FxiOS/120.0.0.0 Mobile/15E148 Safari/605.1.15"
-                                ]
-                            }
-                        }
-                    }
-                }
+        catalogue = load_catalogue()
 
         if self.custom:
-            if not self.tryMatchCustom(user_agents):
+            if not self.tryMatchCustom(catalogue):
                 self.cipherSuite = [
                     ssl._DEFAULT_CIPHERS,
                     '!AES128-SHA',
@@ -209,19 +259,20 @@ class User_Agent():
                 sys.tracebacklimit = 0
                 raise RuntimeError(f'Sorry the platform "{self.platform}" is not valid, valid platforms are [{", ".join(self.platforms)}]')
 
-            filteredAgents = self.filterAgents(user_agents['user_agents'])
+            filteredAgents = self.filterAgents(catalogue)
 
             if not self.browser:
                 # has to be at least one in there...
-                while not filteredAgents.get(self.browser):
-                    self.browser = random.SystemRandom().choice(list(filteredAgents.keys()))
+                self.browser = random.SystemRandom().choice([
+                    browser for browser, agents in filteredAgents.items() if agents
+                ])
 
-            if not filteredAgents[self.browser]:
+            if not filteredAgents.get(self.browser):
                 sys.tracebacklimit = 0
                 raise RuntimeError(f'Sorry "{self.browser}" browser was not found with a platform of "{self.platform}".')
 
-            self.cipherSuite = user_agents['cipherSuite'][self.browser]
-            self.headers = user_agents['headers'][self.browser]
+            self.cipherSuite = list(catalogue.cipher_suites[self.browser])
+            self.headers = OrderedDict(catalogue.headers[self.browser])
 
             self.headers['User-Agent'] = random.SystemRandom().choice(filteredAgents[self.browser])
 
@@ -18,7 +18,7 @@ console = Console()
 
 @app.callback()
 def config():
-    ctx.setup()
+    ctx.setup(lazy_sources=True)
 
 
 @app.command("view", help="View configuration sections.")
@@ -1,4 +1,6 @@
 import logging
+from concurrent.futures import Future
+from threading import Lock
 from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
 
 import questionary
@@ -6,8 +8,11 @@ import typer
 from rich import print
 from rich.console import Console
 from rich.panel import Panel
+from tqdm import tqdm
 
 from ..context import ctx
+from ..core.crawler import Crawler
+from ..core.taskman import TaskManager
 from ..dao import Artifact, Chapter, Novel, OutputFormat, Volume
 from ..exceptions import ServerError
 from ..utils.file_tools import format_size, open_folder
@@ -62,7 +67,7 @@ def crawl(
     ),
 ):
     # setup context
-    ctx.setup()
+    ctx.setup(lazy_sources=True)
 
     # ensure url
     if not url:
@@ -121,39 +126,8 @@ def crawl(
         else:
             formats = _prompt_format_selection()
 
-    # download chapters
-    chapter_futures = [
-        crawler.submit_task(
-            ctx.crawler.fetch_chapter,
-            user.id,
-            chapter_id,
-            crawler=crawler
-        ) for chapter_id in sorted(set(chapters))
-    ]
-    chapter_image_ids = []
-    for chapter in crawler.resolve_as_generator(
-        chapter_futures,
-        desc='Chapters',
-        unit=' c'
-    ):
-        if not chapter:
-            continue
-        chapter_image_ids += ctx.images.list_ids(chapter_id=chapter.id)
-
-    # download chapter images
-    image_futures = [
-        crawler.submit_task(
-            ctx.crawler.fetch_image,
-            user.id,
-            image_id,
-            crawler=crawler
-        ) for image_id in sorted(set(chapter_image_ids))
-    ]
-    crawler.resolve_futures(
-        image_futures,
-        desc='Images',
-        unit=' img'
-    )
+    # download chapters and images
+    _download(crawler, user.id, novel, chapters)
 
     # create artifacts
     artifacts: Dict[OutputFormat, Artifact] = {}
@@ -181,6 +155,69 @@ def crawl(
         open_folder(cover_file.parent / 'artifacts')
 
 
+def _download(crawler: Crawler, user_id: str, novel: Novel, chapter_ids: List[str]) -> None:
+    """Downloads the chapters, and the images of each chapter in a separate pool
+    as soon as the chapter is saved, keeping the network busy with both."""
+    lock = Lock()
+    volumes = {volume.id: volume for volume in ctx.volumes.list(novel.id)}
+    selected = set(chapter_ids)
+    volume_of: Dict[str, str] = {}
+    remaining: Dict[Optional[str], int] = {}  # chapters and images left in each volume
+    for volume_id in volumes:
+        for chapter_id in selected.intersection(ctx.chapters.list_ids(volume_id=volume_id)):
+            volume_of[chapter_id] = volume_id
+            remaining[volume_id] = remaining.get(volume_id, 0) + 1
+    remaining[None] = len(selected) - len(volume_of)
+    seen_images: Set[str] = set()
+    image_futures: List[Future] = []  # the task manager forgets them when done
+
+    def finish(volume_id: Optional[str]) -> None:
+        with lock:
+            remaining[volume_id] -= 1
+            is_ready = remaining[volume_id] == 0
+        if is_ready and volume_id in volumes:
+            # TODO: the binders make one artifact for the whole novel for now
+            tqdm.write(f'Volume {volumes[volume_id].serial} is ready')
+
+    def fetch_image(image_id: str) -> None:
+        ctx.crawler.fetch_image(user_id, image_id, crawler=crawler)
+
+    def fetch_chapter(chapter_id: str) -> Chapter:
+        volume_id = volume_of.get(chapter_id)
+        try:
+            chapter = ctx.crawler.fetch_chapter(user_id, chapter_id, crawler=crawler)
+            for image_id in ctx.images.list_ids(chapter_id=chapter.id):
+                with lock:
+                    if image_id in seen_images:
+                        continue
+                    seen_images.add(image_id)
+                    remaining[volume_id] += 1
+                future = images.submit_task(fetch_image, image_id)
+                future.add_done_callback(lambda _: finish(volume_id))
+                with lock:
+                    image_futures.append(future)
+            return chapter
+        finally:
+            finish(volume_id)
+
+    images = TaskManager(crawler.workers, signal=crawler.signal)
+    try:
+        for _ in crawler.map_bounded(
+            fetch_chapter,
+            sorted(selected),
+            desc='Chapters',
+            unit=' c',
+        ):
+            pass
+        images.resolve_futures(
+            image_futures,
+            desc='Images',
+            unit=' img',
+        )
+    finally:
+        images.close()
+
+
 def _prompt_url() -> str:
     print('[i]The URL must start with [cyan]http[/cyan] or [cyan]https[/cyan].[/i]')
     return questionary.text(
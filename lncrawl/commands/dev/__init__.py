@@ -1,6 +1,8 @@
 import typer
 
 from .migrate import app as migrate
+from .packs import app as packs
+from .reconcile import reconcile
 
 app = typer.Typer(
     help='Run development commands.',
@@ -8,6 +10,8 @@ app = typer.Typer(
 )
 
 app.add_typer(migrate, name='migrate')
+app.add_typer(packs, name='packs')
+app.command('reconcile', help='Correct the file availability of the novels in the DB.')(reconcile)
 
 
 @app.callback()
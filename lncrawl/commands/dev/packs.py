@@ -0,0 +1,52 @@
+import typer
+from rich import print
+from tqdm import tqdm
+
+from ...context import ctx
+from ...utils.file_tools import format_size
+
+app = typer.Typer(
+    help="Chapter content pack files.",
+    no_args_is_help=True,
+)
+
+
+def _novel_ids(novel_id: str):
+    if novel_id:
+        return [novel_id]
+    novels_dir = ctx.files.resolve('novels')
+    if not novels_dir.is_dir():
+        return []
+    return sorted(x.name for x in novels_dir.iterdir() if x.is_dir())
+
+
+@app.command("migrate", help="Move the chapter content files into the pack files.")
+def app_migrate(
+    novel_id: str = typer.Option(
+        "",
+        "-n",
+        "--novel",
+        help="Novel ID. Default: all novels",
+    ),
+):
+    ctx.setup(lazy_sources=True)
+    moved = 0
+    for id in tqdm(_novel_ids(novel_id), unit=" novel"):
+        moved += ctx.files.migrate(id)
+    print(f"Moved [green]{moved}[/green] chapter files")
+
+
+@app.command("compact", help="Reclaim the space of the replaced chapter contents.")
+def app_compact(
+    novel_id: str = typer.Option(
+        "",
+        "-n",
+        "--novel",
+        help="Novel ID. Default: all novels",
+    ),
+):
+    ctx.setup(lazy_sources=True)
+    reclaimed = 0
+    for id in tqdm(_novel_ids(novel_id), unit=" novel"):
+        reclaimed += ctx.files.compact(id)
+    print(f"Reclaimed [green]{format_size(reclaimed)}[/green]")
@@ -0,0 +1,36 @@
+import sqlmodel as sq
+import typer
+from rich import print
+from tqdm import tqdm
+
+from ...context import ctx
+from ...dao import Novel
+from ...services.scheduler.cleaner import Cleaner
+
+
+def reconcile(
+    novel_id: str = typer.Option(
+        "",
+        "-n",
+        "--novel",
+        help="Novel ID. Default: all novels",
+    ),
+    verify: bool = typer.Option(
+        False,
+        "-v",
+        "--verify",
+        is_flag=True,
+        help="Recompute the size and hash of all files",
+    ),
+):
+    ctx.setup(lazy_sources=True)
+    if novel_id:
+        novel_ids = [novel_id]
+    else:
+        with ctx.db.session() as sess:
+            novel_ids = list(sess.exec(sq.select(Novel.id)).all())
+    cleaner = Cleaner()
+    updated = 0
+    for id in tqdm(novel_ids, unit=" novel"):
+        updated += cleaner.reconcile(id, verify)
+    print(f"Corrected [green]{updated}[/green] rows")
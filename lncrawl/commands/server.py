@@ -1,3 +1,6 @@
+import os
+from typing import Optional
+
 import typer
 import uvicorn
 
@@ -24,7 +27,15 @@ def server(
         is_flag=True,
         help='Run server in watch mode',
     ),
+    runners: Optional[int] = typer.Option(
+        None,
+        '-r', '--runners',
+        min=0,
+        help='Number of job runners in the server. Use 0 to leave the jobs to `lncrawl worker`.',
+    ),
 ):
+    if runners is not None:
+        os.environ['LNCRAWL_RUNNERS'] = str(runners)
     if watch:
         uvicorn.run(
             "lncrawl.server.app:app",
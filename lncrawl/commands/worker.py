@@ -0,0 +1,31 @@
+import signal
+from threading import Event
+from typing import Optional
+
+import typer
+
+from ..context import ctx
+
+app = typer.Typer()
+
+
+@app.command(help='Run jobs from the shared database, without the web server.')
+def worker(
+    concurrency: Optional[int] = typer.Option(
+        None,
+        '-n', '--concurrency',
+        min=1,
+        help='Number of job runners (default: crawler.runner_concurrency)',
+    ),
+):
+    ctx.setup()
+
+    stopped = Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    ctx.scheduler.start(concurrency)
+    try:
+        while not stopped.wait(1):
+            pass
+    except KeyboardInterrupt:
+        pass
+    ctx.scheduler.stop()
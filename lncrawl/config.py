@@ -356,6 +356,63 @@ class CrawlerConfig(_Section):
     def user_index_file(self) -> Path:
         return self.user_sources / "_index.json"
 
+    @cached_property
+    def scan_cache_file(self) -> Path:
+        return self.user_sources / "_scan.json"
+
+    @cached_property
+    def host_limits_file(self) -> Path:
+        return APP_DIR / "host_limits.json"
+
+    @property
+    def host_max_concurrency(self) -> int:
+        """Maximum number of requests sent to the same website at a time.
+        The crawlers start slow and speed up while the website is healthy."""
+        return self._get("host_max_concurrency", 8)
+
+    @host_max_concurrency.setter
+    def host_max_concurrency(self, v: int) -> None:
+        self._set("host_max_concurrency", v)
+
+    @cached_property
+    def http_cache_dir(self) -> Path:
+        return APP_DIR / "http_cache"
+
+    @property
+    def http_cache_size(self) -> int:
+        """Maximum size of the cached responses in MB. Set 0 to disable the cache."""
+        return self._get("http_cache_size", 512)
+
+    @http_cache_size.setter
+    def http_cache_size(self, v: int) -> None:
+        self._set("http_cache_size", v)
+
+    @property
+    def http_cache_ttl(self) -> int:
+        """Seconds to use a cached response without asking the website.
+        The older responses are revalidated by their ETag or Last-Modified.
+        The crawlers can override it by `http_cache_ttl`."""
+        return self._get("http_cache_ttl", 0)
+
+    @http_cache_ttl.setter
+    def http_cache_ttl(self, v: int) -> None:
+        self._set("http_cache_ttl", v)
+
+    @property
+    def refetch_policy(self) -> str:
+        """When to download the chapters that are already available again:
+        - `never`: Keep them as they are.
+        - `parser`: When the source file of the crawler has changed.
+        - `always`: Every time they are requested.
+
+        The chapters with the same content as before are not saved again."""
+        policy = self._get("refetch_policy", "parser")
+        return policy if policy in ("never", "parser", "always") else "parser"
+
+    @refetch_policy.setter
+    def refetch_policy(self, v: str) -> None:
+        self._set("refetch_policy", v)
+
     @property
     def can_use_browser(self) -> bool:
         return self._get("can_use_browser", True)
@@ -394,13 +451,61 @@ class CrawlerConfig(_Section):
         self._set("runner_concurrency", v)
 
     @property
-    def runner_cooldown(self) -> int:
-        """Crawler job cooldown in seconds"""
-        return self._get("runner_cooldown", 1)
+    def runner_poll_interval(self) -> int:
+        """Idle runner poll interval in seconds. Runners are woken up earlier
+        whenever a job is created or finished."""
+        return self._get("runner_poll_interval", 30)
+
+    @runner_poll_interval.setter
+    def runner_poll_interval(self, v: int) -> None:
+        self._set("runner_poll_interval", v)
+
+    @property
+    def runner_lease_time(self) -> int:
+        """Time in seconds until the jobs claimed by a stopped runner can be
+        claimed by another. The leases are renewed while the runner is alive."""
+        return self._get("runner_lease_time", 60)
+
+    @runner_lease_time.setter
+    def runner_lease_time(self, v: int) -> None:
+        self._set("runner_lease_time", v)
+
+    @property
+    def runner_domain_concurrency(self) -> int:
+        """Maximum number of jobs downloading from the same website at a time,
+        across all of the runners. Set 0 for no limit."""
+        return self._get("runner_domain_concurrency", 3)
+
+    @runner_domain_concurrency.setter
+    def runner_domain_concurrency(self, v: int) -> None:
+        self._set("runner_domain_concurrency", v)
+
+    @property
+    def job_progress_interval(self) -> int:
+        """Interval in seconds to save the progress of the jobs into their parents"""
+        return self._get("job_progress_interval", 1)
+
+    @job_progress_interval.setter
+    def job_progress_interval(self, v: int) -> None:
+        self._set("job_progress_interval", v)
+
+    @property
+    def crawler_pool_size(self) -> int:
+        """Maximum number of idle crawlers kept for reuse by the scheduler"""
+        return self._get("crawler_pool_size", 10)
+
+    @crawler_pool_size.setter
+    def crawler_pool_size(self, v: int) -> None:
+        self._set("crawler_pool_size", v)
+
+    @property
+    def crawler_pool_ttl(self) -> int:
+        """Idle crawler expiry time in seconds"""
+        return self._get("crawler_pool_ttl", 10 * 60)
 
-    @runner_cooldown.setter
-    def runner_cooldown(self, v: int) -> None:
-        self._set("runner_cooldown", v)
+    @crawler_pool_ttl.setter
+    def crawler_pool_ttl(self, v: int) -> None:
+        self._set("crawler_pool_ttl", v)
 
     @property
     def cleaner_cooldown(self) -> int:
@@ -39,6 +39,11 @@ class AppContext:
         from .services.file import FileService
         return FileService()
 
+    @cached_property
+    def dictionaries(self):
+        from .services.dictionaries import DictionaryService
+        return DictionaryService()
+
     @cached_property
     def sources(self):
         from .services.sources import Sources
@@ -140,12 +145,16 @@ class AppContext:
         self.mail.close()
         self.sources.close()
         self.scheduler.stop()
+        self.jobs.close()
+        self.crawler.close()
+        self.files.close()
 
     def setup(
         self,
         log_level: Union[int, str, None] = None,
         config_file: Optional[Path] = None,
         sync_remote_index=True,
+        lazy_sources=False,
     ):
         if self.__ready:
             return
@@ -155,7 +164,7 @@ class AppContext:
         self.db.bootstrap()
         self.users.setup_admin()
         self.secrets.setup_secret()
-        self.sources.load(sync_remote_index)
+        self.sources.load(sync_remote_index, lazy=lazy_sources)
 
 
 ctx: AppContext = AppContext()
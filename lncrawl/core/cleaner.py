@@ -1,29 +1,187 @@
-import itertools
 import re
 import sys
 import unicodedata
-from typing import Any, Dict, List, Set, Union
+from collections import OrderedDict
+from functools import cached_property
+from threading import Lock, local
+from typing import (Any, Dict, FrozenSet, List, Mapping, Optional, Pattern,
+                    Set, Tuple, Union)
 
 from bs4 import Comment, Tag
 
+from . import cleaner_lxml
+
+RulePattern = Union[str, Pattern[str], List[Any], Tuple[Any, ...]]
+
+# "bs4" cleans the BeautifulSoup tree in place. "lxml" is the single-pass engine
+# from `cleaner_lxml`, producing the same output. Crawlers can opt in by setting
+# `cleaner_engine`; it becomes the default once it passes a golden-output corpus.
+CLEANER_ENGINES = ("bs4", "lxml")
+DEFAULT_CLEANER_ENGINE = "bs4"
+
+# the rule sets of a cleaner compiled into its profile
+_RULES = ("bad_css", "bad_tags", "bad_text_regex", "bad_tag_text_pairs", "substitutions")
+_MAX_PROFILES = 256
+
+_lock = Lock()
+_nonprintable_mapping: Optional[Dict[int, None]] = None
+_profiles: "OrderedDict[Tuple, CleanerProfile]" = OrderedDict()
+
+
+def nonprintable_mapping() -> Dict[int, None]:
+    """The translate table to strip unprintable characters. Built once per process."""
+    global _nonprintable_mapping
+    if _nonprintable_mapping is None:
+        with _lock:
+            if _nonprintable_mapping is None:
+                mapping: Dict[int, None] = {code: None for code in range(0x00, 0x20)}
+                mapping.update({code: None for code in range(0x7F, 0xA0)})
+                for code in range(sys.maxunicode):
+                    if unicodedata.category(chr(code)) in {"Cf", "Cc"}:
+                        mapping[code] = None
+                _nonprintable_mapping = mapping
+    return _nonprintable_mapping
+
+
+def _join_patterns(patterns) -> str:
+    return "|".join([f"({x})" for x in patterns if x])
+
+
+class CleanerProfile:
+    """An immutable set of cleaning rules along with the compiled values derived from them.
+
+    Profiles are shared by every cleaner having the same rules. Use `CleanerProfile.of()`
+    to get the shared profile for a set of rules.
+    """
+
+    def __init__(
+        self,
+        bad_css: FrozenSet[str],
+        bad_tags: FrozenSet[str],
+        bad_text_regex: FrozenSet[Union[str, Pattern[str]]],
+        bad_tag_text_pairs: Tuple[Tuple[str, RulePattern], ...],
+        substitutions: Tuple[Tuple[str, str], ...],
+    ) -> None:
+        self.bad_css = bad_css
+        self.bad_tags = bad_tags
+        self.bad_text_regex = bad_text_regex
+        self.bad_tag_text_pairs = bad_tag_text_pairs
+        self.substitutions = substitutions
+
+    @staticmethod
+    def of(
+        bad_css: Set[str],
+        bad_tags: Set[str],
+        bad_text_regex: Set[Union[str, Pattern[str]]],
+        bad_tag_text_pairs: Mapping[str, RulePattern],
+        substitutions: Mapping[str, str],
+    ) -> "CleanerProfile":
+        key = (
+            frozenset(bad_css),
+            frozenset(bad_tags),
+            frozenset(bad_text_regex),
+            tuple(
+                (tag, tuple(pattern) if isinstance(pattern, list) else pattern)
+                for tag, pattern in bad_tag_text_pairs.items()
+            ),
+            tuple(substitutions.items()),
+        )
+        with _lock:
+            profile = _profiles.get(key)
+            if profile is None:
+                profile = _profiles[key] = CleanerProfile(*key)
+                if len(_profiles) > _MAX_PROFILES:
+                    _profiles.popitem(last=False)
+            else:
+                _profiles.move_to_end(key)
+        return profile
+
+    @cached_property
+    def bad_css_selector(self) -> str:
+        return ",".join(self.bad_css)
+
+    @cached_property
+    def bad_tag_text_selector(self) -> str:
+        return ",".join([tag for tag, _ in self.bad_tag_text_pairs])
+
+    @cached_property
+    def bad_tag_text_patterns(self) -> Dict[str, Optional[Pattern[str]]]:
+        compiled: Dict[str, Optional[Pattern[str]]] = {}
+        for tag, pattern in self.bad_tag_text_pairs:
+            if isinstance(pattern, tuple):
+                pattern = _join_patterns(pattern)
+            if not pattern:
+                compiled[tag] = None
+            elif isinstance(pattern, re.Pattern):
+                compiled[tag] = pattern
+            else:
+                compiled[tag] = re.compile(pattern, re.M)
+        return compiled
+
+    @cached_property
+    def bad_text_pattern(self) -> Optional[Pattern[str]]:
+        if not self.bad_text_regex:
+            return None
+        return re.compile("|".join(["(%s)" % p for p in self.bad_text_regex]))
+
+    @cached_property
+    def substitution_map(self) -> Dict[str, str]:
+        return dict(self.substitutions)
+
+    @cached_property
+    def substitution_pattern(self) -> Pattern[str]:
+        return re.compile(
+            "|".join([f"({x})" for x, _ in self.substitutions]),
+            flags=re.IGNORECASE,
+        )
+
+
+def _tracked(*names: str):
+    """Makes the methods of a rule container drop the profile of its cleaner"""
+    def decorate(cls):
+        base = cls.__bases__[0]
+        for name in names:
+            def changed(self, *args, _method=getattr(base, name), **kwargs):
+                result = _method(self, *args, **kwargs)
+                if self.cleaner:
+                    self.cleaner._profile = None
+                return result
+            setattr(cls, name, changed)
+        return cls
+    return decorate
+
+
+@_tracked(
+    "add", "clear", "discard", "pop", "remove", "update",
+    "difference_update", "intersection_update", "symmetric_difference_update",
+    "__ior__", "__iand__", "__isub__", "__ixor__",
+)
+class _RuleSet(set):
+    def __init__(self, items=(), cleaner: Optional["TextCleaner"] = None) -> None:
+        super().__init__(items)
+        self.cleaner = cleaner
+
+
+@_tracked(
+    "__setitem__", "__delitem__", "clear", "pop", "popitem", "setdefault", "update", "__ior__",
+)
+class _RuleDict(dict):
+    def __init__(self, items=(), cleaner: Optional["TextCleaner"] = None) -> None:
+        super().__init__(items)
+        self.cleaner = cleaner
+
 
 class TextCleaner:
-    def __init__(self) -> None:
+    def __init__(self, engine: Optional[str] = None) -> None:
+        self._profile: Optional[CleanerProfile] = None
+        engine = engine or DEFAULT_CLEANER_ENGINE
+        if engine not in CLEANER_ENGINES:
+            raise ValueError(f"Unknown cleaner engine: {engine}")
+        self.engine = engine
+        self._extracted = local()
+
         self.line_separator = "<br>"
-        self.invisible_chars = [
-            code
-            for code in range(sys.maxunicode)
-            if unicodedata.category(chr(code)) in {"Cf", "Cc"}
-        ]
-        self.unprintable_chars = itertools.chain(
-            range(0x00, 0x20),
-            range(0x7F, 0xA0),
-            self.invisible_chars,
-        )
-        self.nonprintable_mapping = {
-            character: None
-            for character in self.unprintable_chars
-        }
+        self.nonprintable_mapping = nonprintable_mapping()
 
         self.bad_text_regex: Set[Union[str, re.Pattern[str]]] = set(
             [
@@ -150,29 +308,72 @@ class TextCleaner:
             "src",
         }
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name in _RULES:
+            # the rule sets tell the cleaner when they are changed
+            if isinstance(value, Mapping):
+                value = _RuleDict(value, self)
+            else:
+                value = _RuleSet(value, self)
+            self._profile = None
+        super().__setattr__(name, value)
+
+    @property
+    def profile(self) -> CleanerProfile:
+        """The shared compiled profile for the current rules of this cleaner.
+        It is kept until the rule sets are changed. The patterns inside the
+        `bad_tag_text_pairs` must be replaced, not changed in place."""
+        profile = self._profile
+        if profile is None:
+            profile = self._profile = CleanerProfile.of(
+                bad_css=self.bad_css,
+                bad_tags=self.bad_tags,
+                bad_text_regex=self.bad_text_regex,
+                bad_tag_text_pairs=self.bad_tag_text_pairs,
+                substitutions=self.substitutions,
+            )
+        return profile
+
     def extract_contents(self, tag) -> str:
-        self.clean_contents(tag)
-        body = self.extract_paragraphs(tag)
+        profile = self.profile
+        self._extracted.result = None
+        if self.engine == "lxml":
+            result = cleaner_lxml.extract_contents(self, tag, profile)
+            if result is not None:
+                self._extracted.result = result
+                return result[0]
+
+        self.clean_contents(tag, profile)
+        body = self.extract_paragraphs(tag, profile)
         paragraphs = " ".join(body).split(self.line_separator)
         return "".join(
             [
                 f"<p>{p.strip()}</p>"
                 for p in paragraphs
-                if not self.contains_bad_texts(p)
+                if not self.contains_bad_texts(p, profile)
             ]
         )
 
-    def clean_contents(self, div):
+    def extracted_images(self, body: str) -> Optional[List[Tuple[str, str]]]:
+        """The (markup, src) of the images in the body, if the body is the last output
+        of `extract_contents` in this thread and it was produced by the lxml engine."""
+        result = getattr(self._extracted, "result", None)
+        if not result or result[0] != body:
+            return None
+        return result[1]
+
+    def clean_contents(self, div, profile: Optional[CleanerProfile] = None):
         if not isinstance(div, Tag):
             return div
 
-        if self.bad_css:
-            for bad in div.select(",".join(self.bad_css)):
+        profile = profile or self.profile
+        if profile.bad_css_selector:
+            for bad in div.select(profile.bad_css_selector):
                 bad.extract()
 
-        if self.bad_tag_text_pairs:
-            for tag in div.select(",".join(self.bad_tag_text_pairs.keys())):
-                if self.tag_contains_bad_text(tag):
+        if profile.bad_tag_text_selector:
+            for tag in div.select(profile.bad_tag_text_selector):
+                if self.tag_contains_bad_text(tag, profile):
                     tag.extract()
 
         for tag in div.find_all(True):
@@ -181,7 +382,7 @@ class TextCleaner:
                 continue
             if not isinstance(tag, Tag):
                 continue  # Skip elements that are not a Tag
-            if tag.name in self.bad_tags:
+            if tag.name in profile.bad_tags:
                 tag.extract()  # Remove bad tags
             elif tag.name in ["br", "hr"]:
                 self.extract_on_duplicate_sibling(tag)
@@ -193,16 +394,12 @@ class TextCleaner:
         self.clean_attributes(div)
         return div
 
-    def clean_text(self, text) -> str:
+    def clean_text(self, text, profile: Optional[CleanerProfile] = None) -> str:
         text = str(text).strip()
         text = text.translate(self.nonprintable_mapping)
-        if not hasattr(self, "_subs_"):
-            self._subs_ = re.compile(
-                "|".join([f"({x})" for x in self.substitutions.keys()]),
-                flags=re.IGNORECASE,
-            )
-        text = self._subs_.sub(
-            lambda m: self.substitutions[str(m.group(0)).lower()], text
+        profile = profile or self.profile
+        text = profile.substitution_pattern.sub(
+            lambda m: profile.substitution_map[str(m.group(0)).lower()], text
         )
         return text
 
@@ -224,17 +421,12 @@ class TextCleaner:
                 attrs[name] = value
         tag.attrs = attrs
 
-    def tag_contains_bad_text(self, tag: Tag) -> bool:
-        pattern = self.bad_tag_text_pairs.get(tag.name)
+    def tag_contains_bad_text(self, tag: Tag, profile: Optional[CleanerProfile] = None) -> bool:
         if not tag.text:
             return True
+        pattern = (profile or self.profile).bad_tag_text_patterns.get(tag.name)
         if not pattern:
             return False
-        if isinstance(pattern, list):
-            pattern = "|".join([f"({x})" for x in pattern if x])
-        if not isinstance(pattern, re.Pattern):
-            pattern = re.compile(pattern, re.M)
-            self.bad_tag_text_pairs[tag.name] = pattern
         return bool(pattern.search(tag.text))
 
     def clean_image(self, tag: Tag):
@@ -261,16 +453,18 @@ class TextCleaner:
                 clean_css.append(f"{name}:{value}")
         return ";".join(clean_css)
 
-    def extract_paragraphs(self, tag) -> list:
+    def extract_paragraphs(self, tag, profile: Optional[CleanerProfile] = None) -> list:
         if not isinstance(tag, Tag):
             return []
 
+        profile = profile or self.profile
+
         body = []
         for elem in tag.contents:
             if isinstance(elem, Comment):
                 continue
             if not isinstance(elem, Tag):
-                body.append(self.clean_text(elem))
+                body.append(self.clean_text(elem, profile))
                 continue
             if elem.name in self.unchanged_tags:
                 body.append(str(elem))
@@ -288,7 +482,7 @@ class TextCleaner:
 
             is_block = elem.name in self.p_block_tags
             is_plain = elem.name in self.plain_text_tags
-            content = " ".join(self.extract_paragraphs(elem))
+            content = " ".join(self.extract_paragraphs(elem, profile))
 
             if is_block:
                 body.append(self.line_separator)
@@ -307,12 +501,8 @@ class TextCleaner:
 
         return [x.strip() for x in body if x.strip()]
 
-    def contains_bad_texts(self, text: str) -> bool:
+    def contains_bad_texts(self, text: str, profile: Optional[CleanerProfile] = None) -> bool:
         if not text.strip():
             return True
-        if not self.bad_text_regex:
-            return False
-        if not hasattr(self, "__blacklist__"):
-            pattern = re.compile("|".join(["(%s)" % p for p in self.bad_text_regex]))
-            self.__blacklist__ = pattern
-        return bool(self.__blacklist__.search(text))
+        pattern = (profile or self.profile).bad_text_pattern
+        return bool(pattern and pattern.search(text))
@@ -0,0 +1,370 @@
+"""
+A single-pass cleaning engine for chapter bodies working on lxml trees.
+
+It follows the exact rules of `TextCleaner.extract_contents`, but instead of
+removing nodes in several passes over a BeautifulSoup tree and then joining and
+splitting strings at every level, it marks removals on an lxml tree and emits
+the paragraphs in one traversal. The image references found in the output are
+collected on the way, so they do not have to be parsed again later.
+"""
+import logging
+import re
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, List, Optional, Set, Tuple
+
+from bs4 import BeautifulSoup, Comment, NavigableString, Tag
+from bs4.builder import HTMLTreeBuilder
+from bs4.dammit import EntitySubstitution
+from lxml import etree
+
+if TYPE_CHECKING:
+    from .cleaner import CleanerProfile, TextCleaner
+
+logger = logging.getLogger(__name__)
+
+# (the markup of the image tag in the output, the image src)
+ImageRef = Tuple[str, str]
+
+# Keep these in sync with how BeautifulSoup builds and prints html trees
+_VOID_TAGS = frozenset(HTMLTreeBuilder.DEFAULT_EMPTY_ELEMENT_TAGS or [])
+_LIST_ATTRIBUTES = HTMLTreeBuilder.DEFAULT_CDATA_LIST_ATTRIBUTES
+_STRING_CONTAINERS = frozenset(HTMLTreeBuilder.DEFAULT_STRING_CONTAINERS)
+_CDATA_TAGS = frozenset(["script", "style"])
+_escape = EntitySubstitution.substitute_xml
+_quote = EntitySubstitution.quoted_attribute_value
+
+
+@lru_cache(maxsize=64)
+def _compile_selector(css: str) -> Optional[Callable]:
+    try:
+        from lxml.cssselect import CSSSelector
+
+        return CSSSelector(css, translator="html")
+    except Exception as e:
+        logger.debug("Unsupported selector for lxml engine: %s | %s", css, e)
+        return None
+
+
+_PLAIN_STRINGS = (NavigableString, *HTMLTreeBuilder.DEFAULT_STRING_CONTAINERS.values())
+
+# lxml refuses the characters not allowed in xml. They are kept as private-use
+# placeholders inside the tree, and restored whenever a string is read back.
+_UNSAFE_CODES = [*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20), 0xFFFE, 0xFFFF]
+_ESCAPE = {code: 0x10FF00 + i for i, code in enumerate(_UNSAFE_CODES)}
+_RESTORE = {v: k for k, v in _ESCAPE.items()}
+_UNSAFE_RE = re.compile("[%s]" % "".join(map(chr, _ESCAPE)))
+_PLACEHOLDER_RE = re.compile("[%s]" % "".join(map(chr, _RESTORE)))
+
+
+def _restore(text: str) -> str:
+    return text.translate(_RESTORE)
+
+
+def _from_soup(tag: Tag) -> Tuple[Optional[etree._Element], bool]:
+    """Builds the same tree without printing and parsing the markup again.
+    Returns the root, and whether any string had to be escaped."""
+    escaped = False
+
+    def safe(text: str) -> str:
+        nonlocal escaped
+        if not _UNSAFE_RE.search(text):
+            return text
+        if _PLACEHOLDER_RE.search(text):
+            raise ValueError("string contains escape placeholders")
+        escaped = True
+        return text.translate(_ESCAPE)
+
+    def build(source: Tag, target: etree._Element) -> None:
+        last: Optional[etree._Element] = None
+        previous_is_text = False
+        for node in source.contents:
+            if isinstance(node, Tag):
+                attrs = {
+                    key: safe(" ".join(value) if isinstance(value, list) else (value or ""))
+                    for key, value in node.attrs.items()
+                }
+                last = etree.SubElement(target, node.name, attrs)
+                build(node, last)
+                previous_is_text = False
+            elif type(node) is Comment:
+                last = etree.Comment(safe(node))
+                target.append(last)
+                previous_is_text = False
+            elif type(node) in _PLAIN_STRINGS:
+                if previous_is_text or not node:
+                    raise ValueError("adjacent or empty strings")
+                if last is None:
+                    target.text = safe(node)
+                else:
+                    last.tail = safe(node)
+                previous_is_text = True
+            else:
+                raise ValueError(f"unsupported node: {type(node).__name__}")
+
+    try:
+        root = etree.Element(tag.name)
+        build(tag, root)
+        return root, escaped
+    except ValueError as e:  # invalid names, or nodes lxml can not represent
+        logger.debug("Falling back to bs4 cleaner: %s", e)
+        return None, False
+
+
+def _to_lxml(tag) -> Tuple[Optional[etree._Element], bool]:
+    if isinstance(tag, etree._Element):
+        return tag, False
+    if not isinstance(tag, Tag) or isinstance(tag, BeautifulSoup):
+        return None, False
+    return _from_soup(tag)
+
+
+def extract_contents(
+    cleaner: "TextCleaner",
+    tag,
+    profile: "CleanerProfile",
+) -> Optional[Tuple[str, List[ImageRef]]]:
+    """Returns the cleaned html with the image references in it, or None if
+    the tag can not be handled by this engine."""
+    if tag is None:
+        return "", []
+    root, escaped = _to_lxml(tag)
+    if root is None:
+        return None
+    engine = _Engine(cleaner, profile, escaped)
+    if not engine.mark_removals(root):
+        return None
+    body = engine.extract_paragraphs(root)
+    paragraphs = " ".join(body).split(cleaner.line_separator)
+    html = "".join(
+        [
+            f"<p>{p.strip()}</p>"
+            for p in paragraphs
+            if not cleaner.contains_bad_texts(p, profile)
+        ]
+    )
+    images = [ref for ref in engine.images if ref[0] in html]
+    return html, images
+
+
+class _Engine:
+    def __init__(self, cleaner: "TextCleaner", profile: "CleanerProfile", escaped: bool) -> None:
+        self.read: Callable[[str], str] = _restore if escaped else str
+        self.cleaner = cleaner
+        self.profile = profile
+        self.separator = cleaner.line_separator
+        self.removed: Set[etree._Element] = set()
+        self.images: List[ImageRef] = []
+
+    # ------------------------------------------------------------------------- #
+    # Removals by css selectors and tag texts
+    # ------------------------------------------------------------------------- #
+
+    def mark_removals(self, root: etree._Element) -> bool:
+        if self.profile.bad_css_selector:
+            select = _compile_selector(self.profile.bad_css_selector)
+            if select is None:
+                return False
+            self.removed.update(e for e in select(root) if e is not root)
+
+        if self.profile.bad_tag_text_selector:
+            select = _compile_selector(self.profile.bad_tag_text_selector)
+            if select is None:
+                return False
+            patterns = self.profile.bad_tag_text_patterns
+            for elem in select(root):
+                if elem is root or self._is_removed(elem):
+                    continue
+                text = self._text(elem)
+                if not text:
+                    self.removed.add(elem)
+                    continue
+                pattern = patterns.get(elem.tag)
+                if pattern and pattern.search(text):
+                    self.removed.add(elem)
+        return True
+
+    def _is_removed(self, elem: etree._Element) -> bool:
+        if elem in self.removed:
+            return True
+        return any(e in self.removed for e in elem.iterancestors())
+
+    def _text(self, elem: etree._Element) -> str:
+        # same as `Tag.text`: strings inside script-like tags have their own types,
+        # and only the strings having the same type as the tag are included.
+        target = elem.tag if elem.tag in _STRING_CONTAINERS else None
+        outer = None
+        for parent in elem.iterancestors():
+            if parent.tag in _STRING_CONTAINERS:
+                outer = parent.tag
+                break
+        parts: List[str] = []
+
+        def collect(node: etree._Element, container: Optional[str]) -> None:
+            if node.tag in _STRING_CONTAINERS:
+                container = node.tag
+            if node.text and container == target:
+                parts.append(node.text)
+            for child in node:
+                if isinstance(child.tag, str) and child not in self.removed:
+                    collect(child, container)
+                if child.tail and container == target:
+                    parts.append(child.tail)
+
+        collect(elem, outer)
+        return self.read("".join(parts))
+
+    # ------------------------------------------------------------------------- #
+    # Tag cleaning
+    # ------------------------------------------------------------------------- #
+
+    def _is_duplicate_sibling(self, elem: etree._Element) -> bool:
+        if elem.tail:
+            return False
+        sibling = elem.getnext()
+        while sibling is not None and sibling in self.removed:
+            if sibling.tail:
+                return False
+            sibling = sibling.getnext()
+        if sibling is None or not isinstance(sibling.tag, str):
+            return False
+        return sibling.tag == elem.tag
+
+    def _attributes(self, elem: etree._Element) -> list:
+        list_names = _LIST_ATTRIBUTES.get("*", set()) | _LIST_ATTRIBUTES.get(elem.tag, set())
+        attrs = []
+        for name, value in elem.attrib.items():
+            value = self.read(value)
+            if name in list_names:
+                value = value.split()
+            attrs.append((name, value))
+        return attrs
+
+    def _clean(self, elem: etree._Element) -> Optional[list]:
+        """Returns the cleaned attributes, or None if the tag should be removed"""
+        name = elem.tag
+        if name in self.profile.bad_tags:
+            return None
+        if name in ("br", "hr"):
+            if self._is_duplicate_sibling(elem):
+                return None
+            return self._attributes(elem)
+        if name == "img":
+            src = None
+            for attr in self.cleaner.image_src_attributes:
+                src = elem.get(attr)
+                if src:
+                    src = self.read(src)
+                    break
+            if not src:
+                return None
+            return [("src", src)]
+        attrs = []
+        whitelist = self.cleaner.whitelist_attributes
+        for key, value in self._attributes(elem):
+            if key not in whitelist:
+                continue
+            if key == "style":
+                value = self.cleaner.clean_style_value(str(value))
+            if value:
+                attrs.append((key, value))
+        return attrs
+
+    # ------------------------------------------------------------------------- #
+    # Output
+    # ------------------------------------------------------------------------- #
+
+    def _children(self, elem: etree._Element):
+        """Yields (node, attributes) pairs of the child nodes after cleaning.
+        Strings are given with None attributes, comments with empty ones."""
+        if elem.text:
+            yield self.read(elem.text), None
+        for child in elem:
+            if not isinstance(child.tag, str):
+                if child.tag is etree.Comment:
+                    yield child, ()
+            elif child not in self.removed:
+                attrs = self._clean(child)
+                if attrs is not None:
+                    yield child, attrs
+            if child.tail:
+                yield self.read(child.tail), None
+
+    def _serialize(self, elem: etree._Element, attrs: list, out: List[str]) -> None:
+        name = elem.tag
+        begin = len(out)
+        out.append("<" + name)
+        for key, value in sorted(attrs):
+            if isinstance(value, list):
+                value = " ".join(value)
+            out.append(f" {key}={_quote(_escape(value or ''))}")
+        start = len(out)
+        out.append(">")
+        for node, child_attrs in self._children(elem):
+            if child_attrs is None:
+                out.append(node if name in _CDATA_TAGS else _escape(node))
+            elif not child_attrs and not isinstance(node.tag, str):
+                out.append(f"<!--{self.read(node.text or '')}-->")
+            else:
+                self._serialize(node, child_attrs, out)
+        if len(out) == start + 1 and name in _VOID_TAGS:
+            out[start] = "/>"
+        else:
+            out.append(f"</{name}>")
+        if name == "img":
+            self.images.append(("".join(out[begin:]), dict(attrs)["src"]))
+
+    def _lines(self, items: List[str]) -> List[str]:
+        # same as splitting the items joined by spaces, for stripped non-empty items
+        lines: List[str] = []
+        group: List[str] = []
+        for item in items:
+            if item == self.separator:
+                if group:
+                    lines.append(" ".join(group))
+                    group = []
+            elif self.separator in item:
+                content = " ".join(items)
+                return [x.strip() for x in content.split(self.separator) if x.strip()]
+            else:
+                group.append(item)
+        if group:
+            lines.append(" ".join(group))
+        return lines
+
+    def extract_paragraphs(self, elem: etree._Element) -> List[str]:
+        cleaner = self.cleaner
+        separator = self.separator
+        body: List[str] = []
+        for node, attrs in self._children(elem):
+            if attrs is None:
+                body.append(cleaner.clean_text(node, self.profile))
+                continue
+            name = node.tag
+            if not isinstance(name, str):
+                continue
+            if name in cleaner.unchanged_tags:
+                out: List[str] = []
+                self._serialize(node, attrs, out)
+                body.append("".join(out))
+                continue
+            if name in ("br", "hr"):
+                body.append(separator)
+                continue
+
+            is_block = name in cleaner.p_block_tags
+            is_plain = name in cleaner.plain_text_tags
+            lines = self._lines(self.extract_paragraphs(node))
+
+            if is_block:
+                body.append(separator)
+
+            for line in lines:
+                if not (is_plain or is_block):
+                    line = "<%s>%s</%s>" % (name, line, name)
+                body.append(line)
+                body.append(separator)
+
+            if body and body[-1] == separator and not is_block:
+                body.pop()
+
+        return [x.strip() for x in body if x.strip()]
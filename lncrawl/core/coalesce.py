@@ -0,0 +1,174 @@
+import copy
+import io
+import time
+from tempfile import SpooledTemporaryFile
+from threading import Event, Lock
+from typing import Any, Callable, Dict, Hashable, Optional, TypeVar
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+from ..exceptions import AbortedException
+
+# seconds to share a finished response with the repeated requests
+_WINDOW = 2.0
+# how often the waiting threads check the abort signal
+_SIGNAL_INTERVAL = 1.0  # seconds
+# bytes of a shared file to keep in memory before moving it to the disk
+_SPOOL_SIZE = 1024 * 1024
+
+T = TypeVar("T")
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = Event()
+        self.response: Any = None
+        self.error: Optional[BaseException] = None
+        self.finished_at = 0.0
+
+
+def _copy(response: Response) -> Response:
+    clone = copy.copy(response)
+    clone.headers = CaseInsensitiveDict(response.headers)
+    return clone
+
+
+class SharedFile:
+    """A temporary file written once, and then read by many threads at once.
+    It is kept in memory while small, and removed when no longer referenced."""
+
+    def __init__(self, max_size: int = _SPOOL_SIZE) -> None:
+        self._file = SpooledTemporaryFile(max_size=max_size)
+        self._lock = Lock()
+        self.size = 0
+
+    def write(self, data: bytes) -> None:
+        with self._lock:
+            self._file.seek(self.size)
+            self._file.write(data)
+            self.size += len(data)
+
+    def read_at(self, offset: int, size: int) -> bytes:
+        with self._lock:
+            self._file.seek(offset)
+            return self._file.read(size)
+
+    def open(self) -> io.BufferedReader:
+        """Returns a reader of the file with its own position"""
+        return io.BufferedReader(_SharedFileReader(self))
+
+
+class _SharedFileReader(io.RawIOBase):
+    def __init__(self, shared: SharedFile) -> None:
+        self._shared = shared
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._shared.size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def readinto(self, buffer) -> int:
+        data = self._shared.read_at(self._pos, len(buffer))
+        buffer[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+
+class RequestCoalescer:
+    """Merges the identical GET requests of all crawlers in this process.
+
+    The first request of a key is sent, and the others arriving while it is in
+    flight, or shortly after it has finished, get a copy of its response.
+    """
+
+    def __init__(self, window: float = _WINDOW) -> None:
+        self.window = window
+        self._lock = Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.requests = 0
+        self.in_flight = 0  # merged with a request in flight
+        self.recent = 0  # merged with a request finished within the window
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            merged = self.in_flight + self.recent
+            return {
+                'requests': self.requests,
+                'merged': merged,
+                'in_flight': self.in_flight,
+                'recent': self.recent,
+                'merge_rate': round(merged / self.requests, 4) if self.requests else 0,
+            }
+
+    def _purge(self, now: float) -> None:
+        # must be called with the lock
+        expired = [
+            key for key, call in self._calls.items()
+            if call.done.is_set() and call.finished_at < now - self.window
+        ]
+        for key in expired:
+            del self._calls[key]
+
+    def request(
+        self,
+        key: Hashable,
+        send: Callable[[], T],
+        signal: Optional[Event] = None,
+        share: Callable[[T], T] = _copy,  # type:ignore
+    ) -> T:
+        """Returns the result of `send()`, sharing it with the requests of the same key.
+        The other requests get the result passed through `share`, a copy of the response by default."""
+        with self._lock:
+            self.requests += 1
+            self._purge(time.monotonic())
+            call = self._calls.get(key)
+            if not call:
+                call = self._calls[key] = _Call()
+                leader = True
+            else:
+                leader = False
+                if call.done.is_set():
+                    self.recent += 1
+                else:
+                    self.in_flight += 1
+
+        if leader:
+            try:
+                call.response = send()
+                return call.response
+            except BaseException as e:
+                call.error = e
+                with self._lock:
+                    if self._calls.get(key) is call:
+                        del self._calls[key]  # not to share the failure later
+                raise
+            finally:
+                call.finished_at = time.monotonic()
+                call.done.set()
+
+        while not call.done.wait(_SIGNAL_INTERVAL):
+            if signal and signal.is_set():
+                raise AbortedException()
+        if isinstance(call.error, AbortedException):
+            return send()  # aborted by the signal of another crawler
+        if call.error:
+            raise call.error
+        return share(call.response)
+
+
+request_coalescer = RequestCoalescer()
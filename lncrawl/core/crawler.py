@@ -22,6 +22,9 @@ class Crawler(Scraper):
     is_disabled = False
     disable_reason: Optional[str] = None
 
+    # The engine used by `self.cleaner`: "bs4" or "lxml". Default: DEFAULT_CLEANER_ENGINE
+    cleaner_engine: Optional[str] = None
+
     # ------------------------------------------------------------------------- #
     # Constructor & Destructors
     # ------------------------------------------------------------------------- #
@@ -45,7 +48,7 @@ class Crawler(Scraper):
         )
 
         self.home_url = self.base_url[0]
-        self.cleaner = TextCleaner()
+        self.cleaner = TextCleaner(engine=self.cleaner_engine)
 
         # Available in `search_novel` or `read_novel_info`
         self.novel_url = ""
@@ -119,6 +122,21 @@ class Crawler(Scraper):
             return
 
         chapter.setdefault('images', {})
+        images = self.cleaner.extracted_images(chapter.body)
+        if images is not None:
+            # the body was just produced by the lxml cleaner: no need to parse it again
+            for markup, src_url in images:
+                full_url = self.absolute_url(src_url, page_url=chapter.url)
+                if not full_url.startswith("http"):
+                    continue
+                id_text = str([self.home_url, chapter.url, full_url])
+                image_id = hashlib.md5(id_text.encode()).hexdigest()
+                chapter.body = chapter.body.replace(
+                    markup, f'<img alt="{image_id}" src="images/{image_id}.jpg"/>'
+                )
+                chapter.images[image_id] = full_url
+            return
+
         soup = self.make_soup(chapter.body)
         for img in soup.select("img[src]"):
             src_url = img.get('src')
@@ -131,7 +149,8 @@ class Crawler(Scraper):
 
             id_text = str([self.home_url, chapter.url, full_url])
             image_id = hashlib.md5(id_text.encode()).hexdigest()
-            img.attrs = {"src": f"images/{image_id}.jpg", "alt": image_id}
+            # the same as the fast path above: bs4 writes the attributes sorted
+            img.attrs = {"alt": image_id, "src": f"images/{image_id}.jpg"}
             chapter.images[image_id] = full_url
 
         if chapter.images:
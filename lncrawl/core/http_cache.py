@@ -0,0 +1,299 @@
+"""
+A cache of the GET responses on the disk.
+
+The responses are kept compressed with zstd, along with their ETag and
+Last-Modified headers. A response younger than the TTL is used without asking
+the website. An older one is revalidated by a conditional request, and the
+cached body is used again if the website answers with 304 Not Modified.
+
+The least recently used responses are removed when the cache grows larger than
+the configured size.
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock, get_ident
+from typing import Any, Callable, Dict, Mapping, Optional
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+from ..context import ctx
+from ..utils.text_tools import text_compress, text_decompress
+
+logger = logging.getLogger(__name__)
+
+# headers that are not valid for the decoded body, or must not be replayed
+_SKIP_HEADERS = {
+    'connection',
+    'content-encoding',
+    'content-length',
+    'keep-alive',
+    'set-cookie',
+    'transfer-encoding',
+}
+# request headers that do not change the decoded body
+_IGNORED_VARY = {'accept-encoding'}
+
+
+class CachedResponse:
+    def __init__(self, key: str, meta: Dict[str, Any], body: bytes, validated_at: float) -> None:
+        self.key = key
+        self.meta = meta
+        self.body = body
+        self.validated_at = validated_at
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.validated_at
+
+    @property
+    def validators(self) -> Dict[str, str]:
+        headers = CaseInsensitiveDict(self.meta['headers'])
+        validators = {}
+        if headers.get('ETag'):
+            validators['If-None-Match'] = headers['ETag']
+        if headers.get('Last-Modified'):
+            validators['If-Modified-Since'] = headers['Last-Modified']
+        return validators
+
+    def matches(self, headers: Mapping[str, Any]) -> bool:
+        return all(
+            str(headers.get(name) or '') == value
+            for name, value in self.meta['vary'].items()
+        )
+
+    def to_response(self) -> Response:
+        response = Response()
+        response.status_code = self.meta['status']
+        response.reason = self.meta['reason']
+        response.url = self.meta['url']
+        response.headers = CaseInsensitiveDict(self.meta['headers'])
+        response._content = self.body
+        setattr(response, 'from_cache', True)
+        return response
+
+
+class HttpCache:
+    """The cached GET responses of all crawlers in this process"""
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._index: Optional['OrderedDict[str, int]'] = None  # key -> size, least recent first
+        self._size = 0
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @property
+    def max_size(self) -> int:
+        return ctx.config.crawler.http_cache_size * 1024 * 1024
+
+    @property
+    def ttl(self) -> int:
+        return ctx.config.crawler.http_cache_ttl
+
+    @property
+    def folder(self) -> Path:
+        return ctx.config.crawler.http_cache_dir
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            requests = self.hits + self.revalidated + self.misses
+            return {
+                'entries': len(self._index or {}),
+                'size': self._size,
+                'hits': self.hits,
+                'revalidated': self.revalidated,
+                'misses': self.misses,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'hit_rate': round((self.hits + self.revalidated) / requests, 4) if requests else 0,
+            }
+
+    def request(
+        self,
+        url: str,
+        headers: Mapping[str, Any],
+        send: Callable[[Dict[str, str]], Response],
+        ttl: Optional[float] = None,
+    ) -> Response:
+        """Returns the cached response of the url if it is fresh or not modified,
+        otherwise the response of `send(validators)`, which is cached for the next time.
+
+        Args:
+        - url (str): The full url of the GET request, including the query params.
+        - headers (Mapping): All headers of the request, to match the `Vary` of the responses.
+        - send (Callable): Sends the request with the given conditional headers.
+        - ttl (float, optional): Seconds to use a response without revalidation. Default: `http_cache_ttl` config.
+        """
+        if ttl is None:
+            ttl = self.ttl
+        headers = CaseInsensitiveDict(headers)
+        key = hashlib.sha1(f'GET {url}'.encode()).hexdigest()
+        cached = self._load(key)
+        if cached and not cached.matches(headers):
+            cached = None
+
+        if cached and cached.age < ttl:
+            with self._lock:
+                self.hits += 1
+            return cached.to_response()
+
+        validators = cached.validators if cached else {}
+        response = send(validators)
+        if cached and validators and response.status_code == 304:
+            with self._lock:
+                self.revalidated += 1
+            self._refresh(cached, response)
+            return cached.to_response()
+
+        with self._lock:
+            self.misses += 1
+        self._save(key, url, headers, response, ttl)
+        return response
+
+    # ------------------------------------------------------------------------- #
+    # Storage
+    # ------------------------------------------------------------------------- #
+
+    def _path(self, key: str) -> Path:
+        return self.folder / key[:2] / key
+
+    def _ensure_index(self) -> 'OrderedDict[str, int]':
+        # must be called with the lock
+        if self._index is None:
+            entries = []
+            if self.folder.is_dir():
+                for file in self.folder.glob('*/*'):
+                    try:
+                        stat = file.stat()
+                        entries.append((stat.st_mtime, file.name, stat.st_size))
+                    except OSError:
+                        pass
+            self._index = OrderedDict((key, size) for _, key, size in sorted(entries))
+            self._size = sum(self._index.values())
+        return self._index
+
+    def _touch(self, key: str, size: Optional[int] = None) -> None:
+        with self._lock:
+            index = self._ensure_index()
+            if size is None:
+                if key in index:
+                    index.move_to_end(key)
+                return
+            self._size += size - index.pop(key, 0)
+            index[key] = size
+            evicted = []
+            while self._size > self.max_size and len(index) > 1:
+                old_key, old_size = index.popitem(last=False)
+                self._size -= old_size
+                evicted.append(old_key)
+            self.evictions += len(evicted)
+        for old_key in evicted:
+            self._path(old_key).unlink(missing_ok=True)
+
+    def _load(self, key: str) -> Optional[CachedResponse]:
+        if not self.enabled:
+            return None
+        file = self._path(key)
+        try:
+            validated_at = file.stat().st_mtime
+            data = text_decompress(file.read_bytes())
+            head, body = data.split(b'\n', 1)
+            meta = json.loads(head)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.debug(f'Discarding cached response {key}: {repr(e)}')
+            file.unlink(missing_ok=True)
+            return None
+        self._touch(key)
+        return CachedResponse(key, meta, body, validated_at)
+
+    def _write(self, key: str, meta: Dict[str, Any], body: bytes) -> None:
+        data = text_compress(json.dumps(meta).encode() + b'\n' + body)
+        file = self._path(key)
+        try:
+            file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = file.with_name(f'{key}.tmp{os.getpid()}-{get_ident()}')
+            tmp_file.write_bytes(data)
+            tmp_file.replace(file)
+        except OSError as e:
+            logger.debug(f'Failed to cache response {key}: {repr(e)}')
+            return
+        with self._lock:
+            self.stores += 1
+        self._touch(key, len(data))
+
+    def _save(
+        self,
+        key: str,
+        url: str,
+        headers: Mapping[str, Any],
+        response: Response,
+        ttl: float,
+    ) -> None:
+        if not self.enabled or response.status_code != 200:
+            return
+        cache_control = response.headers.get('Cache-Control', '').lower()
+        if 'no-store' in cache_control:
+            return
+        vary = [
+            name.strip().lower()
+            for name in response.headers.get('Vary', '').split(',')
+            if name.strip()
+        ]
+        if '*' in vary:
+            return
+        if ttl <= 0 and not (response.headers.get('ETag') or response.headers.get('Last-Modified')):
+            return  # can never be used
+        meta = {
+            'url': response.url or url,
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': {
+                name: value
+                for name, value in response.headers.items()
+                if name.lower() not in _SKIP_HEADERS
+            },
+            'vary': {
+                name: str(headers.get(name) or '')
+                for name in vary
+                if name not in _IGNORED_VARY
+            },
+        }
+        self._write(key, meta, response.content)
+
+    def _refresh(self, cached: CachedResponse, response: Response) -> None:
+        """Updates a cached response that the website says is not modified"""
+        headers = CaseInsensitiveDict(cached.meta['headers'])
+        changed = False
+        for name in ('ETag', 'Last-Modified', 'Cache-Control', 'Expires'):
+            value = response.headers.get(name)
+            if value and headers.get(name) != value:
+                headers[name] = value
+                changed = True
+        cached.meta['headers'] = dict(headers)
+        cached.validated_at = time.time()
+        if changed:
+            self._write(cached.key, cached.meta, cached.body)
+            return
+        try:
+            os.utime(self._path(cached.key))
+        except OSError:
+            pass
+
+
+http_cache = HttpCache()
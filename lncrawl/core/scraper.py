@@ -2,28 +2,43 @@ import base64
 import logging
 import os
 import re
+import time
 from io import BytesIO
-from typing import Any, Callable, Dict, MutableMapping, Optional, Tuple, Union
+from typing import (Any, Callable, Dict, MutableMapping, Optional, Tuple,
+                    Union)
 from urllib.parse import ParseResult, urlparse
 
 from bs4 import BeautifulSoup
 from PIL import Image, UnidentifiedImageError
-from requests import Response, Session
+from requests import PreparedRequest, Response, Session
 from requests.exceptions import ProxyError
 from requests.structures import CaseInsensitiveDict
 from tenacity import (RetryCallState, retry, retry_if_exception_type,
-                      stop_after_attempt, wait_random_exponential)
+                      retry_if_not_exception_type, stop_after_attempt,
+                      wait_random_exponential)
 
 from ..cloudscraper import create_scraper
-from ..exceptions import RetryErrorGroup
+from ..exceptions import (AbortedException, CloudflareException,
+                          RetryErrorGroup)
+from ..utils.file_tools import sniff_image_type
+from .coalesce import SharedFile, request_coalescer
+from .http_cache import http_cache
 from .proxy import get_a_proxy, remove_faulty_proxies
 from .soup import SoupMaker
 from .taskman import TaskManager
+from .throttle import host_throttles
 
 logger = logging.getLogger(__name__)
 
+# bytes to read at a time from the streamed responses
+_CHUNK_SIZE = 64 * 1024
+
 
 class Scraper(TaskManager, SoupMaker):
+    # Seconds to use a cached GET response without asking the website.
+    # Default: the `http_cache_ttl` config. Set -1 to disable the cache.
+    http_cache_ttl: Optional[int] = None
+
     # ------------------------------------------------------------------------- #
     # Initializers
     # ------------------------------------------------------------------------- #
@@ -51,6 +66,7 @@ class Scraper(TaskManager, SoupMaker):
             - Sets up internal state, including proxy usage, user agent, parser, and executor
               for concurrent tasks.
         """
+        self.ratelimit: Optional[float] = None
         super().__init__(workers)
 
         self.home_url = ""
@@ -62,9 +78,22 @@ class Scraper(TaskManager, SoupMaker):
 
     def close(self) -> None:
         if hasattr(self, "scraper"):
+            saved = getattr(self.scraper, "tls_handshakes_saved", None)
+            if saved:
+                logger.debug(f"TLS handshakes saved: {dict(saved)}")
             self.scraper.close()
         super().close()
 
+    def init_executor(
+        self,
+        workers: Optional[int] = None,
+        ratelimit: Optional[float] = None,
+    ):
+        # the ratelimit caps the adaptive limit of the requests to each host,
+        # shared by all crawlers in this process, see `host_throttles`
+        self.ratelimit = ratelimit if ratelimit and ratelimit > 0 else None
+        super().init_executor(workers)
+
     def init_parser(self, parser: Optional[str] = None):
         self._soup_tool = SoupMaker(parser)
         self.make_tag = self._soup_tool.make_tag  # type:ignore
@@ -77,8 +106,8 @@ class Scraper(TaskManager, SoupMaker):
             # debug=True,  # Enable for monitoring (disable in production)
 
             # KEY SETTINGS to prevent 403 errors
-            min_request_interval=2.0,      # CRITICAL: Prevents TLS blocking
-            max_concurrent_requests=1,     # CRITICAL: Prevents concurrent conflicts
+            min_request_interval=0,        # Adapted per host by `host_throttles`
+            max_concurrent_requests=0,     # Adapted per host by `host_throttles`
             rotate_tls_ciphers=True,       # CRITICAL: Avoids cipher detection
 
             # Enhanced protection
@@ -121,8 +150,12 @@ class Scraper(TaskManager, SoupMaker):
         *args,
         max_retries: Optional[int] = None,
         headers: Optional[MutableMapping] = {},
+        reader: Optional[Callable[[Response], Any]] = None,
         **kwargs,
     ):
+        """Sends the request and returns the response, or the result of the `reader`
+        if given, which streams the response body and is retried with the request.
+        The result of the reader is shared with the identical requests at the same time."""
         method_call: Callable[..., Response] = getattr(self.scraper, method)
         if not callable(method_call):
             raise Exception(f"No request method: {method}")
@@ -131,6 +164,8 @@ class Scraper(TaskManager, SoupMaker):
 
         kwargs = kwargs or dict()
         kwargs.setdefault("allow_redirects", True)
+        if reader:
+            kwargs["stream"] = True
         kwargs["proxies"] = self.__get_proxies(_parsed.scheme)
 
         headers = CaseInsensitiveDict(headers)
@@ -148,31 +183,93 @@ class Scraper(TaskManager, SoupMaker):
                             remove_faulty_proxies(proxy_url)
                         kwargs["proxies"] = self.__get_proxies(_parsed.scheme, 5)
 
+        def _send(validators: Dict[str, str] = {}) -> Response:
+            request_headers = CaseInsensitiveDict(headers)
+            request_headers.update(validators)
+            throttle = host_throttles.get(_parsed.hostname)
+            with throttle.limit(self.scraper.signal, self.ratelimit) as acquired:
+                if not acquired:
+                    raise AbortedException()
+                started = time.monotonic()
+                try:
+                    response = method_call(
+                        url,
+                        *args,
+                        **kwargs,
+                        headers=request_headers,
+                    )
+                except AbortedException:
+                    raise
+                except CloudflareException as e:
+                    throttle.backoff(type(e).__name__, started)
+                    raise
+                throttle.feedback(response, started)
+            return response
+
+        use_cache = (
+            method == "get"
+            and not args
+            and not kwargs.get("stream")
+            # the pages of a logged in user are not shared with the others
+            and not getattr(self, "__logged_in__", False)
+            and (self.http_cache_ttl is None or self.http_cache_ttl >= 0)
+            and "If-None-Match" not in headers
+            and "If-Modified-Since" not in headers
+            and http_cache.enabled
+        )
+
         @retry(
             stop=stop_after_attempt(max_retries or 0),
             wait=wait_random_exponential(multiplier=0.5, max=60),
-            retry=retry_if_exception_type(RetryErrorGroup),
+            retry=(
+                retry_if_exception_type(RetryErrorGroup)
+                & retry_if_not_exception_type(AbortedException)
+            ),
             after=_after_retry,
             reraise=True,
         )
         def _do_request():
-            response = method_call(
-                url,
-                *args,
-                **kwargs,
-                headers=headers,
-            )
+            if use_cache:
+                all_headers = CaseInsensitiveDict(self.scraper.headers)
+                all_headers.update(headers)
+                prepared = PreparedRequest()
+                prepared.prepare_url(url, kwargs.get("params"))
+                response = http_cache.request(prepared.url, all_headers, _send, ttl=self.http_cache_ttl)
+            else:
+                response = _send()
             response.raise_for_status()
             response.encoding = "utf8"
 
             self.cookies.update({x.name: x.value for x in response.cookies})
+            if reader:
+                with response:
+                    return reader(response)
             return response
 
         logger.debug(
             f"[{method.upper()}] {url}\n"
             + "\n".join([f"    {k} = {v}" for k, v in kwargs.items()])
         )
-        return _do_request()
+        if method != "get" or args or (kwargs.get("stream") and not reader):
+            return _do_request()
+
+        # the identical requests in flight share the same response
+        key = (
+            url,
+            repr(kwargs.get("params")),
+            kwargs.get("allow_redirects"),
+            tuple(sorted(
+                (k.lower(), str(v))
+                for k, v in headers.items()
+                if k.lower() not in ("origin", "referer")
+            )),
+            # the pages of a logged in user are not shared with the others
+            id(self) if getattr(self, "__logged_in__", False) else None,
+            reader is not None,
+        )
+        if reader:
+            return request_coalescer.request(key, _do_request, self.scraper.signal, share=lambda x: x)
+        return request_coalescer.request(key, _do_request, self.scraper.signal)
 
     # ------------------------------------------------------------------------- #
     # Helpers
@@ -297,10 +394,17 @@ class Scraper(TaskManager, SoupMaker):
         output_file: str,
         **kwargs
     ) -> None:
-        """Download content of the url to a file"""
-        response = self.__process_request("get", url, **kwargs)
-        with open(output_file, "wb") as f:
-            f.write(response.content)
+        """Download content of the url to a file, without keeping it in memory"""
+        tmp_file = f"{output_file}.part"
+        try:
+            response = self.__process_request("get", url, stream=True, **kwargs)
+            with response, open(tmp_file, "wb") as f:
+                for chunk in response.iter_content(_CHUNK_SIZE):
+                    f.write(chunk)
+            os.replace(tmp_file, output_file)
+        finally:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
 
     def download_image(
         self,
@@ -308,7 +412,10 @@ class Scraper(TaskManager, SoupMaker):
         headers: Optional[MutableMapping] = {},
         **kwargs
     ):
-        """Download image from url"""
+        """Download image from url.
+
+        The image is streamed into a temporary file, and loaded lazily.
+        The downloaded file is available as `source_file` of the image."""
         if url.startswith("data:"):
             content = base64.b64decode(url.split("base64,")[-1])
             return Image.open(BytesIO(content))
@@ -316,27 +423,37 @@ class Scraper(TaskManager, SoupMaker):
         headers = CaseInsensitiveDict(headers)
         headers.setdefault("Origin", None)
         headers.setdefault("Referer", None)
+        headers.setdefault(
+            "Accept",
+            "image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.9",
+        )
         timeout = kwargs.pop('timeout', None) or (3, 30)
 
-        try:
-            response = self.__process_request(
-                "get",
-                url,
-                headers=headers,
-                timeout=timeout,
-                max_retries=2,
-                **kwargs,
-            )
-            content = response.content
-            return Image.open(BytesIO(content))
-        except UnidentifiedImageError:
-            headers.setdefault(
-                "Accept",
-                "image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.9",
-            )
-            response = self.__process_request("get", url, headers=headers, **kwargs)
-            content = response.content
-            return Image.open(BytesIO(content))
+        def _read(response: Response) -> Tuple[SharedFile, Optional[str]]:
+            file = SharedFile()
+            head = b""
+            for chunk in response.iter_content(_CHUNK_SIZE):
+                if len(head) < 16:
+                    head += chunk[:16]
+                    if len(head) >= 16 and not sniff_image_type(head):
+                        break  # not to download the rest of an error page
+                file.write(chunk)
+            return file, response.headers.get("Content-Type")
+
+        file, content_type = self.__process_request(
+            "get",
+            url,
+            headers=headers,
+            timeout=timeout,
+            max_retries=2,
+            reader=_read,
+            **kwargs,
+        )
+        if not sniff_image_type(file.read_at(0, 16)):
+            raise UnidentifiedImageError(f"Not an image: {url} [{content_type}]")
+        img = Image.open(file.open())
+        setattr(img, "source_file", file)
+        return img
 
     def get_json(
         self,
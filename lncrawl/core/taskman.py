@@ -3,9 +3,12 @@ from __future__ import annotations
 import atexit
 import logging
 from abc import ABC
-from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from collections import deque
+from concurrent.futures import (FIRST_COMPLETED, Future, ThreadPoolExecutor,
+                                as_completed, wait)
 from threading import Event, Semaphore, Thread
-from typing import Callable, Generator, Iterable, List, Optional, Set, TypeVar
+from typing import (Any, Callable, Deque, Generator, Iterable, List, Optional,
+                    Set, Sized, TypeVar)
 
 from tqdm import tqdm
 
@@ -57,7 +60,7 @@ class TaskManager(ABC):
         if hasattr(self, "_executor"):
             self._submit = None
             self._executor.shutdown(wait)
-        if hasattr(self, "_limiter"):
+        if getattr(self, "_limiter", None):
             self._limiter.shutdown()
 
     def init_executor(
@@ -73,6 +76,7 @@ class TaskManager(ABC):
         Args:
         - workers (int, optional): Number of concurrent workers to expect. Default: 5.
         - ratelimit (float, optional): Number of requests per second.
+            The workers wait for their turns, so that there can be more than one.
         """
         if not self.signal:
             self.signal = Event()
@@ -81,11 +85,7 @@ class TaskManager(ABC):
 
         self.close()  # cleanup previous initialization
 
-        if ratelimit and ratelimit > 0:
-            workers = 1  # use single worker if ratelimit is being applied
-            self._limiter = RateLimiter(ratelimit)
-        elif hasattr(self, "_limiter"):
-            del self._limiter
+        self._limiter = self.create_limiter(ratelimit)
 
         self._executor = ThreadPoolExecutor(
             max_workers=workers or 1,
@@ -95,6 +95,12 @@ class TaskManager(ABC):
         self._submit = self._executor.submit
         setattr(self._executor, "submit", self.submit_task)
 
+    def create_limiter(self, ratelimit: Optional[float] = None) -> Optional[RateLimiter]:
+        """Returns the limiter to apply on the submitted tasks"""
+        if ratelimit and ratelimit > 0:
+            return RateLimiter(ratelimit)
+        return None
+
     def submit_task(self, fn: Callable[..., T], *args, **kwargs) -> Future[T]:
         """Submits a callable to be executed with the given arguments.
 
@@ -107,8 +113,8 @@ class TaskManager(ABC):
         if not self._submit:
             raise Exception("No executor is available")
 
-        if hasattr(self, "_limiter"):
-            fn = self._limiter.wrap(fn)
+        if self._limiter:
+            fn = self._limiter.wrap(fn, self.signal)
 
         f = self._submit(fn, *args, **kwargs)
         self._futures.add(f)
@@ -203,24 +209,7 @@ class TaskManager(ABC):
             for future in as_completed(futures, timeout):
                 if signal.is_set():
                     return  # canceled
-                if fail_fast:
-                    yield future.result(timeout)
-                    bar.update()
-                    continue
-                try:
-                    yield future.result(timeout)
-                except KeyboardInterrupt:
-                    signal.set()
-                    raise
-                except LNException as e:
-                    bar.clear()
-                    print(str(e))
-                except Exception as e:
-                    yield None
-                    if bar.disable:
-                        logger.info(f"Failure to resolve future. {repr(e)}")
-                finally:
-                    bar.update()
+                yield from self._yield_result(future, bar, fail_fast, signal, timeout)
         except KeyboardInterrupt:
             signal.set()
             raise
@@ -232,6 +221,113 @@ class TaskManager(ABC):
             ).start()
             bar.close()
 
+    def _yield_result(
+        self,
+        future: Future[T],
+        bar: tqdm,
+        fail_fast: bool,
+        signal: Event,
+        timeout: Optional[float] = None,
+    ) -> Generator[Optional[T], None, None]:
+        if fail_fast:
+            yield future.result(timeout)
+            bar.update()
+            return
+        try:
+            yield future.result(timeout)
+        except KeyboardInterrupt:
+            signal.set()
+            raise
+        except LNException as e:
+            bar.clear()
+            print(str(e))
+        except Exception as e:
+            yield None
+            if bar.disable:
+                logger.info(f"Failure to resolve future. {repr(e)}")
+        finally:
+            bar.update()
+
+    def map_bounded(
+        self,
+        fn: Callable[[Any], T],
+        iterable: Iterable[Any],
+        window: Optional[int] = None,
+        ordered: bool = False,
+        disable_bar: bool = False,
+        desc: Optional[str] = None,
+        unit: Optional[str] = None,
+        total: Optional[int] = None,
+        fail_fast: bool = False,
+        signal: Optional[Event] = None,
+        timeout: Optional[float] = None,
+    ) -> Generator[Optional[T], None, None]:
+        """Calls the function with each item in the executor, and yields the results.
+
+        The items are taken lazily, keeping at most `window` tasks in flight, and the
+        tasks are forgotten as soon as their results are given. The remaining tasks
+        are canceled when the generator is closed.
+
+        Args:
+            fn: The function to call with each item.
+            iterable: The items, can be a generator.
+            window: Max number of tasks in flight. Default: twice the workers.
+            ordered: Yields in the order of the items instead of the completion.
+            disable_bar: Hides the progress bar if True.
+            desc: The progress bar description
+            unit: The progress unit name
+            total: Number of items for the progress bar. Default: length of the iterable.
+            fail_fast: Fail on first error
+            signal: The abort signal
+        """
+        if not signal:
+            signal = self.signal
+        assert signal
+        if total is None and isinstance(iterable, Sized):
+            total = len(iterable)
+
+        window = max(1, window or 2 * self.workers)
+        items = iter(iterable)
+        pending: Deque[Future[T]] = deque()
+        bar = self.progress_bar(
+            total=total,
+            desc=desc,
+            unit=unit,
+            disable=disable_bar,
+        )
+        try:
+            while True:
+                for item in items:
+                    pending.append(self.submit_task(fn, item))
+                    if len(pending) >= window:
+                        break
+                if not pending:
+                    return
+
+                if ordered:
+                    done, _ = wait([pending[0]], timeout)
+                else:
+                    done, _ = wait(pending, timeout, FIRST_COMPLETED)
+                if not done:
+                    raise TimeoutError()
+                if signal.is_set():
+                    return  # canceled
+
+                if ordered:
+                    while pending and pending[0].done():
+                        future = pending.popleft()
+                        yield from self._yield_result(future, bar, fail_fast, signal)
+                else:
+                    for future in done:
+                        pending.remove(future)
+                        yield from self._yield_result(future, bar, fail_fast, signal)
+        except KeyboardInterrupt:
+            signal.set()
+            raise
+        finally:
+            self.cancel_futures(pending)
+            bar.close()
+
     def resolve_futures(
         self,
         futures: Iterable[Future[T]],
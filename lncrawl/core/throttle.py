@@ -0,0 +1,266 @@
+"""
+Adaptive limits for the requests sent to each host.
+
+A host starts with one request at a time, spaced by a few seconds. While the
+responses are quick and successful, the spacing is reduced, and then one more
+request is allowed at a time after every round of successful requests. When the
+website pushes back with 429, 503, 403 or a Cloudflare challenge, the number of
+requests at a time is halved, or the spacing is doubled if it is already one.
+
+The learned limits are saved to a file, so that the next crawl of the same
+website starts at its known-good speed.
+"""
+import atexit
+import json
+import logging
+import os
+import time
+from email.utils import parsedate_to_datetime
+from threading import Event, Lock
+from typing import Any, Dict, Optional
+
+from requests import Response
+
+from ..context import ctx
+from ..utils.ratelimit import host_limiter
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_STATUS = (403, 429, 503)
+
+_INITIAL_INTERVAL = 2.0  # seconds between the requests to an unknown host
+_INTERVAL_STEP = 0.25  # seconds to reduce after a healthy round
+_BACKOFF_INTERVAL = 0.5  # seconds between the requests after the first backoff
+_MAX_INTERVAL = 30.0
+_PROBE_ROUNDS = 4  # healthy rounds to go above the limit of the last backoff
+_MAX_RETRY_AFTER = 120.0
+_SAVE_INTERVAL = 30.0
+
+
+def _retry_after(response: Response) -> float:
+    value = response.headers.get('Retry-After')
+    if not value:
+        return 0
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return 0
+
+
+class HostThrottle:
+    """Controls the limits of one host by additive increase and multiplicative decrease"""
+
+    def __init__(
+        self,
+        owner: 'HostThrottles',
+        host: str,
+        concurrency: int = 1,
+        interval: float = _INITIAL_INTERVAL,
+    ) -> None:
+        self.owner = owner
+        self.host = host
+        self.limiter = host_limiter(host)
+        self._lock = Lock()
+        self._credit = 0
+        self._backoff_at = 0.0
+        self._ceiling = 0  # the concurrency of the last backoff
+        self.concurrency = concurrency
+        self.interval = interval
+        self.min_interval = 0.0  # by the ratelimit of the crawler
+        self.latency = 0.0  # moving average of the response time
+        self.baseline = 0.0  # response time when the host is not loaded
+        self.requests = 0
+        self.throttled = 0
+        self.updated_at = 0.0
+        self._apply()
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats: Dict[str, float] = {
+                'concurrency': self.concurrency,
+                'interval': self.interval,
+                'latency': round(self.latency, 3),
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'error_rate': round(self.throttled / self.requests, 4) if self.requests else 0,
+            }
+        limiter = self.limiter.stats
+        stats['active'] = limiter['active']
+        stats['waiting'] = limiter['waiting']
+        return stats
+
+    def _apply(self) -> None:
+        interval = max(self.interval, self.min_interval)
+        self.limiter.configure(
+            ratelimit=1 / interval if interval > 0 else 0,
+            concurrency=self.concurrency,
+        )
+
+    def limit(self, signal: Optional[Event] = None, ratelimit: Optional[float] = None):
+        """Holds a request slot of the host inside the block.
+        Yields False if it was aborted by the signal."""
+        min_interval = 1 / ratelimit if ratelimit else 0.0
+        if min_interval != self.min_interval:
+            with self._lock:
+                self.min_interval = min_interval
+                self._apply()
+        return self.limiter.limit(signal)
+
+    def feedback(self, response: Response, started: float) -> None:
+        """Adjusts the limits by the response of a request sent at the `time.monotonic()`"""
+        status = response.status_code
+        if response.headers.get('cf-mitigated') == 'challenge':
+            self.backoff('Cloudflare challenge', started, _retry_after(response))
+        elif status in THROTTLE_STATUS:
+            self.backoff(f'HTTP {status}', started, _retry_after(response))
+        elif status >= 500:
+            with self._lock:
+                self.requests += 1
+                self._credit = 0
+        else:
+            self.success(started)
+
+    def success(self, started: float) -> None:
+        latency = time.monotonic() - started
+        with self._lock:
+            self.requests += 1
+            if self.latency:
+                self.latency += 0.2 * (latency - self.latency)
+            else:
+                self.latency = latency
+            if not self.baseline or latency < self.baseline:
+                self.baseline = latency
+            else:
+                self.baseline += 0.01 * (latency - self.baseline)
+
+            if self.latency > 2 * self.baseline + 0.5:
+                self._credit = 0  # the website is slowing down
+                return
+            self._credit += 1
+            rounds = _PROBE_ROUNDS if self._ceiling and self.concurrency >= self._ceiling else 1
+            if self._credit < rounds * self.concurrency:
+                return
+            self._credit = 0
+            if self.interval > 0:
+                self.interval = max(0.0, self.interval - _INTERVAL_STEP)
+            elif self.concurrency < ctx.config.crawler.host_max_concurrency:
+                self.concurrency += 1
+            else:
+                return
+            self.updated_at = time.time()
+            self._apply()
+        logger.debug(f'Speeding up {self.host}: concurrency={self.concurrency} interval={self.interval}s')
+        self.owner.autosave()
+
+    def backoff(self, reason: str, started: float, retry_after: float = 0) -> None:
+        with self._lock:
+            self.requests += 1
+            self.throttled += 1
+            self._credit = 0
+            if retry_after > 0:
+                self.limiter.pause(min(retry_after, _MAX_RETRY_AFTER))
+
+            # the requests sent before the last backoff do not count again
+            if started < self._backoff_at:
+                return
+            self._backoff_at = time.monotonic()
+            self._ceiling = self.concurrency
+
+            if self.concurrency > 1:
+                self.concurrency = max(1, self.concurrency // 2)
+            else:
+                self.interval = min(_MAX_INTERVAL, max(_BACKOFF_INTERVAL, 2 * self.interval))
+            self.updated_at = time.time()
+            self._apply()
+        logger.info(f'Slowing down {self.host} after {reason}: concurrency={self.concurrency} interval={self.interval}s')
+        self.owner.autosave()
+
+
+class HostThrottles:
+    """The adaptive limits of all hosts in this process"""
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._hosts: Dict[str, HostThrottle] = {}
+        self._learned: Optional[Dict[str, Dict[str, Any]]] = None
+        self._saved_at = time.monotonic()
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            hosts = dict(self._hosts)
+        return {host: throttle.stats for host, throttle in hosts.items()}
+
+    def get(self, host: Optional[str]) -> HostThrottle:
+        host = (host or '').lower()
+        with self._lock:
+            throttle = self._hosts.get(host)
+            if throttle:
+                return throttle
+            if self._learned is None:
+                self._learned = self._load()
+                atexit.register(self.save)
+            learned = self._learned.get(host) or {}
+            throttle = HostThrottle(
+                self,
+                host,
+                concurrency=min(
+                    max(1, int(learned.get('concurrency', 1))),
+                    max(1, ctx.config.crawler.host_max_concurrency),
+                ),
+                interval=min(
+                    max(0.0, float(learned.get('interval', _INITIAL_INTERVAL))),
+                    _MAX_INTERVAL,
+                ),
+            )
+            self._hosts[host] = throttle
+            return throttle
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        file = ctx.config.crawler.host_limits_file
+        try:
+            if file.is_file():
+                data = json.loads(file.read_text(encoding='utf-8'))
+                if isinstance(data, dict):
+                    return {k: v for k, v in data.items() if isinstance(v, dict)}
+        except Exception as e:
+            logger.info(f'Discarding learned host limits: {repr(e)}')
+        return {}
+
+    def autosave(self) -> None:
+        if time.monotonic() - self._saved_at >= _SAVE_INTERVAL:
+            self.save()
+
+    def save(self) -> None:
+        """Saves the learned limits, keeping the newer ones saved by other processes"""
+        with self._lock:
+            self._saved_at = time.monotonic()
+            hosts = [x for x in self._hosts.values() if x.updated_at]
+            if not hosts:
+                return
+            data = self._load()
+            for throttle in hosts:
+                if data.get(throttle.host, {}).get('updated_at', 0) > throttle.updated_at:
+                    continue
+                data[throttle.host] = {
+                    'concurrency': throttle.concurrency,
+                    'interval': throttle.interval,
+                    'updated_at': throttle.updated_at,
+                }
+            self._learned = data
+            try:
+                file = ctx.config.crawler.host_limits_file
+                file.parent.mkdir(parents=True, exist_ok=True)
+                tmp_file = file.with_suffix(f'.tmp{os.getpid()}')
+                tmp_file.write_text(json.dumps(data, indent=2), encoding='utf-8')
+                tmp_file.replace(file)
+            except Exception as e:
+                logger.info(f'Failed to save learned host limits: {repr(e)}')
+
+
+host_throttles = HostThrottles()
@@ -3,7 +3,6 @@ from typing import Optional
 import sqlmodel as sa
 from pydantic import computed_field
 
-from ..context import ctx
 from ._base import BaseTable
 from .enums import OutputFormat
 
@@ -31,25 +30,17 @@ class Artifact(BaseTable, table=True):
     file_name: str = sa.Field(
         description='Artifact output file name'
     )
+    is_available: bool = sa.Field(
+        default=False,
+        description="Whether the output file is available"
+    )
+    file_size: Optional[int] = sa.Field(
+        default=None,
+        description="Output file size in bytes"
+    )
 
     @computed_field  # type: ignore[misc]
     @property
     def output_file(self) -> str:
         '''Artifact file path'''
         return f"novels/{self.novel_id}/artifacts/{self.file_name}"
-
-    @computed_field  # type: ignore[misc]
-    @property
-    def is_available(self) -> bool:
-        '''Content file is available'''
-        return ctx.files.exists(self.output_file)
-
-    @computed_field  # type: ignore[misc]
-    @property
-    def file_size(self) -> Optional[int]:
-        '''Output file size in bytes'''
-        try:
-            file = ctx.files.resolve(self.output_file)
-            return file.stat().st_size
-        except Exception:
-            return None
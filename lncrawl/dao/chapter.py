@@ -3,7 +3,6 @@ from typing import Optional
 import sqlmodel as sa
 from pydantic import computed_field
 
-from ..context import ctx
 from ._base import BaseTable
 
 
@@ -40,15 +39,21 @@ class Chapter(BaseTable, table=True):
         default=False,
         description="Whether the content has been crawled"
     )
+    is_available: bool = sa.Field(
+        default=False,
+        description="Whether the content file is available"
+    )
+    content_size: Optional[int] = sa.Field(
+        default=None,
+        description="Size of the uncompressed content in bytes"
+    )
+    content_hash: Optional[str] = sa.Field(
+        default=None,
+        description="MD5 hash of the saved content"
+    )
 
     @computed_field  # type: ignore[misc]
     @property
     def content_file(self) -> str:
-        '''Content file path'''
+        '''Content file path, kept in the pack file of the novel by the file service'''
         return f"novels/{self.novel_id}/chapters/{self.serial:06}.zst"
-
-    @computed_field  # type: ignore[misc]
-    @property
-    def is_available(self) -> bool:
-        '''Content file is available'''
-        return ctx.files.exists(self.content_file)
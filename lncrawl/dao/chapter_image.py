@@ -1,7 +1,8 @@
+from typing import Optional
+
 import sqlmodel as sa
 from pydantic import computed_field
 
-from ..context import ctx
 from ._base import BaseTable
 
 
@@ -27,15 +28,21 @@ class ChapterImage(BaseTable, table=True):
         default=False,
         description="Whether the image has been downloaded"
     )
+    is_available: bool = sa.Field(
+        default=False,
+        description="Whether the image file is available"
+    )
+    image_size: Optional[int] = sa.Field(
+        default=None,
+        description="Size of the image file in bytes"
+    )
+    image_hash: Optional[str] = sa.Field(
+        default=None,
+        description="MD5 hash of the image file"
+    )
 
     @computed_field  # type: ignore[misc]
     @property
     def image_file(self) -> str:
         '''Image file path'''
         return f"novels/{self.novel_id}/images/{self.id}.jpg"
-
-    @computed_field  # type: ignore[misc]
-    @property
-    def is_available(self) -> bool:
-        '''Image file is available'''
-        return ctx.files.exists(self.image_file)
@@ -15,6 +15,9 @@ class Job(BaseTable, table=True):
         sa.Index("ix_jobs_depends_on", 'depends_on', 'is_done'),
         sa.Index("ix_jobs_scheduler", 'status', 'done', 'type'),
         sa.Index("ix_jobs_ordering", 'priority', 'user_id', 'updated_at'),
+        sa.Index("ix_jobs_claimed_by", 'claimed_by'),
+        sa.Index("ix_jobs_root_job_id", 'root_job_id'),
+        sa.Index("ix_jobs_domain", 'domain', 'is_done'),
     )
 
     user_id: str = sa.Field(
@@ -33,6 +36,20 @@ class Job(BaseTable, table=True):
         ondelete='CASCADE',
         nullable=True,
     )
+    root_job_id: Optional[str] = sa.Field(
+        default=None,
+        nullable=True,
+        description="The top-most job of the tree, or itself for a root job"
+    )
+    depth: int = sa.Field(
+        default=0,
+        description="Distance from the root job"
+    )
+    domain: Optional[str] = sa.Field(
+        default=None,
+        nullable=True,
+        description="Host name of the website the job downloads from"
+    )
 
     type: JobType = sa.Field(
         description="The job type",
@@ -65,6 +82,18 @@ class Job(BaseTable, table=True):
         description="Job finish time (UNIX ms)"
     )
 
+    claimed_by: Optional[str] = sa.Field(
+        default=None,
+        nullable=True,
+        description="The scheduler holding the job"
+    )
+    lease_until: Optional[int] = sa.Field(
+        default=None,
+        nullable=True,
+        sa_type=sa.BigInteger,
+        description="Time until the claim is valid (UNIX ms)"
+    )
+
     done: int = sa.Field(
         default=0,
         description="Total completed items"
@@ -3,7 +3,6 @@ from typing import List, Optional
 import sqlmodel as sa
 from pydantic import computed_field
 
-from ..context import ctx
 from ._base import BaseTable
 
 
@@ -66,15 +65,13 @@ class Novel(BaseTable, table=True):
         default=0,
         description="Number of available chapters",
     )
+    cover_available: bool = sa.Field(
+        default=False,
+        description="Whether the cover image file is available",
+    )
 
     @computed_field  # type: ignore[misc]
     @property
     def cover_file(self) -> str:
         '''Cover image file path'''
         return f"novels/{self.id}/cover.jpg"
-
-    @computed_field  # type: ignore[misc]
-    @property
-    def cover_available(self) -> bool:
-        '''Whether the cover image file is available'''
-        return ctx.files.exists(self.cover_file)
@@ -0,0 +1,38 @@
+"""Job leases
+
+Revision ID: 9d3e41b7c2a0
+Revises: 2c1b5463eecb
+Create Date: 2026-10-18 09:12:41.318520
+"""
+
+from typing import Sequence, Union
+
+import sqlmodel as sa
+from alembic import op
+from sqlmodel.sql.sqltypes import AutoString
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9d3e41b7c2a0"
+down_revision: Union[str, Sequence[str], None] = "2c1b5463eecb"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+try:
+    dialect = op.get_context().dialect.name
+except Exception:
+    dialect = ''
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("jobs", sa.Column("claimed_by", AutoString(), nullable=True))
+    op.add_column("jobs", sa.Column("lease_until", sa.BigInteger(), nullable=True))
+    op.create_index(op.f("ix_jobs_claimed_by"), "jobs", ["claimed_by"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_jobs_claimed_by"), "jobs")
+    op.drop_column("jobs", "lease_until")
+    op.drop_column("jobs", "claimed_by")
@@ -0,0 +1,80 @@
+"""Job tree columns
+
+Revision ID: 5f0c8a2d91e4
+Revises: 9d3e41b7c2a0
+Create Date: 2026-10-18 15:40:06.204117
+"""
+
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import sqlmodel as sa
+from alembic import op
+from sqlmodel.sql.sqltypes import AutoString
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5f0c8a2d91e4"
+down_revision: Union[str, Sequence[str], None] = "9d3e41b7c2a0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+try:
+    dialect = op.get_context().dialect.name
+except Exception:
+    dialect = ''
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("jobs", sa.Column("root_job_id", AutoString(), nullable=True))
+    op.add_column("jobs", sa.Column("depth", sa.Integer(), server_default=sa.literal(0), nullable=False))
+    op.create_index(op.f("ix_jobs_root_job_id"), "jobs", ["root_job_id"], unique=False)
+
+    # fill the root and depth of the existing jobs
+    jobs = sa.table(
+        "jobs",
+        sa.column("id", AutoString()),
+        sa.column("parent_job_id", AutoString()),
+        sa.column("root_job_id", AutoString()),
+        sa.column("depth", sa.Integer()),
+    )
+    conn = op.get_bind()
+    parents: Dict[str, Optional[str]] = {
+        id: parent_id
+        for id, parent_id in conn.execute(sa.select(jobs.c.id, jobs.c.parent_job_id))
+    }
+    resolved: Dict[str, Tuple[str, int]] = {}
+
+    def resolve(job_id: str) -> Tuple[str, int]:
+        chain = []
+        while job_id not in resolved:
+            parent_id = parents.get(job_id)
+            if not parent_id or parent_id not in parents:
+                resolved[job_id] = (job_id, 0)
+                break
+            chain.append(job_id)
+            job_id = parent_id
+        root_id, depth = resolved[job_id]
+        for id in reversed(chain):
+            depth += 1
+            resolved[id] = (root_id, depth)
+        return resolved[chain[0]] if chain else resolved[job_id]
+
+    values = [
+        {"_id": id, "_root_job_id": root_id, "_depth": depth}
+        for id, (root_id, depth) in ((id, resolve(id)) for id in parents)
+    ]
+    stmt = (
+        sa.update(jobs)
+        .where(jobs.c.id == sa.bindparam("_id"))
+        .values(root_job_id=sa.bindparam("_root_job_id"), depth=sa.bindparam("_depth"))
+    )
+    for i in range(0, len(values), 1000):
+        conn.execute(stmt, values[i:i + 1000])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_jobs_root_job_id"), "jobs")
+    op.drop_column("jobs", "depth")
+    op.drop_column("jobs", "root_job_id")
@@ -0,0 +1,118 @@
+"""Job domain
+
+Revision ID: b71e2f4c6a93
+Revises: 5f0c8a2d91e4
+Create Date: 2026-10-18 17:12:44.518306
+"""
+
+from typing import Any, Dict, Optional, Sequence, Union
+from urllib.parse import urlparse
+
+import sqlmodel as sa
+from alembic import op
+from sqlmodel.sql.sqltypes import AutoString
+
+from lncrawl.dao import enums
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b71e2f4c6a93"
+down_revision: Union[str, Sequence[str], None] = "5f0c8a2d91e4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+try:
+    dialect = op.get_context().dialect.name
+except Exception:
+    dialect = ''
+
+_HOST_BOUND_TYPES = [
+    enums.JobType.NOVEL,
+    enums.JobType.FULL_NOVEL,
+    enums.JobType.CHAPTER,
+    enums.JobType.CHAPTER_BATCH,
+    enums.JobType.VOLUME,
+    enums.JobType.IMAGE,
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("jobs", sa.Column("domain", AutoString(), nullable=True))
+    op.create_index(op.f("ix_jobs_domain"), "jobs", ["domain", "is_done"], unique=False)
+
+    # fill the domain of the unfinished jobs
+    jobs = sa.table(
+        "jobs",
+        sa.column("id", AutoString()),
+        sa.column("type", sa.Enum(enums.JobType, name="jobtype")),
+        sa.column("is_done", sa.Boolean()),
+        sa.column("extra", sa.JSON()),
+        sa.column("domain", AutoString()),
+    )
+    novels = sa.table(
+        "novels",
+        sa.column("id", AutoString()),
+        sa.column("domain", AutoString()),
+    )
+    chapters = sa.table(
+        "chapters",
+        sa.column("id", AutoString()),
+        sa.column("novel_id", AutoString()),
+    )
+    volumes = sa.table(
+        "volumes",
+        sa.column("id", AutoString()),
+        sa.column("novel_id", AutoString()),
+    )
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.select(jobs.c.id, jobs.c.extra)
+        .where(jobs.c.is_done == sa.false())
+        .where(jobs.c.type.in_(_HOST_BOUND_TYPES))
+    ).all()
+    if not rows:
+        return
+
+    novel_domains: Dict[str, str] = {
+        id: domain
+        for id, domain in conn.execute(sa.select(novels.c.id, novels.c.domain))
+    }
+
+    def domain_of(table: Any, id: str) -> Optional[str]:
+        novel_id = conn.execute(
+            sa.select(table.c.novel_id)
+            .where(table.c.id == id)
+        ).scalar()
+        return novel_domains.get(novel_id or '')
+
+    values = []
+    for id, extra in rows:
+        extra = extra or {}
+        domain = None
+        if extra.get("url"):
+            domain = urlparse(extra["url"]).hostname
+        elif extra.get("novel_id"):
+            domain = novel_domains.get(extra["novel_id"])
+        elif extra.get("chapter_id"):
+            domain = domain_of(chapters, extra["chapter_id"])
+        elif extra.get("chapter_ids"):
+            domain = domain_of(chapters, extra["chapter_ids"][0])
+        elif extra.get("volume_id"):
+            domain = domain_of(volumes, extra["volume_id"])
+        if domain:
+            values.append({"_id": id, "_domain": domain})
+
+    stmt = (
+        sa.update(jobs)
+        .where(jobs.c.id == sa.bindparam("_id"))
+        .values(domain=sa.bindparam("_domain"))
+    )
+    for i in range(0, len(values), 1000):
+        conn.execute(stmt, values[i:i + 1000])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_jobs_domain"), "jobs")
+    op.drop_column("jobs", "domain")
@@ -0,0 +1,146 @@
+"""File availability columns
+
+Revision ID: 3c8e5a17d4f2
+Revises: b71e2f4c6a93
+Create Date: 2026-10-18 21:05:37.640219
+"""
+
+from typing import Sequence, Union
+
+import sqlmodel as sa
+from alembic import op
+from sqlmodel.sql.sqltypes import AutoString
+
+from lncrawl.context import ctx
+from lncrawl.utils.packfile import PackFile
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3c8e5a17d4f2"
+down_revision: Union[str, Sequence[str], None] = "b71e2f4c6a93"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+try:
+    dialect = op.get_context().dialect.name
+except Exception:
+    dialect = ''
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("chapters", sa.Column("is_available", sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.add_column("chapters", sa.Column("content_size", sa.Integer(), nullable=True))
+    op.add_column("chapters", sa.Column("content_hash", AutoString(), nullable=True))
+    op.add_column("chapter_images", sa.Column("is_available", sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.add_column("chapter_images", sa.Column("image_size", sa.Integer(), nullable=True))
+    op.add_column("chapter_images", sa.Column("image_hash", AutoString(), nullable=True))
+    op.add_column("novels", sa.Column("cover_available", sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.add_column("artifacts", sa.Column("is_available", sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.add_column("artifacts", sa.Column("file_size", sa.Integer(), nullable=True))
+
+    # fill the availability of the existing files. the size and hash of the
+    # chapter contents need decompression, they are filled by `lncrawl dev reconcile`.
+    novels = sa.table(
+        "novels",
+        sa.column("id", AutoString()),
+        sa.column("cover_available", sa.Boolean()),
+    )
+    chapters = sa.table(
+        "chapters",
+        sa.column("novel_id", AutoString()),
+        sa.column("serial", sa.Integer()),
+        sa.column("is_available", sa.Boolean()),
+    )
+    images = sa.table(
+        "chapter_images",
+        sa.column("id", AutoString()),
+        sa.column("is_available", sa.Boolean()),
+        sa.column("image_size", sa.Integer()),
+    )
+    artifacts = sa.table(
+        "artifacts",
+        sa.column("id", AutoString()),
+        sa.column("novel_id", AutoString()),
+        sa.column("file_name", AutoString()),
+        sa.column("is_available", sa.Boolean()),
+        sa.column("file_size", sa.Integer()),
+    )
+    conn = op.get_bind()
+    novels_dir = ctx.config.app.output_path / "novels"
+    novel_ids = [
+        id for id, in conn.execute(sa.select(novels.c.id))
+        if (novels_dir / id).is_dir()
+    ]
+    if not novel_ids:
+        return
+
+    update_chapters = (
+        sa.update(chapters)
+        .where(chapters.c.novel_id == sa.bindparam("_novel_id"))
+        .where(chapters.c.serial == sa.bindparam("_serial"))
+        .values(is_available=True)
+    )
+    update_images = (
+        sa.update(images)
+        .where(images.c.id == sa.bindparam("_id"))
+        .values(is_available=True, image_size=sa.bindparam("_size"))
+    )
+    for novel_id in novel_ids:
+        folder = novels_dir / novel_id
+        if (folder / "cover.jpg").is_file():
+            conn.execute(
+                sa.update(novels)
+                .where(novels.c.id == novel_id)
+                .values(cover_available=True)
+            )
+
+        serials = set(
+            int(file.stem)
+            for file in (folder / "chapters").glob("*.zst")
+            if file.stem.isdigit()
+        )
+        pack = PackFile(folder / "chapters")
+        serials.update(pack.keys())
+        pack.close()
+        values = [
+            {"_novel_id": novel_id, "_serial": serial}
+            for serial in serials
+        ]
+        for i in range(0, len(values), 1000):
+            conn.execute(update_chapters, values[i:i + 1000])
+
+        values = [
+            {"_id": file.stem, "_size": file.stat().st_size}
+            for file in (folder / "images").glob("*.jpg")
+        ]
+        for i in range(0, len(values), 1000):
+            conn.execute(update_images, values[i:i + 1000])
+
+    values = []
+    for id, novel_id, file_name in conn.execute(
+        sa.select(artifacts.c.id, artifacts.c.novel_id, artifacts.c.file_name)
+    ):
+        file = novels_dir / novel_id / "artifacts" / file_name
+        if file.is_file():
+            values.append({"_id": id, "_size": file.stat().st_size})
+    if values:
+        conn.execute(
+            sa.update(artifacts)
+            .where(artifacts.c.id == sa.bindparam("_id"))
+            .values(is_available=True, file_size=sa.bindparam("_size")),
+            values,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("artifacts", "file_size")
+    op.drop_column("artifacts", "is_available")
+    op.drop_column("novels", "cover_available")
+    op.drop_column("chapter_images", "image_hash")
+    op.drop_column("chapter_images", "image_size")
+    op.drop_column("chapter_images", "is_available")
+    op.drop_column("chapters", "content_hash")
+    op.drop_column("chapters", "content_size")
+    op.drop_column("chapters", "is_available")
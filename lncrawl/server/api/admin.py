@@ -1,3 +1,5 @@
+from typing import Dict
+
 from fastapi import APIRouter
 
 from ...context import ctx
@@ -18,6 +20,36 @@ def status() -> bool:
     return bool(ctx.scheduler.running)
 
 
+@router.get("/runner/crawler-pool", summary='Get crawler pool metrics')
+def crawler_pool() -> Dict[str, float]:
+    return ctx.crawler.pool.stats
+
+
+@router.get("/runner/hosts", summary='Get the request limits and error rates of each host')
+def hosts() -> Dict[str, Dict[str, float]]:
+    return ctx.crawler.throttles.stats
+
+
+@router.get("/runner/http-cache", summary='Get the size and hit rate of the response cache')
+def http_cache() -> Dict[str, float]:
+    return ctx.crawler.http_cache.stats
+
+
+@router.get("/runner/coalesced-requests", summary='Get the number of identical requests merged')
+def coalesced_requests() -> Dict[str, float]:
+    return ctx.crawler.coalescer.stats
+
+
+@router.get("/runner/queue-latency", summary='Get the time taken to start the recent jobs')
+def queue_latency() -> Dict[str, int]:
+    return ctx.scheduler.queue_latency
+
+
+@router.get("/runner/domains", summary='Get the pending and active jobs of each domain')
+def domains() -> Dict[str, Dict[str, int]]:
+    return ctx.jobs.domain_stats()
+
+
 @router.post("/runner/start", summary='Start the runner')
 def start() -> bool:
     ctx.scheduler.start()
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from fastapi import FastAPI
@@ -13,13 +14,19 @@ from .middleware.staticfiles import CustomStaticFiles, StaticFilesGuard
 
 web_dir = (Path(__file__).parent / 'web').absolute()
 
+
+def start_scheduler():
+    runners = os.getenv('LNCRAWL_RUNNERS')
+    ctx.scheduler.start(int(runners) if runners else None)
+
+
 app = FastAPI(
     version=get_version(),
     title="Lightnovel Crawler",
     description="Download novels from online sources and generate e-books",
     on_startup=[
         ctx.setup,
-        ctx.scheduler.start,
+        start_scheduler,
     ],
     on_shutdown=[ctx.destroy],
 )
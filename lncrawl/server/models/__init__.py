@@ -6,7 +6,8 @@ from .job import (FetchChaptersRequest, FetchImagesRequest, FetchNovelRequest,
 from .library import LibraryCreateRequest, LibraryItem, LibraryUpdateRequest
 from .novel import ReadChapterResponse
 from .pagination import Paginated
-from .sources import AppInfo, CrawlerIndex, CrawlerInfo, SourceItem
+from .sources import (AppInfo, CrawlerIndex, CrawlerInfo, ScanCache,
+                      ScannedCrawler, ScannedFile, SourceItem)
 from .user import (CreateRequest, ForgotPasswordRequest, LoginRequest,
                    LoginResponse, NameUpdateRequest, PasswordUpdateRequest,
                    PutNotificationRequest, ResetPasswordRequest, SignupRequest,
@@ -17,6 +18,9 @@ __all__ = [
     "AppInfo",
     "CrawlerInfo",
     "CrawlerIndex",
+    "ScanCache",
+    "ScannedCrawler",
+    "ScannedFile",
     "SourceItem",
     # crawler
     "LoginData",
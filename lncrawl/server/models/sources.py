@@ -50,6 +50,31 @@ class CrawlerIndex(BaseModel):
     crawlers: Dict[str, CrawlerInfo] = Field(default_factory=dict, description='Dictionary of crawlers')
 
 
+class ScannedCrawler(BaseModel):
+    id: str = Field(..., description='Unique identifier')
+    name: str = Field(..., description='Crawler class name')
+    module: str = Field(..., description='Crawler module name')
+    file: str = Field(..., description='Absolute path of the crawler module')
+    version: int = Field(..., description='Last edit time of the crawler module')
+    base_urls: List[str] = Field(..., description='List of base URLs')
+    has_mtl: bool = Field(default=False, description='True if the crawler supports machine translation')
+    has_manga: bool = Field(default=False, description='True if the crawler supports manga')
+    can_search: bool = Field(default=False, description='True if the crawler supports search')
+    can_login: bool = Field(default=False, description='True if the crawler supports login')
+    keys: List[str] = Field(default=[], description='Keys to find the crawler in source search')
+
+
+class ScannedFile(BaseModel):
+    mtime: int = Field(..., description='Modification time of the file in nanoseconds')
+    size: int = Field(..., description='Size of the file in bytes')
+    crawlers: List[ScannedCrawler] = Field(default=[], description='Crawlers found in the file')
+
+
+class ScanCache(BaseModel):
+    app: str = Field(..., description='Application version that made the scan')
+    files: Dict[str, ScannedFile] = Field(default_factory=dict, description='Map of file path -> scan')
+
+
 class SourceItem(BaseModel):
     url: str = Field(description='Source base url')
     domain: str = Field(description='Domain name')
@@ -66,11 +91,15 @@ class SourceItem(BaseModel):
     total_novels: int = Field(default=0, description='Total number of novels')
 
     info: CrawlerInfo = Field(..., exclude=True, description='Crawler information')
-    crawler: Type[Crawler] = Field(..., exclude=True, description='Crawler class')
+
+    @cached_property
+    def crawler(self) -> Type[Crawler]:
+        """The crawler class. Imports the crawler module if it is not imported yet."""
+        return ctx.sources.load_crawler(self.info.id)
 
     @cached_property
     def current_file(self):
-        return Path(getattr(self.crawler, '__file__'))
+        return Path(ctx.sources.scans[self.info.id].file)
 
     def __hash__(self) -> int:
         return hash(self.info.id)
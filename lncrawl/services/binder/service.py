@@ -93,6 +93,8 @@ class BinderService:
                 artifact=artifact,
                 epub=epub
             )
+            artifact.file_size = ctx.files.size(artifact.output_file)
+            artifact.is_available = artifact.file_size is not None
             with ctx.db.session() as sess:
                 sess.add(artifact)
                 sess.commit()
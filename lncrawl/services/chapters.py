@@ -7,6 +7,11 @@ from ..dao import Chapter, User, Volume
 from ..exceptions import ServerErrors
 from ..models import Chapter as ModelChapter
 from ..server.models import Paginated, ReadChapterResponse
+from ..utils.text_tools import generate_uuid
+from ..utils.time_utils import current_timestamp
+
+# rows to read or delete at once while syncing
+_CHUNK_SIZE = 1000
 
 
 class ChapterService:
@@ -129,7 +134,7 @@ class ChapterService:
             chapter = sess.get(Chapter, chapter_id)
             if not chapter:
                 return
-            ctx.files.resolve(chapter.content_file).unlink(True)
+            ctx.files.delete(chapter.content_file)
             sess.delete(chapter)
             sess.commit()
 
@@ -165,91 +170,79 @@ class ChapterService:
             previous_id=previous_id,
         )
 
-    def sync(self, novel_id: str, chapters: List[ModelChapter]):
+    def sync(self, novel_id: str, chapters: List[ModelChapter]) -> Dict[str, int]:
+        """Updates the chapters of the novel to the crawled ones.
+        Returns the number of rows inserted, updated and deleted."""
         with ctx.db.session() as sess:
             vol_id_map: Dict[Optional[int], str] = {
-                v.serial: v.id
-                for v in sess.exec(
-                    sq.select(Volume)
+                serial: id
+                for serial, id in sess.exec(
+                    sq.select(Volume.serial, Volume.id)
                     .where(Volume.novel_id == novel_id)
                 ).all()
             }
 
             wanted = {
-                c.id: c for c in chapters
+                c.id: (c.url, c.title, vol_id_map.get(c.volume))
+                for c in chapters
             }
-            existing = {
-                c.serial: c
-                for c in sess.exec(
-                    sq.select(Chapter)
-                    .where(Chapter.novel_id == novel_id)
-                ).all()
+            changed = set()
+            to_delete = []
+            for serial, url, title, volume_id in sess.exec(
+                sq.select(Chapter.serial, Chapter.url, Chapter.title, Chapter.volume_id)
+                .where(Chapter.novel_id == novel_id)
+                .execution_options(yield_per=_CHUNK_SIZE)
+            ):
+                item = wanted.pop(serial, None)
+                if item is None:
+                    to_delete.append(serial)
+                elif item != (url, title, volume_id):
+                    changed.add(serial)
+            to_insert = set(wanted.keys())
+
+            now = current_timestamp()
+            items = {
+                c.id: c
+                for c in chapters
+                if c.id in to_insert or c.id in changed
             }
+            ctx.db.upsert(
+                sess,
+                Chapter,
+                (
+                    {
+                        'id': generate_uuid(),
+                        'created_at': now,
+                        'updated_at': now,
+                        'extra': dict(c.extra),
+                        'novel_id': novel_id,
+                        'serial': serial,
+                        'volume_id': vol_id_map.get(c.volume),
+                        'url': c.url,
+                        'title': c.title,
+                        'is_done': False,
+                        'is_available': False,
+                    }
+                    for serial, c in sorted(items.items())
+                ),
+                keys=['novel_id', 'serial'],
+                update=['updated_at', 'volume_id', 'url', 'title'],
+            )
 
-            wk = set(wanted.keys())
-            ek = set(existing.keys())
-            to_insert = wk - ek
-            to_delete = ek - wk
-            to_update = ek & wk
-
-            if to_insert:
-                sess.exec(
-                    sq.insert(Chapter),
-                    params=[
-                        Chapter(
-                            serial=s,
-                            novel_id=novel_id,
-                            url=wanted[s].url,
-                            title=wanted[s].title,
-                            extra=dict(wanted[s].extra),
-                            volume_id=vol_id_map.get(wanted[s].volume),
-                        ).model_dump()
-                        for s in to_insert
-                    ]
-                )
-
-            if to_update:
-                url_updates = {}
-                title_updates = {}
-                volume_updates = {}
-                for s in to_update:
-                    r = existing[s]
-                    url = wanted[s].url
-                    title = wanted[s].title
-                    vol_id = vol_id_map.get(wanted[s].volume)
-                    if r.url != url:
-                        url_updates[r.id] = url
-                    if r.title != title:
-                        title_updates[r.id] = title
-                    if r.volume_id != vol_id:
-                        volume_updates[r.id] = vol_id
-                if url_updates:
-                    sess.exec(
-                        sq.update(Chapter)
-                        .where(sq.col(Chapter.id).in_(url_updates.keys()))
-                        .values(url=sq.case(url_updates, value=Chapter.id))
-                    )
-                if title_updates:
-                    sess.exec(
-                        sq.update(Chapter)
-                        .where(sq.col(Chapter.id).in_(title_updates.keys()))
-                        .values(title=sq.case(title_updates, value=Chapter.id))
-                    )
-                if volume_updates:
-                    sess.exec(
-                        sq.update(Chapter)
-                        .where(sq.col(Chapter.id).in_(volume_updates.keys()))
-                        .values(volume_id=sq.case(volume_updates, value=Chapter.id))
-                    )
-
-            if to_delete:
+            for i in range(0, len(to_delete), _CHUNK_SIZE):
                 sess.exec(
                     sq.delete(Chapter)
                     .where(sq.col(Chapter.novel_id) == novel_id)
-                    .where(sq.col(Chapter.serial).in_(to_delete))
+                    .where(sq.col(Chapter.serial).in_(to_delete[i:i + _CHUNK_SIZE]))
                 )
-                for serial in to_delete:
-                    file = existing[serial].content_file
-                    ctx.files.resolve(file).unlink(True)
 
             sess.commit()
+
+        for serial in to_delete:
+            ctx.files.delete(Chapter(novel_id=novel_id, serial=serial).content_file)
+
+        return {
+            'inserted': len(to_insert),
+            'updated': len(changed),
+            'deleted': len(to_delete),
+        }
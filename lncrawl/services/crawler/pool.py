@@ -0,0 +1,157 @@
+import logging
+import time
+from contextlib import contextmanager
+from threading import Event, Lock
+from typing import Dict, Generator, List, Optional, Tuple, Type
+
+from ...context import ctx
+from ...core.crawler import Crawler
+from ...utils.url_tools import extract_base
+
+logger = logging.getLogger(__name__)
+
+# (user id, crawler id, base url)
+PoolKey = Tuple[str, str, str]
+
+
+class _PooledCrawler:
+    def __init__(self, key: PoolKey, crawler: Crawler) -> None:
+        self.key = key
+        self.crawler = crawler
+        self.created_at = time.monotonic()
+        self.returned_at = self.created_at
+
+
+class CrawlerPool:
+    """A bounded pool of initialized crawlers, keyed by the user and the crawler.
+
+    A crawler is checked out for the exclusive use of one thread, and is checked
+    in after the job is done, keeping the session cookies, the logged in state and
+    the open connections for the next job. Idle crawlers are closed after the TTL
+    expires, or when the pool is full.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._idle: List[_PooledCrawler] = []  # oldest first
+        self._busy: Dict[int, _PooledCrawler] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    @property
+    def size(self) -> int:
+        return ctx.config.crawler.crawler_pool_size
+
+    @property
+    def ttl(self) -> float:
+        return ctx.config.crawler.crawler_pool_ttl
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'idle': len(self._idle),
+                'busy': len(self._busy),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evicted': self.evicted,
+                'hit_rate': round(self.hits / total, 4) if total else 0,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            expired = self._idle
+            self._idle = []
+        self._close_all(expired)
+
+    def discard(self, user_id: str) -> None:
+        """Closes the idle crawlers of an user, e.g. after the logins are changed"""
+        with self._lock:
+            expired = [item for item in self._idle if item.key[0] == user_id]
+            self._idle = [item for item in self._idle if item.key[0] != user_id]
+            self.evicted += len(expired)
+        self._close_all(expired)
+
+    @contextmanager
+    def checkout(
+        self,
+        user_id: str,
+        novel_url: str,
+        signal=Event(),
+    ) -> Generator[Crawler, None, None]:
+        """Gives a crawler for the novel url, logged in with the user's login.
+
+        The crawler is returned to the pool when the block exits normally,
+        otherwise it is closed, since its state can not be trusted anymore.
+        """
+        constructor = ctx.sources.get_crawler(novel_url)
+        key: PoolKey = (user_id, getattr(constructor, '__id__'), extract_base(novel_url))
+        item = self._acquire(key, constructor)
+        if item:
+            logger.debug(f'Reusing crawler for {key}')
+        else:
+            crawler = ctx.crawler.get_crawler(user_id, novel_url)
+            item = _PooledCrawler(key, crawler)
+
+        crawler = item.crawler
+        crawler.novel_url = novel_url
+        crawler.scraper.signal = signal
+        with self._lock:
+            self._busy[id(crawler)] = item
+        try:
+            yield crawler
+        except BaseException:
+            with self._lock:
+                self._busy.pop(id(crawler), None)
+            self._close_all([item])
+            raise
+        self._release(item)
+
+    def _acquire(self, key: PoolKey, constructor: Type[Crawler]) -> Optional[_PooledCrawler]:
+        with self._lock:
+            expired = self._pop_expired()
+            found = None
+            for i in reversed(range(len(self._idle))):
+                item = self._idle[i]
+                if item.key != key:
+                    continue
+                self._idle.pop(i)
+                if type(item.crawler) is constructor:
+                    found = item
+                else:
+                    expired.append(item)  # the source was updated
+                break
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self.evicted += len(expired)
+        self._close_all(expired)
+        return found
+
+    def _release(self, item: _PooledCrawler) -> None:
+        item.returned_at = time.monotonic()
+        with self._lock:
+            self._busy.pop(id(item.crawler), None)
+            self._idle.append(item)
+            expired = self._pop_expired()
+            while len(self._idle) > max(0, self.size):
+                expired.append(self._idle.pop(0))
+            self.evicted += len(expired)
+        self._close_all(expired)
+
+    def _pop_expired(self) -> List[_PooledCrawler]:
+        deadline = time.monotonic() - self.ttl
+        expired = [item for item in self._idle if item.returned_at < deadline]
+        if expired:
+            self._idle = [item for item in self._idle if item.returned_at >= deadline]
+        return expired
+
+    def _close_all(self, items: List[_PooledCrawler]) -> None:
+        for item in items:
+            try:
+                item.crawler.close()
+            except Exception as e:
+                logger.debug(f'Failed to close crawler for {item.key} | {e}')
@@ -1,15 +1,21 @@
 import logging
 from threading import Event
-from typing import Optional, Union
+from typing import Any, Dict, Optional, Union
 
 from pydantic import HttpUrl
 from sqlmodel import select
 
 from ...context import ctx
+from ...core.coalesce import request_coalescer
 from ...core.crawler import Crawler
+from ...core.http_cache import http_cache
+from ...core.throttle import host_throttles
 from ...dao import Chapter, ChapterImage, Novel
 from ...exceptions import ServerErrors
 from ...models import Chapter as ChapterModel
+from ...utils.file_tools import file_md5
+from ...utils.text_tools import generate_md5
+from .pool import CrawlerPool
 from .utils import download_cover, download_image, format_novel
 
 logger = logging.getLogger(__name__)
@@ -17,7 +23,14 @@ logger = logging.getLogger(__name__)
 
 class CrawlerService:
     def __init__(self) -> None:
-        pass
+        self.pool = CrawlerPool()
+        self.throttles = host_throttles
+        self.http_cache = http_cache
+        self.coalescer = request_coalescer
+
+    def close(self) -> None:
+        self.pool.close()
+        self.throttles.save()
 
     def get_crawler(self, user_id: str, novel_url: str):
         constructor = ctx.sources.get_crawler(novel_url)
@@ -98,6 +111,10 @@ class CrawlerService:
 
         # download cover
         download_cover(crawler, ctx.files.resolve(novel.cover_file))
+        with ctx.db.session() as sess:
+            novel.cover_available = ctx.files.size(novel.cover_file) is not None
+            sess.add(novel)
+            sess.commit()
 
         # update output path time
         ctx.files.utime(f'novels/{novel.id}')
@@ -108,6 +125,19 @@ class CrawlerService:
 
         return novel
 
+    def _should_refetch(self, extra: Dict[str, Any], crawler: Crawler) -> bool:
+        """Whether to download an available chapter again by the refetch policy"""
+        policy = ctx.config.crawler.refetch_policy
+        if policy == 'never':
+            return False
+        if policy == 'always':
+            return True
+        fingerprint = extra.get('crawler_fingerprint')
+        if fingerprint:
+            return fingerprint != getattr(crawler, 'fingerprint', None)
+        # saved before the fingerprints
+        return extra.get('crawler_version') != getattr(crawler, 'version')
+
     def fetch_chapter(
         self,
         user_id: str,
@@ -121,16 +151,16 @@ class CrawlerService:
             raise ServerErrors.invalid_url
 
         # get crawler
-        can_close = False
         if crawler is None:
             novel_url = ctx.novels.get(chapter.novel_id).url
-            crawler = self.get_crawler(user_id, novel_url)
-            can_close = True
+            with self.pool.checkout(user_id, novel_url, signal) as crawler:
+                return self.fetch_chapter(user_id, chapter_id, signal, crawler)
         crawler_version = getattr(crawler, 'version')
+        fingerprint = getattr(crawler, 'fingerprint', None)
         crawler.scraper.signal = signal
 
         # check if download is necessary
-        if chapter.is_available and chapter.extra.get('crawler_version') == crawler_version:
+        if chapter.is_available and not self._should_refetch(chapter.extra, crawler):
             return chapter
 
         # get chapter content
@@ -143,24 +173,33 @@ class CrawlerService:
         model.body = crawler.download_chapter_body(model).strip()
         crawler.extract_chapter_images(model)
 
-        # save chapter content
-        ctx.files.save_text(chapter.content_file, model.body)
+        # the size and hash are of the content as saved, with the images replaced
+        content_size = len(model.body.encode())
+        content_hash = generate_md5(model.body)
+
+        # the same content is not saved again
+        if not (chapter.is_available and chapter.content_hash == content_hash):
+            # save chapter content
+            domain = ctx.novels.get(chapter.novel_id).domain
+            ctx.files.save_text(chapter.content_file, model.body, domain=domain)
 
-        # save chapter images
-        ctx.images.sync(chapter, model.images)
+            # save chapter images
+            ctx.images.sync(chapter, model.images)
 
         # update db
         with ctx.db.session() as sess:
             chapter.is_done = True
+            chapter.is_available = True
+            chapter.content_size = content_size
+            chapter.content_hash = content_hash
             chapter.title = model.title
-            chapter.extra['crawler_version'] = crawler_version
+            extra = dict(chapter.extra)
+            extra['crawler_version'] = crawler_version
+            extra['crawler_fingerprint'] = fingerprint
+            chapter.extra = extra
             sess.add(chapter)
             sess.commit()
 
-        # close crawler
-        if can_close:
-            crawler.close()
-
         return chapter
 
     def fetch_image(
@@ -176,31 +215,30 @@ class CrawlerService:
             raise ServerErrors.invalid_url
 
         # get crawler
-        can_close = False
         if crawler is None:
             novel_url = ctx.novels.get(image.novel_id).url
-            crawler = self.get_crawler(user_id, novel_url)
-            can_close = True
+            with self.pool.checkout(user_id, novel_url, signal) as crawler:
+                return self.fetch_image(user_id, image_id, signal, crawler)
         crawler_version = getattr(crawler, 'version')
         crawler.scraper.signal = signal
 
-        # check if download is necessary
-        if image.is_available and image.extra.get('crawler_version') == crawler_version:
+        # check if download is necessary.
+        # the images do not depend on the parser, only on their url.
+        if image.is_available and ctx.config.crawler.refetch_policy != 'always':
             return image
 
         # download image
         file = ctx.files.resolve(image.image_file)
-        download_image(crawler, url.encoded_string(), file)
+        download_image(crawler, url.encoded_string(), file, overwrite=image.is_available)
 
         # update db
         with ctx.db.session() as sess:
             image.is_done = file.is_file()
-            image.extra['crawler_version'] = crawler_version
+            image.is_available = image.is_done
+            image.image_size = file.stat().st_size if image.is_done else None
+            image.image_hash = file_md5(file) if image.is_done else None
+            image.extra = dict(image.extra, crawler_version=crawler_version)
             sess.add(image)
             sess.commit()
 
-        # close crawler
-        if can_close:
-            crawler.close()
-
         return image
@@ -2,6 +2,7 @@ import logging
 import math
 import os
 import re
+import shutil
 from pathlib import Path
 from typing import Dict
 
@@ -78,6 +79,14 @@ def format_novel(crawler: Crawler):
 
 
 def __save_image(img: Image, file: Path) -> None:
+    source = getattr(img, "source_file", None)
+    if source and img.format == "JPEG" and img.mode in ("L", "RGB"):
+        # store the downloaded file as it is, without decoding
+        file.parent.mkdir(parents=True, exist_ok=True)
+        with source.open() as src, open(file, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        return
+
     if img.mode not in ("L", "RGB", "YCbCr", "RGBX"):
         if img.mode == "RGBa":
             img = img.convert("RGBA").convert("RGB")
@@ -88,11 +97,11 @@ def __save_image(img: Image, file: Path) -> None:
     img.save(str(file.as_posix()), "JPEG", optimized=True)
 
 
-def download_image(crawler: Crawler, url: str, image_file: Path):
+def download_image(crawler: Crawler, url: str, image_file: Path, overwrite: bool = False):
     if not url:
         return
 
-    if image_file.is_file():
+    if image_file.is_file() and not overwrite:
         os.utime(image_file)
         return
 
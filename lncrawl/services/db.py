@@ -1,7 +1,7 @@
 import logging
 from functools import cached_property
 from pathlib import Path
-from typing import Mapping, Optional, Sequence
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Type
 from urllib.parse import urlparse
 
 import sqlmodel as sa
@@ -9,11 +9,24 @@ from alembic import command
 from alembic.config import Config
 from alembic.runtime.migration import MigrationContext
 from alembic.script import ScriptDirectory
+from sqlalchemy import event as sa_event
+from sqlalchemy.engine import make_url
 
 from ..context import ctx
 
 logger = logging.getLogger(__name__)
 
+# rows to write in one statement
+_CHUNK_SIZE = 1000
+
+
+def _setup_sqlite(dbapi_connection, connection_record):
+    # let the readers work along with a writer, e.g. several worker processes
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
+
 
 class DB:
     def __init__(self) -> None:
@@ -26,6 +39,15 @@ class DB:
         connect_args = {}
         if 'postgres' in db_url or 'mysql' in db_url:
             connect_args['connect_timeout'] = ctx.config.db.connect_timeout
+        if db_url.startswith('sqlite'):
+            # wait for the locks held by the other processes
+            connect_args['timeout'] = ctx.config.db.connect_timeout
+
+        engine_args = {}
+        if make_url(db_url).get_driver_name() == 'psycopg2':
+            # send the executemany of the upserts in pages, not a statement per row
+            engine_args['executemany_mode'] = 'values_plus_batch'
+            engine_args['executemany_batch_page_size'] = 500
 
         engine = sa.create_engine(
             db_url,
@@ -38,9 +60,12 @@ class DB:
             pool_pre_ping=True,  # Test connections before using them (handles disconnects gracefully)
             # Connection arguments for database-specific settings
             connect_args=connect_args,
+            **engine_args,
         )
         if ctx.logger.is_debug:
             engine.logger = logger
+        if engine.dialect.name == 'sqlite':
+            sa_event.listen(engine, 'connect', _setup_sqlite)
         return engine
 
     def close(self):
@@ -61,6 +86,51 @@ class DB:
             enable_baked_queries=enable_baked_queries,
         )
 
+    def upsert(
+        self,
+        sess: sa.Session,
+        table: Type[sa.SQLModel],
+        rows: Iterable[Dict[str, Any]],
+        keys: Sequence[str],
+        update: Sequence[str],
+    ) -> None:
+        """Inserts the rows, or updates the `update` columns of the existing rows
+        with the same `keys`, by the native upsert statement of the database.
+        The rows are written in chunks, not to exceed the parameter limits.
+
+        The rows are not validated, they must have the values of all required columns.
+        """
+        dialect = self.engine.dialect.name
+        target = table.__table__  # type:ignore
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        elif dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert  # type:ignore
+        elif dialect in ('mysql', 'mariadb'):
+            from sqlalchemy.dialects.mysql import insert  # type:ignore
+        else:
+            raise NotImplementedError(f'Upsert is not supported by {dialect}')
+
+        stmt = insert(target)
+        if dialect in ('mysql', 'mariadb'):
+            stmt = stmt.on_duplicate_key_update(  # type:ignore
+                {name: stmt.inserted[name] for name in update},  # type:ignore
+            )
+        else:
+            stmt = stmt.on_conflict_do_update(  # type:ignore
+                index_elements=keys,
+                set_={name: stmt.excluded[name] for name in update},  # type:ignore
+            )
+
+        chunk: List[Dict[str, Any]] = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= _CHUNK_SIZE:
+                sess.exec(stmt, params=chunk)  # type:ignore
+                chunk = []
+        if chunk:
+            sess.exec(stmt, params=chunk)  # type:ignore
+
     def exec(
         self,
         raw_sql: str,
@@ -0,0 +1,226 @@
+import json
+import logging
+import os
+import random
+import secrets
+from pathlib import Path
+from threading import Event, Lock, local
+from typing import Dict, List, Optional
+
+import sqlmodel as sq
+import zstandard
+
+from ..context import ctx
+from ..dao import Novel
+from ..exceptions import AbortedException
+from ..utils.text_tools import dictionary_id, text_compress, text_decompress
+
+logger = logging.getLogger(__name__)
+
+_DICT_SIZE = 112640  # bytes, the default of zstd
+_LEVEL = 6  # compression level with a dictionary
+_MIN_SAMPLES = 200  # chapters of a domain to train a dictionary
+_MAX_SAMPLES = 2000
+_MAX_SAMPLES_SIZE = 100 * _DICT_SIZE
+_BATCH_SIZE = 100  # chapters to recompress at once
+
+
+class DictionaryService:
+    """Trained zstd dictionaries for the chapter contents of each website.
+
+    The chapters of the same website share a lot of markup and words, which a
+    dictionary can hold, so that each chapter does not need to repeat them.
+    The id of the dictionary is written in the zstd frame header of the content,
+    and the dictionaries are kept as long as the contents are there.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._local = local()
+        self._dicts: Dict[int, zstandard.ZstdCompressionDict] = {}
+        self._domains: Dict[str, int] = {}
+        self._domains_mtime = 0.0
+
+    @property
+    def folder(self) -> Path:
+        return ctx.files.resolve('dictionaries')
+
+    @property
+    def domains_file(self) -> Path:
+        return self.folder / 'domains.json'
+
+    @property
+    def state_file(self) -> Path:
+        return self.folder / 'recompressed.json'
+
+    def _file(self, dict_id: int) -> Path:
+        return self.folder / f'{dict_id:08x}.dict'
+
+    def _load_json(self, file: Path) -> Dict[str, int]:
+        try:
+            return json.loads(file.read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            return {}
+
+    def _save_json(self, file: Path, data: Dict[str, int]) -> None:
+        file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = file.with_name(f'{file.name}.tmp{os.getpid()}')
+        try:
+            tmp_file.write_text(json.dumps(data, indent=2), encoding='utf-8')
+            os.replace(tmp_file, file)
+        finally:
+            tmp_file.unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------------- #
+    # Compression
+    # ------------------------------------------------------------------------- #
+
+    def get(self, dict_id: int) -> Optional[zstandard.ZstdCompressionDict]:
+        with self._lock:
+            found = self._dicts.get(dict_id)
+            if found:
+                return found
+            try:
+                data = self._file(dict_id).read_bytes()
+            except FileNotFoundError:
+                return None
+            found = self._dicts[dict_id] = zstandard.ZstdCompressionDict(data)
+            return found
+
+    def for_domain(self, domain: Optional[str]) -> Optional[zstandard.ZstdCompressionDict]:
+        """The dictionary of the website, if it has been trained"""
+        if not domain:
+            return None
+        with self._lock:
+            # the dictionaries may be trained by another process
+            try:
+                mtime = self.domains_file.stat().st_mtime
+            except FileNotFoundError:
+                mtime = 0.0
+            if mtime != self._domains_mtime:
+                self._domains = self._load_json(self.domains_file)
+                self._domains_mtime = mtime
+            dict_id = self._domains.get(domain)
+        return self.get(dict_id) if dict_id else None
+
+    def _compressor(self, dictionary: zstandard.ZstdCompressionDict) -> zstandard.ZstdCompressor:
+        # the compressors can not be used by many threads at once
+        cache: Dict[int, zstandard.ZstdCompressor] = self._local.__dict__.setdefault('compressors', {})
+        dict_id = dictionary.dict_id()
+        if dict_id not in cache:
+            cache[dict_id] = zstandard.ZstdCompressor(level=_LEVEL, dict_data=dictionary)
+        return cache[dict_id]
+
+    def _decompressor(self, dictionary: zstandard.ZstdCompressionDict) -> zstandard.ZstdDecompressor:
+        cache: Dict[int, zstandard.ZstdDecompressor] = self._local.__dict__.setdefault('decompressors', {})
+        dict_id = dictionary.dict_id()
+        if dict_id not in cache:
+            cache[dict_id] = zstandard.ZstdDecompressor(dict_data=dictionary)
+        return cache[dict_id]
+
+    def compress(self, plain: bytes, domain: Optional[str] = None) -> bytes:
+        """Compresses with the dictionary of the website if available"""
+        dictionary = self.for_domain(domain)
+        if not dictionary:
+            return text_compress(plain)
+        return self._compressor(dictionary).compress(plain)
+
+    def decompress(self, compressed: bytes) -> bytes:
+        """Decompresses with the dictionary named in the frame header"""
+        dict_id = dictionary_id(compressed)
+        if not dict_id:
+            return text_decompress(compressed)
+        dictionary = self.get(dict_id)
+        if not dictionary:
+            raise ValueError(f'Missing compression dictionary: {dict_id:08x}')
+        return self._decompressor(dictionary).decompress(compressed)
+
+    # ------------------------------------------------------------------------- #
+    # Training
+    # ------------------------------------------------------------------------- #
+
+    def train(self, domain: str, samples: List[bytes]) -> zstandard.ZstdCompressionDict:
+        """Trains a new dictionary for the website from the sample chapters"""
+        while True:
+            dict_id = 32768 + secrets.randbelow(2**31 - 32768)  # lower ids are reserved
+            if not self._file(dict_id).exists():
+                break
+        dictionary = zstandard.train_dictionary(
+            _DICT_SIZE,
+            samples,
+            dict_id=dict_id,
+            level=_LEVEL,
+        )
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self._file(dict_id).write_bytes(dictionary.as_bytes())
+        with self._lock:
+            domains = self._load_json(self.domains_file)
+            domains[domain] = dict_id
+            self._save_json(self.domains_file, domains)
+        logger.info(f'Trained compression dictionary {dict_id:08x} for {domain} from {len(samples)} chapters')
+        return dictionary
+
+    def maintain(self, signal: Event) -> None:
+        """Trains the dictionaries of the websites having enough chapters,
+        and recompresses the chapters saved before or without them."""
+        with ctx.db.session() as sess:
+            rows = sess.exec(sq.select(Novel.domain, Novel.id)).all()
+        novels: Dict[str, List[str]] = {}
+        for domain, novel_id in rows:
+            novels.setdefault(domain, []).append(novel_id)
+
+        state = self._load_json(self.state_file)
+        for domain, novel_ids in novels.items():
+            if signal.is_set():
+                raise AbortedException()
+            dictionary = self.for_domain(domain)
+            if not dictionary:
+                dictionary = self._train_domain(domain, novel_ids)
+            if not dictionary:
+                continue
+            dict_id = dictionary.dict_id()
+            for novel_id in novel_ids:
+                if state.get(novel_id) == dict_id:
+                    continue
+                self._recompress(novel_id, dictionary, signal)
+                state[novel_id] = dict_id
+                self._save_json(self.state_file, state)
+
+    def _train_domain(self, domain: str, novel_ids: List[str]) -> Optional[zstandard.ZstdCompressionDict]:
+        keys = [
+            (novel_id, key)
+            for novel_id in novel_ids
+            for key in ctx.files.pack(novel_id).keys()
+        ]
+        if len(keys) < _MIN_SAMPLES:
+            return None
+        samples: List[bytes] = []
+        total = 0
+        for novel_id, key in random.sample(keys, min(len(keys), _MAX_SAMPLES)):
+            data = ctx.files.pack(novel_id).get(key)
+            if not data:
+                continue
+            sample = self.decompress(data)
+            samples.append(sample)
+            total += len(sample)
+            if total >= _MAX_SAMPLES_SIZE:
+                break
+        return self.train(domain, samples)
+
+    def _recompress(self, novel_id: str, dictionary: zstandard.ZstdCompressionDict, signal: Event) -> None:
+        pack = ctx.files.pack(novel_id)
+        dict_id = dictionary.dict_id()
+        compressor = self._compressor(dictionary)
+
+        def recompress(data: bytes) -> Optional[bytes]:
+            if dictionary_id(data) == dict_id:
+                return None
+            return compressor.compress(self.decompress(data))
+
+        # the chapters may be saved by the jobs meanwhile,
+        # so they are read again while the pack is locked
+        keys = pack.keys()
+        for i in range(0, len(keys), _BATCH_SIZE):
+            if signal.is_set():
+                raise AbortedException()
+            pack.rewrite_many(keys[i:i + _BATCH_SIZE], recompress)
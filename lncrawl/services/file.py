@@ -1,20 +1,35 @@
 import logging
 import os
+import re
+from collections import OrderedDict
 from pathlib import Path
-from typing import Union
+from threading import Lock
+from typing import Optional, Set, Tuple, Union
 
 from ..context import ctx
 from ..exceptions import ServerErrors
-from ..utils.text_tools import is_compressed, text_compress, text_decompress
+from ..utils.packfile import PackFile
+from ..utils.text_tools import is_compressed
 
 logger = logging.getLogger(__name__)
 
 StrPath = Union[str, Path]
 
+# the chapter contents are kept in a pack file of the novel
+_CHAPTER_FILE = re.compile(r'^novels/([^/]+)/chapters/(\d+)\.zst$')
+_MAX_OPEN_PACKS = 32
+
 
 class FileService:
     def __init__(self) -> None:
-        pass
+        self._lock = Lock()
+        self._packs: 'OrderedDict[str, PackFile]' = OrderedDict()
+
+    def close(self) -> None:
+        with self._lock:
+            for pack in self._packs.values():
+                pack.close()
+            self._packs.clear()
 
     @property
     def root(self):
@@ -27,10 +42,68 @@ class FileService:
             return file
         return self.root / file
 
+    def pack(self, novel_id: str) -> PackFile:
+        """The pack file of the chapter contents of a novel"""
+        with self._lock:
+            pack = self._packs.get(novel_id)
+            if pack:
+                self._packs.move_to_end(novel_id)
+                return pack
+            pack = self._packs[novel_id] = PackFile(self.resolve(f'novels/{novel_id}/chapters'))
+            if len(self._packs) > _MAX_OPEN_PACKS:
+                _, old = self._packs.popitem(last=False)
+                old.close()
+            return pack
+
+    def _packed(self, file_path: StrPath) -> Optional[Tuple[PackFile, int]]:
+        if isinstance(file_path, Path):
+            if file_path.is_absolute():
+                try:
+                    file_path = file_path.relative_to(self.root)
+                except ValueError:
+                    return None
+            file_path = file_path.as_posix()
+        match = _CHAPTER_FILE.match(file_path)
+        if not match:
+            return None
+        return self.pack(match.group(1)), int(match.group(2))
+
     def exists(self, file_path: StrPath):
+        packed = self._packed(file_path)
+        if packed and packed[0].exists(packed[1]):
+            return True
         return self.resolve(file_path).is_file()
 
+    def size(self, file_path: StrPath) -> Optional[int]:
+        """Size of the saved content in bytes, or None if it is not available"""
+        packed = self._packed(file_path)
+        if packed:
+            size = packed[0].size(packed[1])
+            if size is not None:
+                return size
+        try:
+            return self.resolve(file_path).stat().st_size
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+    def saved_chapters(self, novel_id: str) -> Set[int]:
+        """Serials of the saved chapter contents of a novel"""
+        pack = self.pack(novel_id)
+        serials = set(pack.keys())
+        if pack.folder.is_dir():
+            serials.update(
+                int(file.stem)
+                for file in pack.folder.glob('*.zst')
+                if file.stem.isdigit()
+            )
+        return serials
+
     def load(self, file_path: StrPath) -> bytes:
+        packed = self._packed(file_path)
+        if packed:
+            data = packed[0].get(packed[1])
+            if data is not None:
+                return data
         file = self.resolve(file_path)
         if not file.is_file():
             raise ServerErrors.no_such_file
@@ -38,6 +111,11 @@ class FileService:
 
     def save(self, file_path: StrPath, content: bytes) -> Path:
         file = self.resolve(file_path)
+        packed = self._packed(file_path)
+        if packed:
+            packed[0].put(packed[1], content)
+            file.unlink(missing_ok=True)  # saved before the pack file
+            return file
         file.parent.mkdir(parents=True, exist_ok=True)
         tmp = file.with_suffix(f'{file.suffix}.tmp')
         try:
@@ -54,7 +132,7 @@ class FileService:
     ) -> str:
         data = self.load(file_path)
         if is_compressed(data):
-            data = text_decompress(data)
+            data = ctx.dictionaries.decompress(data)
         return data.decode(encoding)
 
     def save_text(
@@ -63,12 +141,41 @@ class FileService:
         content: str,
         compress: bool = True,
         encoding: str = 'utf-8',
+        domain: Optional[str] = None,
     ) -> Path:
+        """Saves the text, compressed with the dictionary of the `domain` if it has one"""
         data = content.encode(encoding)
         if compress or is_compressed(data):
-            data = text_compress(data)
+            data = ctx.dictionaries.compress(data, domain)
         return self.save(file_path, data)
 
+    def delete(self, file_path: StrPath) -> None:
+        packed = self._packed(file_path)
+        if packed:
+            packed[0].delete(packed[1])
+        self.resolve(file_path).unlink(missing_ok=True)
+
+    def compact(self, novel_id: str) -> int:
+        """Reclaims the space of the replaced chapter contents of a novel"""
+        pack = self.pack(novel_id)
+        if not pack.index_file.is_file():
+            return 0
+        return pack.compact()
+
+    def migrate(self, novel_id: str) -> int:
+        """Moves the chapter contents saved in separate files into the pack file"""
+        pack = self.pack(novel_id)
+        files = [
+            file for file in pack.folder.glob('*.zst')
+            if file.stem.isdigit() and file.stat().st_size
+        ]
+        if not files:
+            return 0
+        pack.put_many((int(file.stem), file.read_bytes()) for file in files)
+        for file in files:
+            file.unlink()
+        return len(files)
+
     def utime(self, file: StrPath) -> None:
         path = self.resolve(file)
         if path.exists():
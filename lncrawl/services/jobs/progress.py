@@ -0,0 +1,177 @@
+import logging
+from threading import Event, Lock, Thread
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import sqlmodel as sq
+from sqlalchemy import event
+from sqlmodel import Session
+
+from ...context import ctx
+from ...dao import Job
+from ...utils.time_utils import current_timestamp
+
+logger = logging.getLogger(__name__)
+
+# (done, failed) to add to every ancestor of a job
+Delta = Tuple[int, int]
+
+_SESSION_KEY = 'job_progress'
+_MAX_PARENTS = 100_000
+
+
+class JobProgress:
+    """Aggregates the completed counts of the jobs into their ancestors.
+
+    Instead of updating the whole ancestor chain every time a job makes progress,
+    the increments are buffered once the transaction is committed, and flushed
+    periodically, summing up the increments of every ancestor in one statement.
+    The parents of the jobs are resolved by primary key and remembered, since
+    many jobs share the same ancestors.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._pending: Dict[str, Delta] = {}
+        self._parents: Dict[str, Optional[str]] = {}
+        self._signal = Event()
+        self._thread: Optional[Thread] = None
+        self.increments = 0
+        self.flushes = 0
+        self.updates = 0
+
+    @property
+    def interval(self) -> float:
+        return ctx.config.crawler.job_progress_interval
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'pending': len(self._pending),
+                'increments': self.increments,
+                'flushes': self.flushes,
+                'updates': self.updates,
+            }
+
+    def close(self) -> None:
+        self._signal.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def remember(self, job_id: str, parent_id: Optional[str]) -> None:
+        with self._lock:
+            if len(self._parents) >= _MAX_PARENTS:
+                self._parents.clear()
+            self._parents[job_id] = parent_id
+
+    def ancestors(self, sess: Session, job_id: str) -> List[str]:
+        """Returns the ancestors of the job, from the parent to the root"""
+        return self._chains(sess, [job_id]).get(job_id, [])
+
+    def add(self, sess: Session, job_id: str, done: int = 0, failed: int = 0) -> None:
+        """Adds the increments to the ancestors of the job, once the session is committed"""
+        items: List[Tuple[str, Delta]] = sess.info.setdefault(_SESSION_KEY, [])
+        items.append((job_id, (done, failed)))
+
+    def _commit(self, items: List[Tuple[str, Delta]]) -> None:
+        with self._lock:
+            for job_id, (done, failed) in items:
+                prev_done, prev_failed = self._pending.get(job_id, (0, 0))
+                self._pending[job_id] = (prev_done + done, prev_failed + failed)
+            self.increments += len(items)
+            if not self._thread:
+                self._signal = Event()
+                self._thread = Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._signal.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.error('Failed to save job progress', exc_info=True)
+
+    def flush(self) -> None:
+        """Applies the buffered increments to the ancestors"""
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+        if not pending:
+            return
+
+        started = current_timestamp()
+        try:
+            with ctx.db.session() as sess:
+                chains = self._chains(sess, pending.keys())
+                deltas: Dict[str, Tuple[int, int, int]] = {}
+                for job_id, (done, failed) in pending.items():
+                    for parent_id in chains.get(job_id, []):
+                        prev_done, _, prev_failed = deltas.get(parent_id, (0, 0, 0))
+                        deltas[parent_id] = (prev_done + done, 0, prev_failed + failed)
+                ctx.jobs._update_many(sess, deltas)
+                sess.commit()
+                finished = sess.exec(
+                    sq.select(Job.id)
+                    .where(sq.col(Job.id).in_(deltas.keys()))
+                    .where(sq.col(Job.finished_at) >= started)
+                ).all()
+                if finished:
+                    ctx.jobs._announce(sess)  # the dependent jobs can start now
+                    sess.commit()
+        except Exception:
+            with self._lock:  # try again in the next tick
+                for job_id, (done, failed) in pending.items():
+                    prev_done, prev_failed = self._pending.get(job_id, (0, 0))
+                    self._pending[job_id] = (prev_done + done, prev_failed + failed)
+            raise
+
+        with self._lock:
+            self.flushes += 1
+            self.updates += len(deltas)
+        if finished:
+            ctx.scheduler.finished(list(finished))
+
+    def _chains(self, sess: Session, job_ids: Iterable[str]) -> Dict[str, List[str]]:
+        """Returns the ancestors of the jobs, looking up the unknown parents"""
+        chains: Dict[str, List[str]] = {}
+        pending = set(job_ids)
+        while pending:
+            unknown: Set[str] = set()
+            with self._lock:
+                for job_id in pending:
+                    chain: List[str] = []
+                    parent_id: Optional[str] = job_id
+                    while parent_id and parent_id in self._parents:
+                        parent_id = self._parents[parent_id]
+                        if parent_id:
+                            chain.append(parent_id)
+                    if parent_id:
+                        unknown.add(parent_id)
+                    else:
+                        chains[job_id] = chain
+                pending -= chains.keys()
+            if not unknown:
+                break
+            rows = sess.exec(
+                sq.select(Job.id, Job.parent_job_id)
+                .where(sq.col(Job.id).in_(unknown))
+            ).all()
+            for job_id, parent_id in rows:
+                self.remember(job_id, parent_id)
+            for job_id in unknown - {row[0] for row in rows}:
+                self.remember(job_id, None)  # deleted
+        return chains
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(sess: Session) -> None:
+    items = sess.info.pop(_SESSION_KEY, None)
+    if items:
+        ctx.jobs.progress._commit(items)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _after_rollback(sess: Session, previous_transaction) -> None:
+    sess.info.pop(_SESSION_KEY, None)
@@ -1,4 +1,6 @@
-from typing import Any, Iterable, List, Optional, TypeVar
+from typing import (Any, Dict, Iterable, List, Optional, Set, Tuple,
+                    TypeVar)
+from urllib.parse import urlparse
 
 import sqlmodel as sq
 from sqlalchemy.orm import aliased
@@ -11,7 +13,8 @@ from ...dao.tier import JOB_PRIORITY_LEVEL
 from ...exceptions import ServerErrors
 from ...server.models import Paginated
 from ...utils.time_utils import current_timestamp
-from .utils import select_ancestors, select_descendends
+from .progress import JobProgress
+from .utils import select_descendends
 
 T = TypeVar('T')
 
@@ -21,10 +24,20 @@ job_success_literal = sq.cast(sq.literal(JobStatus.SUCCESS.name), job_status_typ
 job_running_literal = sq.cast(sq.literal(JobStatus.RUNNING.name), job_status_type)
 job_canceled_literal = sq.cast(sq.literal(JobStatus.CANCELED.name), job_status_type)
 
+# postgres channel to notify the workers about new jobs
+JOBS_CHANNEL = 'lncrawl_jobs'
+
+# aliases of the jobs table, created once so that the statements can be cached
+job_dependency = aliased(Job)
+job_child = aliased(Job)
+
 
 class JobService:
     def __init__(self) -> None:
-        pass
+        self.progress = JobProgress()
+
+    def close(self) -> None:
+        self.progress.close()
 
     # -------------------------------------------------------------------------
     #                               GET Jobs
@@ -130,12 +143,15 @@ class JobService:
 
     def get_root(self, job_id: str) -> Optional[Job]:
         with ctx.db.session() as sess:
-            sa_pars = select_ancestors(job_id)
+            sa_root = (
+                sq.select(Job.root_job_id)
+                .where(Job.id == job_id)
+                .scalar_subquery()
+            )
             return sess.exec(
                 sq.select(Job)
-                .where(sq.col(Job.id).in_(sa_pars))
-                .where(sq.col(Job.parent_job_id).is_(None))
-                .limit(1)
+                .where(Job.id == sa_root)
+                .where(Job.id != job_id)
             ).first()
 
     # -------------------------------------------------------------------------
@@ -163,6 +179,7 @@ class JobService:
             data=data,
             parent_id=parent_id,
             depends_on=depends_on,
+            domain=urlparse(url).hostname,
             type=JobType.FULL_NOVEL if full else JobType.NOVEL,
         )
 
@@ -196,12 +213,12 @@ class JobService:
         **data: Any,
     ) -> Job:
         volume = ctx.volumes.get(volume_id)
+        novel = ctx.novels.get(volume.novel_id)
         data.update({
             'volume_id': volume_id,
             'volume_serial': volume.serial,
         })
         if not data.get('novel_title'):
-            novel = ctx.novels.get(volume.novel_id)
             data.update({
                 'novel_id': novel.id,
                 'novel_title': novel.title,
@@ -211,6 +228,7 @@ class JobService:
             data=data,
             parent_id=parent_id,
             depends_on=depends_on,
+            domain=novel.domain,
             type=JobType.VOLUME,
         )
 
@@ -243,12 +261,12 @@ class JobService:
         **data: Any,
     ) -> Job:
         chapter = ctx.chapters.get(chapter_id)
+        novel = ctx.novels.get(chapter.novel_id)
         data.update({
             'chapter_id': chapter_id,
             'chapter_serial': chapter.serial,
         })
         if not data.get('novel_title'):
-            novel = ctx.novels.get(chapter.novel_id)
             data.update({
                 'novel_id': novel.id,
                 'novel_title': novel.title,
@@ -258,6 +276,7 @@ class JobService:
             data=data,
             parent_id=parent_id,
             depends_on=depends_on,
+            domain=novel.domain,
             type=JobType.CHAPTER,
         )
 
@@ -272,11 +291,16 @@ class JobService:
         data.update({
             'chapter_ids': chapter_ids,
         })
+        domain = None
+        if chapter_ids:  # the chapters are downloaded inside the job
+            chapter = ctx.chapters.get(chapter_ids[0])
+            domain = ctx.novels.get(chapter.novel_id).domain
         return self._create(
             user=user,
             data=data,
             parent_id=parent_id,
             depends_on=depends_on,
+            domain=domain,
             type=JobType.CHAPTER_BATCH,
         )
 
@@ -299,6 +323,7 @@ class JobService:
             data=data,
             parent_id=parent_id,
             depends_on=depends_on,
+            domain=urlparse(image.url).hostname,
             type=JobType.IMAGE,
         )
 
@@ -378,6 +403,7 @@ class JobService:
     #                              DELETE Jobs
     # -------------------------------------------------------------------------
     def delete(self, job_id: str) -> None:
+        self.progress.flush()
         with ctx.db.session() as sess:
             result = sess.exec(
                 sq.select(Job.done, Job.total, Job.failed)
@@ -390,9 +416,9 @@ class JobService:
             self._update_up(
                 sess,
                 job_id=job_id,
-                done=Job.done - done,
-                total=Job.total - total,
-                failed=Job.failed - failed,
+                done=-done,
+                total=-total,
+                failed=-failed,
             )
 
             sa_deps = select_descendends(job_id, True)
@@ -433,83 +459,280 @@ class JobService:
         data: dict,
         parent_id: Optional[str] = None,
         depends_on: Optional[str] = None,
+        domain: Optional[str] = None,
     ) -> Job:
         with ctx.db.session() as sess:
             job = Job(
                 type=type,
                 extra=data,
+                domain=domain,
                 user_id=user.id,
                 depends_on=depends_on,
                 parent_job_id=parent_id,
                 priority=JOB_PRIORITY_LEVEL[user.tier],
             )
+            job.root_job_id = job.id
+            if parent_id:
+                parent = sess.get_one(Job, parent_id)
+                job.root_job_id = parent.root_job_id or parent.id
+                job.depth = parent.depth + 1
             sess.add(job)
 
-            self._update_up(
-                sess,
-                job.id,
-                total=Job.total + 1,
-            )
+            self.progress.remember(job.id, parent_id)
+            self._update_up(sess, job.id, total=1)
+            self._announce(sess)
 
             sess.commit()
             sess.refresh(job)
-            return job
 
-    def _pending(
+        ctx.scheduler.notify()
+        return job
+
+    def _claim(
         self,
+        worker_id: str,
+        limit: int = 1,
+        lease: int = 60,
         artifact: Optional[bool] = None,
-        skip_job_ids: Iterable[str] = [],
-        skip_user_ids: Iterable[str] = []
-    ) -> Optional[Job]:
+        skip_user_ids: Iterable[str] = [],
+    ) -> List[Job]:
+        """Leases up to `limit` pending jobs to the worker for `lease` seconds.
+
+        The candidate rows are locked with `FOR UPDATE SKIP LOCKED` where the
+        database supports it, so that the other workers pick the next ones.
+        The claim itself is a compare-and-set update, which also keeps it
+        atomic on SQLite. Only one job with low priority is given per user.
+
+        The jobs are picked in turns from each domain, the least busy first,
+        and the domains having `runner_domain_concurrency` jobs claimed by any
+        of the workers are skipped, so that one slow website does not take
+        all of the runners.
+        """
+        for _ in range(3):  # retry if other workers took all the candidates
+            claimed, has_more = self.__claim(worker_id, limit, lease, artifact, set(skip_user_ids))
+            if claimed or not has_more:
+                return claimed
+        return []
+
+    def __claim(
+        self,
+        worker_id: str,
+        limit: int,
+        lease: int,
+        artifact: Optional[bool],
+        skip_user_ids: Set[str],
+    ) -> Tuple[List[Job], bool]:
+        now = current_timestamp()
+        lease_until = now + lease * 1000
         with ctx.db.session() as sess:
-            stmt = sq.select(Job)
-
-            job_alias = aliased(Job)
             dep_is_done = (
                 sq.exists(1)
-                .where(sq.col(job_alias.id) == Job.depends_on)
-                .where(sq.col(job_alias.is_done).is_(True))
+                .where(sq.col(job_dependency.id) == Job.depends_on)
+                .where(sq.col(job_dependency.is_done).is_(True))
             )
-            stmt = stmt.where(
-                sq.or_(
-                    sq.col(Job.depends_on).is_(None),
-                    dep_is_done
-                )
+            is_ready = sq.or_(
+                sq.col(Job.depends_on).is_(None),
+                dep_is_done
             )
 
             job_is_new = sq.and_(
                 Job.status == JobStatus.RUNNING,
                 Job.done == 0,
             )
-            stmt = stmt.where(
-                sq.or_(
-                    Job.status == JobStatus.PENDING,
-                    job_is_new,
-                )
+            job_is_resumable = sq.and_(
+                Job.status == JobStatus.RUNNING,
+                sq.col(Job.type).in_([JobType.VOLUME, JobType.CHAPTER_BATCH]),
+                ~sq.exists(1).where(sq.col(job_child.parent_job_id) == Job.id),
             )
-
-            if skip_job_ids:
-                stmt = stmt.where(sq.col(Job.id).not_in(skip_job_ids))
-
-            if skip_user_ids:
-                stmt = stmt.where(
-                    sq.or_(
-                        Job.priority != JobPriority.LOW,
-                        sq.col(Job.user_id).not_in(skip_user_ids)
-                    )
-                )
-
+            job_is_creating = sq.and_(
+                Job.status == JobStatus.RUNNING,
+                Job.extra['children_created'].as_boolean() == sq.false(),
+            )
+            is_pending = sq.or_(
+                Job.status == JobStatus.PENDING,
+                job_is_new,
+                job_is_resumable,
+                job_is_creating,
+            )
+            is_unclaimed = sq.or_(
+                sq.col(Job.claimed_by).is_(None),
+                sq.col(Job.lease_until) < now,
+            )
+            stmt = sq.select(Job.id, Job.user_id, Job.priority, Job.domain)
+            stmt = stmt.where(is_ready, is_pending, is_unclaimed)
             if artifact is not None:
                 if artifact:
                     stmt = stmt.where(Job.type == JobType.ARTIFACT)
                 else:
                     stmt = stmt.where(Job.type != JobType.ARTIFACT)
-
             stmt = stmt.order_by(
                 sq.desc(Job.priority),
                 sq.asc(Job.updated_at),
             )
-            return sess.exec(stmt.limit(1)).first()
+            stmt = stmt.limit(4 * limit)
+            can_lock = ctx.db.engine.dialect.name in ('postgresql', 'mysql', 'mariadb')
+            if can_lock:
+                stmt = stmt.with_for_update(skip_locked=True, of=Job)  # type:ignore
+
+            cap = ctx.config.crawler.runner_domain_concurrency
+            active = self.__active_domains(sess, now) if cap > 0 else {}
+            job_ids: List[str] = []
+            while len(job_ids) < limit:
+                query = stmt
+                busy = [domain for domain, count in active.items() if count >= cap]
+                if busy:
+                    query = query.where(
+                        sq.or_(
+                            sq.col(Job.domain).is_(None),
+                            sq.col(Job.domain).not_in(busy),
+                        )
+                    )
+                if skip_user_ids:
+                    query = query.where(
+                        sq.or_(
+                            Job.priority != JobPriority.LOW,
+                            sq.col(Job.user_id).not_in(skip_user_ids)
+                        )
+                    )
+                if job_ids:
+                    query = query.where(sq.col(Job.id).not_in(job_ids))
+
+                rows = sess.exec(query).all()
+                queues: Dict[Optional[str], List[Tuple[str, str, JobPriority]]] = {}
+                for job_id, user_id, priority, domain in rows:
+                    queues.setdefault(domain, []).append((job_id, user_id, priority))
+
+                # take one job from each domain in turns, the least busy first
+                while queues and len(job_ids) < limit:
+                    turns = sorted(queues, key=lambda x: (-queues[x][0][2], active.get(x or '', 0)))
+                    for domain in turns:
+                        queue = queues[domain]
+                        while queue:
+                            job_id, user_id, priority = queue.pop(0)
+                            if priority == JobPriority.LOW:
+                                if user_id in skip_user_ids:
+                                    continue
+                                skip_user_ids.add(user_id)
+                            job_ids.append(job_id)
+                            if domain:
+                                active[domain] = active.get(domain, 0) + 1
+                            break
+                        if not queue or (domain and cap > 0 and active[domain] >= cap):
+                            queues.pop(domain)
+                        if len(job_ids) >= limit:
+                            break
+
+                # look further only if the busy domains have filled up the window
+                if len(rows) < 4 * limit or cap <= 0:
+                    break
+                if len(busy) == sum(count >= cap for count in active.values()):
+                    break
+
+            if not job_ids:
+                return [], False
+
+            # the locked rows can not change, otherwise check them again
+            conditions = [is_unclaimed] if can_lock else [is_ready, is_pending, is_unclaimed]
+            sess.exec(
+                sq.update(Job)
+                .where(sq.col(Job.id).in_(job_ids))
+                .where(*conditions)
+                .values(
+                    claimed_by=worker_id,
+                    lease_until=lease_until,
+                )
+            )
+            sess.commit()
+
+            claimed = {
+                job.id: job
+                for job in sess.exec(
+                    sq.select(Job)
+                    .where(sq.col(Job.id).in_(job_ids))
+                    .where(Job.claimed_by == worker_id)
+                    .where(Job.lease_until == lease_until)
+                ).all()
+            }
+            return [claimed[job_id] for job_id in job_ids if job_id in claimed], True
+
+    def __active_domains(self, sess: Session, now: int) -> Dict[str, int]:
+        """Number of the jobs claimed by all workers for each domain"""
+        return {
+            domain: count
+            for domain, count in sess.exec(
+                sq.select(Job.domain, sq.func.count())
+                .where(
+                    sq.col(Job.domain).is_not(None),
+                    sq.col(Job.is_done).is_(False),
+                    sq.col(Job.claimed_by).is_not(None),
+                    sq.col(Job.lease_until) >= now,
+                )
+                .group_by(Job.domain)
+            ).all()
+        }
+
+    def domain_stats(self) -> Dict[str, Dict[str, int]]:
+        """Number of the pending and active jobs of each domain"""
+        now = current_timestamp()
+        sa_is_active = sq.and_(
+            sq.col(Job.claimed_by).is_not(None),
+            sq.col(Job.lease_until) >= now,
+        )
+        with ctx.db.session() as sess:
+            rows = sess.exec(
+                sq.select(
+                    Job.domain,
+                    sq.func.count(),
+                    sq.func.sum(sq.case((sa_is_active, 1), else_=0)),
+                )
+                .where(
+                    sq.col(Job.domain).is_not(None),
+                    sq.col(Job.is_done).is_(False),
+                )
+                .group_by(Job.domain)
+            ).all()
+        return {
+            domain: {
+                'pending': total - (active or 0),
+                'active': active or 0,
+            }
+            for domain, total, active in rows
+        }
+
+    def _renew(self, worker_id: str, lease: int = 60) -> List[str]:
+        """Extends the leases of the jobs held by the worker, and returns
+        the ids of the ones that were completed elsewhere, e.g. canceled."""
+        with ctx.db.session() as sess:
+            sess.exec(
+                sq.update(Job)
+                .where(Job.claimed_by == worker_id)
+                .values(lease_until=current_timestamp() + lease * 1000)
+            )
+            sess.commit()
+            return list(sess.exec(
+                sq.select(Job.id)
+                .where(Job.claimed_by == worker_id)
+                .where(sq.col(Job.is_done).is_(True))
+            ).all())
+
+    def _announce(self, sess: Session) -> None:
+        """Wakes up the idle workers of the other processes, once the session is committed"""
+        if ctx.db.engine.dialect.name == 'postgresql':
+            sess.exec(sq.select(sq.func.pg_notify(JOBS_CHANNEL, '')))
+
+    def _release(self, worker_id: str, *job_ids: str) -> None:
+        """Gives up the claims on the jobs, or all claims of the worker"""
+        with ctx.db.session() as sess:
+            stmt = sq.update(Job).where(Job.claimed_by == worker_id)
+            if job_ids:
+                stmt = stmt.where(sq.col(Job.id).in_(job_ids))
+            sess.exec(
+                stmt.values(
+                    claimed_by=None,
+                    lease_until=None,
+                )
+            )
+            sess.commit()
 
     def _update(self, sess: Session, job_id: str, **values) -> None:
         sess.exec(
@@ -522,52 +745,79 @@ class JobService:
         self,
         sess: Session,
         job_id: str,
-        done=Job.done,
-        total=Job.total,
-        failed=Job.failed,
+        done: int = 0,
+        total: int = 0,
+        failed: int = 0,
         inclusive: bool = False,
     ) -> None:
+        """Adds to the counters of the job and its ancestors.
+
+        The completed counts of the ancestors are buffered and saved by `JobProgress`.
+        The totals are changed right away, so that a job never looks complete before
+        all of its children are counted.
+        """
+        deltas: Dict[str, Tuple[int, int, int]] = {}
+        if inclusive:
+            deltas[job_id] = (done, total, failed)
+        if total or done < 0 or failed < 0:
+            for parent_id in self.progress.ancestors(sess, job_id):
+                deltas[parent_id] = (done, total, failed)
+        elif done or failed:
+            self.progress.add(sess, job_id, done, failed)
+        self._update_many(sess, deltas)
+
+    def _update_many(self, sess: Session, deltas: Dict[str, Tuple[int, int, int]]) -> None:
+        """Adds (done, total, failed) to the counters of the jobs by id"""
         now = current_timestamp()
+        items = sorted(deltas.items())
+        for i in range(0, len(items), 250):
+            chunk = dict(items[i:i + 250])
+
+            def added(column, index: int):
+                values = {id: d[index] for id, d in chunk.items() if d[index]}
+                if not values:
+                    return column
+                return column + sq.case(values, value=Job.id, else_=0)
+
+            sa_done = added(Job.done, 0)
+            sa_total = added(Job.total, 1)
+            sa_failed = added(Job.failed, 2)
+            sa_is_done = sa_done == sa_total
+
+            sa_status = sq.case(
+                (sa_is_done, job_success_literal),
+                else_=Job.status
+            )
+            sa_started_at = sq.case(
+                (
+                    sq.and_(sa_is_done, sq.col(Job.started_at).is_(None)),
+                    now
+                ),
+                else_=Job.started_at
+            )
+            sa_finished_at = sq.case(
+                (
+                    sq.and_(sa_is_done, sq.col(Job.finished_at).is_(None)),
+                    now
+                ),
+                else_=Job.finished_at
+            )
 
-        sa_done = done
-        sa_total = total
-        sa_failed = failed
-        sa_is_done = sa_done == sa_total
-
-        sa_status = sq.case(
-            (sa_is_done, job_success_literal),
-            else_=Job.status
-        )
-        sa_started_at = sq.case(
-            (
-                sq.and_(sa_is_done, sq.col(Job.started_at).is_(None)),
-                now
-            ),
-            else_=Job.started_at
-        )
-        sa_finished_at = sq.case(
-            (
-                sq.and_(sa_is_done, sq.col(Job.finished_at).is_(None)),
-                now
-            ),
-            else_=Job.finished_at
-        )
-
-        sa_pars = select_ancestors(job_id, inclusive)
-        sess.exec(
-            sq.update(Job)
-            .where(sq.col(Job.id).in_(sa_pars))
-            .where(sq.col(Job.is_done).is_(False))
-            .values(
-                done=sa_done,
-                total=sa_total,
-                failed=sa_failed,
-                status=sa_status,
-                is_done=sa_is_done,
-                started_at=sa_started_at,
-                finished_at=sa_finished_at,
+            sess.exec(
+                sq.update(Job)
+                .where(sq.col(Job.id).in_(chunk.keys()))
+                .where(sq.col(Job.is_done).is_(False))
+                .values(
+                    done=sa_done,
+                    total=sa_total,
+                    failed=sa_failed,
+                    status=sa_status,
+                    is_done=sa_is_done,
+                    started_at=sa_started_at,
+                    finished_at=sa_finished_at,
+                )
+                .execution_options(synchronize_session=False)
             )
-        )
 
     def _cancel_down(self, sess: Session, job_id: str, inclusive=False) -> None:
         now = current_timestamp()
@@ -592,7 +842,7 @@ class JobService:
             sess,
             job_id=job_id,
             inclusive=True,
-            done=Job.done + step,
+            done=step,
         )
 
     def _count_pending(self, sess: Session, job_id: str) -> int:
@@ -611,8 +861,8 @@ class JobService:
             sess,
             job_id=job_id,
             inclusive=True,
-            done=Job.done + pending,
-            failed=Job.failed + pending,
+            done=pending,
+            failed=pending,
         )
         self._update(
             sess,
@@ -621,6 +871,59 @@ class JobService:
             status=job_failed_literal,
         )
 
+    def finish_stalled(self, grace: int = 60) -> int:
+        """Completes the running jobs whose children are all done for a while.
+        Their counters may fall short if a process stopped before saving the
+        buffered progress. The jobs that have not created all of their children
+        are left to be resumed. Returns the number of jobs completed."""
+        now = current_timestamp()
+        children_created = Job.extra['children_created'].as_boolean()
+        with ctx.db.session() as sess:
+            rows = sess.exec(
+                sq.select(Job.id, Job.done, Job.total)
+                .where(
+                    Job.status == JobStatus.RUNNING,
+                    sq.col(Job.is_done).is_(False),
+                    sq.or_(
+                        children_created.is_(None),  # created before this flag
+                        children_created == sq.true(),
+                    ),
+                    sq.or_(
+                        sq.col(Job.claimed_by).is_(None),
+                        sq.col(Job.lease_until) < now,
+                    ),
+                    sq.exists(1).where(sq.col(job_child.parent_job_id) == Job.id),
+                    ~sq.exists(1).where(
+                        sq.col(job_child.parent_job_id) == Job.id,
+                        sq.or_(
+                            sq.col(job_child.is_done).is_(False),
+                            sq.col(job_child.finished_at) > now - grace * 1000,
+                        ),
+                    ),
+                )
+            ).all()
+            count = 0
+            for job_id, done, total in rows:
+                result = sess.exec(
+                    sq.update(Job)
+                    .where(
+                        Job.id == job_id,
+                        Job.done == done,  # not completed by another worker
+                        sq.col(Job.is_done).is_(False),
+                    )
+                    .values(
+                        done=total,
+                        is_done=True,
+                        status=job_success_literal,
+                        finished_at=now,
+                    )
+                )
+                if result.rowcount:
+                    self.progress.add(sess, job_id, total - done)
+                    count += 1
+            sess.commit()
+        return count
+
     def cancel_if_dangling(self, job: Job) -> bool:
         root = self.get_root(job.id)
         if root and not root.is_done:
@@ -1,10 +1,16 @@
 import logging
+import os
 import shutil
 from threading import Event
+from typing import Any, Dict, List
+
+import sqlmodel as sq
 
 from ...context import ctx
+from ...dao import Artifact, Chapter, ChapterImage, Novel
 from ...exceptions import AbortedException
-from ...utils.file_tools import folder_size, format_size
+from ...utils.file_tools import file_md5, folder_size, format_size
+from ...utils.text_tools import generate_md5
 
 logger = logging.getLogger(__name__)
 
@@ -16,8 +22,37 @@ class Cleaner:
     @staticmethod
     def run(signal: Event):
         cleaner = Cleaner(signal)
+        cleaner.train_dictionaries()
+        cleaner.compact_packs()
         cleaner.free_disk_size()
 
+    def train_dictionaries(self):
+        try:
+            ctx.dictionaries.maintain(self.signal)
+        except AbortedException:
+            raise
+        except Exception:
+            logger.info('Error training compression dictionaries', exc_info=True)
+
+    def compact_packs(self):
+        novels_dir = ctx.files.resolve('novels')
+        if not novels_dir.is_dir():
+            return
+
+        reclaimed = 0
+        for folder in novels_dir.iterdir():
+            if self.signal.is_set():
+                raise AbortedException()
+            if not folder.is_dir():
+                continue
+            try:
+                reclaimed += ctx.files.compact(folder.name)
+            except Exception:
+                logger.info(f'Error compacting: {folder.name}', exc_info=True)
+
+        if reclaimed:
+            logger.info(f"Compacted chapter contents: {format_size(reclaimed)}")
+
     def free_disk_size(self):
         size_limit = ctx.config.crawler.disk_size_limit
         if size_limit <= 0:
@@ -44,6 +79,7 @@ class Cleaner:
                 for file in folder.iterdir():
                     if file.is_dir():
                         shutil.rmtree(file, ignore_errors=True)
+                self.reconcile(folder.name)
                 logger.info(f'Deleted novel: {folder.name} [{format_size(size)}]')
             except Exception:
                 current_size = folder_size(ctx.config.app.output_path)
@@ -53,3 +89,96 @@ class Cleaner:
                     break
 
         logger.info(f"Current folder size: {format_size(current_size)}")
+
+    def reconcile(self, novel_id: str, verify: bool = False) -> int:
+        """Corrects the availability, size and hash of the files of a novel in
+        the DB to match the files on the disk. The unknown sizes and hashes are
+        computed, or all of them if `verify` is set.
+
+        Returns the number of rows corrected.
+        """
+        with ctx.db.session() as sess:
+            novel = sess.get(Novel, novel_id)
+            if not novel:
+                return 0
+            changes: Dict[Any, List[Dict[str, Any]]] = {
+                Novel: [],
+                Chapter: [],
+                ChapterImage: [],
+                Artifact: [],
+            }
+
+            cover_available = ctx.files.size(novel.cover_file) is not None
+            if novel.cover_available != cover_available:
+                changes[Novel].append({'id': novel.id, 'cover_available': cover_available})
+
+            saved = ctx.files.saved_chapters(novel_id)
+            for chapter in sess.exec(
+                sq.select(Chapter)
+                .where(Chapter.novel_id == novel_id)
+            ).all():
+                if self.signal.is_set():
+                    raise AbortedException()
+                size, hash = None, None
+                if chapter.serial in saved:
+                    size, hash = chapter.content_size, chapter.content_hash
+                    if verify or size is None or hash is None:
+                        content = ctx.files.load_text(chapter.content_file)
+                        size, hash = len(content.encode()), generate_md5(content)
+                if (chapter.is_available, chapter.content_size, chapter.content_hash) != (size is not None, size, hash):
+                    changes[Chapter].append({
+                        'id': chapter.id,
+                        'is_available': size is not None,
+                        'content_size': size,
+                        'content_hash': hash,
+                    })
+
+            image_sizes: Dict[str, int] = {}
+            images_dir = ctx.files.resolve(f'novels/{novel_id}/images')
+            if images_dir.is_dir():
+                with os.scandir(images_dir) as it:
+                    for entry in it:
+                        if entry.name.endswith('.jpg') and entry.is_file():
+                            image_sizes[entry.name[:-4]] = entry.stat().st_size
+            for image in sess.exec(
+                sq.select(ChapterImage)
+                .where(ChapterImage.novel_id == novel_id)
+            ).all():
+                if self.signal.is_set():
+                    raise AbortedException()
+                size, hash = image_sizes.get(image.id), None
+                if size is not None:
+                    hash = image.image_hash
+                    if verify or hash is None or size != image.image_size:
+                        hash = file_md5(ctx.files.resolve(image.image_file))
+                if (image.is_available, image.image_size, image.image_hash) != (size is not None, size, hash):
+                    changes[ChapterImage].append({
+                        'id': image.id,
+                        'is_available': size is not None,
+                        'image_size': size,
+                        'image_hash': hash,
+                    })
+
+            for artifact in sess.exec(
+                sq.select(Artifact)
+                .where(Artifact.novel_id == novel_id)
+            ).all():
+                size = ctx.files.size(artifact.output_file)
+                if (artifact.is_available, artifact.file_size) != (size is not None, size):
+                    changes[Artifact].append({
+                        'id': artifact.id,
+                        'is_available': size is not None,
+                        'file_size': size,
+                    })
+
+            updated = 0
+            for table, values in changes.items():
+                for i in range(0, len(values), 1000):
+                    # bulk update by the primary keys
+                    sess.exec(sq.update(table), params=values[i:i + 1000])  # type:ignore
+                updated += len(values)
+            sess.commit()
+
+        if updated:
+            logger.info(f'Reconciled {updated} rows of novel: {novel_id}')
+        return updated
@@ -1,8 +1,11 @@
 import logging
+import time
 import traceback
+from collections import deque
 from functools import cached_property
+from itertools import groupby
 from threading import Event
-from typing import Any, Dict, Iterable, Optional, Set
+from typing import Any, Deque, Dict, Iterable, Optional, Set, Tuple
 
 from ...context import ctx
 from ...dao import (Artifact, Job, JobStatus, JobType, NotificationItem,
@@ -17,42 +20,92 @@ logger = logging.getLogger(__name__)
 _lock = EventLock()
 _queue: Dict[str, Event] = {}
 _users: Dict[str, str] = {}
+_claimed: Dict[bool, Deque[Job]] = {False: deque(), True: deque()}
+
+# progress of the chapters downloaded inside a job is saved in batches
+_PROGRESS_BATCH = 20
+_PROGRESS_INTERVAL = 5  # seconds
 
 
 class JobRunner:
     @staticmethod
-    def run(signal: Event, artifact: bool):
+    def run(signal: Event, artifact: bool) -> bool:
+        """Processes one pending job. Returns False if there was none."""
         try:
             with _lock.using(signal):
-                job = ctx.jobs._pending(
-                    artifact,
-                    skip_job_ids=_queue.keys(),
-                    skip_user_ids=_users.values(),
-                )
+                job = JobRunner._next(artifact)
                 if not job:
-                    job = ctx.jobs._pending(
-                        artifact,
-                        skip_user_ids=_users,
-                    )
-                    return
-                if not job:
-                    return
+                    return False
                 if job.parent_job_id:
                     if ctx.jobs.cancel_if_dangling(job):
                         logger.debug(f'Dangling job [b]{job.id}[/b] | {job.job_title}')
-                        return
+                        ctx.jobs._release(ctx.scheduler.worker_id, job.id)
+                        return True
                 _queue[job.id] = Event()
                 _users[job.id] = job.user_id
 
+            if job.is_pending and not job.depends_on:
+                ctx.scheduler.record_latency(current_timestamp() - job.created_at)
+
+            runner = JobRunner(job, _queue[job.id])
             try:
-                JobRunner(job, _queue[job.id]).process()
+                runner.process()
             finally:
                 with _lock.using(signal):
                     if job.id in _queue:
                         _queue.pop(job.id).set()
                         _users.pop(job.id)
+                ctx.jobs._release(ctx.scheduler.worker_id, job.id)
+                if runner.job.is_done:
+                    ctx.scheduler.notify(everyone=True)  # the dependent jobs can start now
+            return True
+        except AbortedException:
+            return False  # stopped
         except Exception:
             logger.error('Unexpected error in runner', exc_info=True)
+            return False
+
+    @staticmethod
+    def _next(artifact: bool) -> Optional[Job]:
+        """Returns the next job from the claimed ones, and claims more
+        jobs for the idle runners when there are none left."""
+        claimed = _claimed[artifact]
+        if not claimed:
+            if artifact:
+                limit = 1
+            else:
+                limit = ctx.scheduler.concurrency - len(_queue)
+            claimed.extend(
+                ctx.jobs._claim(
+                    ctx.scheduler.worker_id,
+                    limit=max(1, limit),
+                    lease=ctx.config.crawler.runner_lease_time,
+                    artifact=artifact,
+                    skip_user_ids=_users.values(),
+                )
+            )
+        while claimed:
+            job = claimed.popleft()
+            try:
+                job = ctx.jobs.get(job.id)  # may be changed while waiting
+            except Exception:
+                continue
+            if job.is_done or job.claimed_by != ctx.scheduler.worker_id:
+                ctx.jobs._release(ctx.scheduler.worker_id, job.id)
+                continue
+            return job
+        return None
+
+    @staticmethod
+    def finished(job_ids: Iterable[str]) -> None:
+        """Sends the mails of the root jobs completed by the progress of their children"""
+        for job_id in job_ids:
+            try:
+                job = ctx.jobs.get(job_id)
+                if not job.parent_job_id:
+                    JobRunner(job).__send_mail()
+            except Exception as e:
+                logger.debug(f'Failed to send mail for [b]{job_id}[/b] | {e}')
 
     @staticmethod
     def cancel(job_id: str):
@@ -68,6 +121,11 @@ class JobRunner:
             signal.set()
         _queue.clear()
         _users.clear()
+        job_ids = [job.id for claimed in _claimed.values() for job in claimed]
+        for claimed in _claimed.values():
+            claimed.clear()
+        if job_ids:
+            ctx.jobs._release(ctx.scheduler.worker_id, *job_ids)
 
     def __init__(self, job: Job, signal=Event()) -> None:
         self.job = job
@@ -89,9 +147,11 @@ class JobRunner:
         else:
             logger.debug(f'{message}')
 
-        if self.job.is_running:
+        if self.job.is_running and 'checkpoint' not in self.job.extra:
             self.children = ctx.jobs.get_children(self.job.id)
-            if all(job.is_done for job in self.children):
+            # the children may not be all created if a worker was stopped meanwhile
+            created = self.job.extra.get('children_created') is not False
+            if created and all(job.is_done for job in self.children):
                 return self.__set_done()
 
         if self.job.type == JobType.FULL_NOVEL_BATCH:
@@ -129,7 +189,8 @@ class JobRunner:
         with ctx.db.session() as sess:
             self.job = sess.get_one(Job, self.job.id)
 
-    def __set_running(self) -> None:
+    def __set_running(self, **extra_values: Any) -> None:
+        extra = {**self.job.extra, **extra_values}
         with ctx.db.session() as sess:
             now = current_timestamp()
             ctx.jobs._update(
@@ -137,14 +198,25 @@ class JobRunner:
                 self.job.id,
                 started_at=now,
                 status=JobStatus.RUNNING,
+                extra=extra,
             )
             sess.commit()
             self.job.started_at = now
             self.job.status = JobStatus.RUNNING
+            self.job.extra = extra
         self.__send_mail()
 
+    def __set_creating(self) -> None:
+        """Marks the job running until all of its children are created"""
+        self.__set_running(children_created=False)
+
     def __increment(self) -> bool:
         with ctx.db.session() as sess:
+            if 'children_created' in self.job.extra:
+                extra = dict(**self.job.extra)
+                extra['children_created'] = True
+                ctx.jobs._update(sess, self.job.id, extra=extra)
+                self.job.extra = extra
             ctx.jobs._increment_up(sess, self.job.id)
             sess.commit()
         self.__refresh()
@@ -188,6 +260,25 @@ class JobRunner:
             sess.commit()
             self.job.extra = extra
 
+    def __save_progress(self, checkpoint: int, done: int, failed: int) -> None:
+        extra = dict(**self.job.extra)
+        extra['checkpoint'] = checkpoint
+        with ctx.db.session() as sess:
+            ctx.jobs._update_up(
+                sess,
+                self.job.id,
+                inclusive=True,
+                done=done,
+                failed=failed,
+            )
+            ctx.jobs._update(
+                sess,
+                self.job.id,
+                extra=extra,
+            )
+            sess.commit()
+            self.job.extra = extra
+
     def __send_mail(self):
         if self.job.parent_job_id:
             parent = ctx.jobs.get_root(self.job.id)
@@ -268,7 +359,7 @@ class JobRunner:
                     for job in self.children
                 ])
             else:
-                self.__set_running()
+                self.__set_creating()
 
             full = self.job.type == JobType.FULL_NOVEL_BATCH
             for url in sorted(urls):
@@ -300,7 +391,7 @@ class JobRunner:
                     for job in self.children
                 }
             else:
-                self.__set_running()
+                self.__set_creating()
 
             novel = ctx.crawler.fetch_novel(
                 self.user.id,
@@ -357,7 +448,7 @@ class JobRunner:
                     for job in self.children
                 ])
             else:
-                self.__set_running()
+                self.__set_creating()
 
             for volume_id in volume_ids:
                 if self.signal.is_set():
@@ -381,34 +472,14 @@ class JobRunner:
             if not volume_id:
                 return self.__set_done('No volume id')
 
-            chapter_ids = set([
-                chapter.id
-                for chapter in ctx.chapters.list(volume_id=volume_id)
-            ])
-
-            if self.job.is_running:
-                chapter_ids -= set([
-                    job.extra.get('chapter_id')
-                    for job in self.children
-                ])
-            else:
-                self.__set_running()
-
-            for chapter_id in chapter_ids:
-                if self.signal.is_set():
-                    raise AbortedException()
-                ctx.jobs.fetch_chapter(
-                    self.user,
-                    chapter_id,
-                    parent_id=self.job.id,
-                    novel_title=self.job.extra.get('novel_title'),
-                )
-
-            return self.__increment()
+            chapter_ids = ctx.chapters.list_ids(volume_id=volume_id)
+            if self.children:  # created by an older version
+                return self._chapter_jobs(chapter_ids)
+            return self._run_chapters(chapter_ids)
         except AbortedException:
             return False  # ignore error
         except Exception as e:
-            return self.__set_done('Failed to create requests', e)
+            return self.__set_done('Failed to fetch volume', e)
 
     def _chapter_batch(self) -> bool:
         try:
@@ -416,30 +487,153 @@ class JobRunner:
             if not chapter_ids:
                 return self.__set_done()
 
-            chapter_ids = set(chapter_ids)
-            if self.job.is_running:
-                chapter_ids -= set([
-                    job.extra.get('chapter_id')
-                    for job in self.children
-                ])
-            else:
-                self.__set_running()
+            if self.children:  # created by an older version
+                return self._chapter_jobs(chapter_ids)
+            return self._run_chapters(chapter_ids)
+        except AbortedException:
+            return False  # ignore error
+        except Exception as e:
+            return self.__set_done('Failed to fetch chapters', e)
+
+    def _chapter_jobs(self, chapter_ids: Iterable[str]) -> bool:
+        chapter_ids = set(chapter_ids)
+        if self.job.is_running:
+            chapter_ids -= set([
+                job.extra.get('chapter_id')
+                for job in self.children
+            ])
+        else:
+            self.__set_creating()
+
+        for chapter_id in chapter_ids:
+            if self.signal.is_set():
+                raise AbortedException()
+            ctx.jobs.fetch_chapter(
+                self.user,
+                chapter_id,
+                parent_id=self.job.id,
+                novel_title=self.job.extra.get('novel_title'),
+            )
+
+        return self.__increment()
+
+    def _run_chapters(self, chapter_ids: Iterable[str]) -> bool:
+        """Downloads the chapters and their images inside this job, using the
+        executor of one crawler per novel, instead of creating a job for each
+        chapter. The progress is saved in batches, and the job resumes from the
+        last checkpoint if it was interrupted."""
+        if 'checkpoint' not in self.job.extra:
+            chapters = sorted(
+                ctx.chapters.get_many(list(set(chapter_ids))),
+                key=lambda x: (x.novel_id, x.serial),
+            )
+            if not chapters:
+                return self.__set_done()
+            extra = dict(**self.job.extra)
+            extra['chapter_ids'] = [chapter.id for chapter in chapters]
+            extra['checkpoint'] = 0
+            with ctx.db.session() as sess:
+                ctx.jobs._update_up(
+                    sess,
+                    self.job.id,
+                    inclusive=True,
+                    total=len(chapters),
+                )
+                ctx.jobs._update(sess, self.job.id, extra=extra)
+                sess.commit()
+                self.job.extra = extra
+
+        if not self.job.is_running:
+            self.__set_running()
+
+        chapter_ids = self.job.extra['chapter_ids']
+        checkpoint: int = self.job.extra['checkpoint']
+        remaining = ctx.chapters.get_many(chapter_ids[checkpoint:])
+        novel_ids = {chapter.id: chapter.novel_id for chapter in remaining}
+
+        # results of the chapters after the checkpoint: index -> success
+        results: Dict[int, bool] = {}
+        saved_at = time.monotonic()
+
+        def save(force: bool = False) -> None:
+            nonlocal checkpoint, saved_at
+            end = checkpoint
+            while end in results:
+                end += 1
+            count = end - checkpoint
+            if not count or not (
+                force
+                or count >= _PROGRESS_BATCH
+                or time.monotonic() - saved_at >= _PROGRESS_INTERVAL
+            ):
+                return
+            failed = sum(not results.pop(i) for i in range(checkpoint, end))
+            self.__save_progress(end, count, failed)
+            checkpoint = end
+            saved_at = time.monotonic()
 
-            for chapter_id in chapter_ids:
+        try:
+            pending = list(enumerate(chapter_ids))[checkpoint:]
+            for novel_id, group in groupby(pending, key=lambda x: novel_ids.get(x[1])):
+                items = list(group)
+                if not novel_id:  # the chapter was deleted
+                    results.update((index, False) for index, _ in items)
+                    continue
+                novel_url = ctx.novels.get(novel_id).url
+                with ctx.crawler.pool.checkout(self.user.id, novel_url, self.signal) as crawler:
+                    futures = [
+                        crawler.submit_task(self.__fetch_chapter, index, chapter_id, crawler)
+                        for index, chapter_id in items
+                    ]
+                    for result in crawler.resolve_as_generator(
+                        futures,
+                        disable_bar=True,
+                        signal=self.signal,
+                    ):
+                        if result:
+                            results[result[0]] = result[1]
+                            save()
                 if self.signal.is_set():
                     raise AbortedException()
-                ctx.jobs.fetch_chapter(
-                    self.user,
-                    chapter_id,
-                    parent_id=self.job.id,
-                    novel_title=self.job.extra.get('novel_title'),
-                )
+        finally:
+            save(force=True)
 
-            return self.__increment()
+        return self.__set_done()
+
+    def __fetch_chapter(self, index: int, chapter_id: str, crawler) -> Tuple[int, bool]:
+        try:
+            if self.signal.is_set():
+                raise AbortedException()
+            chapter = ctx.crawler.fetch_chapter(
+                self.user.id,
+                chapter_id,
+                self.signal,
+                crawler,
+            )
+            if not chapter.is_available:
+                return index, False
+            images = ctx.images.list(chapter_id=chapter_id)
         except AbortedException:
-            return False  # ignore error
+            raise
         except Exception as e:
-            return self.__set_done('Failed to create requests', e)
+            logger.info(f'Failed to fetch chapter [b]{chapter_id}[/b] | {e}')
+            return index, False
+
+        for image in images:
+            if self.signal.is_set():
+                raise AbortedException()
+            try:
+                ctx.crawler.fetch_image(
+                    self.user.id,
+                    image.id,
+                    self.signal,
+                    crawler,
+                )
+            except AbortedException:
+                raise
+            except Exception as e:
+                logger.debug(f'Failed to fetch image [b]{image.id}[/b] | {e}')
+        return index, True
 
     def _chapter(self) -> bool:
         try:
@@ -454,7 +648,7 @@ class JobRunner:
                     for job in self.children
                 }
             else:
-                self.__set_running()
+                self.__set_creating()
 
             chapter = ctx.crawler.fetch_chapter(
                 self.user.id,
@@ -498,7 +692,7 @@ class JobRunner:
                     for job in self.children
                 ])
             else:
-                self.__set_running()
+                self.__set_creating()
 
             for image_id in image_ids:
                 if self.signal.is_set():
@@ -559,7 +753,7 @@ class JobRunner:
                     for job in self.children
                 }
             else:
-                self.__set_running()
+                self.__set_creating()
 
             added_format = set(format_job_map.keys())
             formats = set(map(OutputFormat, formats))
@@ -1,12 +1,17 @@
 import logging
-from threading import Event, Thread
-from typing import Callable, List, Set
+import os
+import socket
+from collections import deque
+from threading import Condition, Event, Thread
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
 
 from ...context import ctx
 from ...exceptions import AbortedException
 from ...utils.event_lock import EventLock
+from ...utils.text_tools import generate_uuid
 from .cleaner import Cleaner
 from .runner import JobRunner
+from .watcher import watch_jobs
 
 logger = logging.getLogger(__name__)
 
@@ -15,16 +20,35 @@ def run_cleaner(signal: Event) -> None:
     Cleaner.run(signal)
 
 
-def run_jobs(signal: Event):
-    JobRunner.run(signal, False)
+def run_jobs(signal: Event) -> bool:
+    return JobRunner.run(signal, False)
 
 
-def run_artifact_maker(signal: Event):
-    JobRunner.run(signal, True)
+def run_artifact_maker(signal: Event) -> bool:
+    return JobRunner.run(signal, True)
+
+
+def heartbeat(signal: Event):
+    """Keeps the claimed jobs, stops the ones canceled by another process,
+    and completes the jobs left behind by the stopped processes."""
+    lease = ctx.config.crawler.runner_lease_time
+    for job_id in ctx.jobs._renew(ctx.scheduler.worker_id, lease):
+        logger.debug(f'Stopping [b]{job_id}[/b] as it is done elsewhere')
+        JobRunner.cancel(job_id)
+    count = ctx.jobs.finish_stalled(grace=lease)
+    if count:
+        logger.info(f'Completed {count} stalled jobs')
 
 
 def reset_runner(signal: Event):
     JobRunner.cancel_all()
+    logger.info(f"Crawler pool: {ctx.crawler.pool.stats}")
+    logger.info(f"Queue latency: {ctx.scheduler.queue_latency}")
+    logger.info(f"Job progress: {ctx.jobs.progress.stats}")
+    logger.info(f"Host limits: {ctx.crawler.throttles.stats}")
+    logger.info(f"Response cache: {ctx.crawler.http_cache.stats}")
+    logger.info(f"Coalesced requests: {ctx.crawler.coalescer.stats}")
+    ctx.crawler.pool.close()
     logger.info("Runner reset")
 
 
@@ -35,6 +59,11 @@ class JobScheduler:
         self._lock = EventLock()
         self._signal = Event()
         self._signal.set()
+        self._wakeup = Condition()
+        self._wakeups = 0
+        self._latencies: Deque[int] = deque(maxlen=1000)
+        self.concurrency = 0
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{generate_uuid()[:8]}'
 
     def close(self):
         self.stop()
@@ -43,43 +72,99 @@ class JobScheduler:
     def running(self) -> bool:
         return not self._signal.is_set()
 
-    def start(self):
+    @property
+    def queue_latency(self) -> Dict[str, int]:
+        """Time in milliseconds from creating a job to starting it,
+        for the recent jobs that did not depend on other jobs"""
+        values = sorted(self._latencies)
+        if not values:
+            return {'count': 0}
+        return {
+            'count': len(values),
+            'mean': sum(values) // len(values),
+            'p50': values[len(values) // 2],
+            'p95': values[(len(values) * 95) // 100],
+            'max': values[-1],
+        }
+
+    def record_latency(self, millis: int) -> None:
+        self._latencies.append(max(0, millis))
+
+    def notify(self, everyone: bool = False) -> None:
+        """Wakes up an idle runner, or every runner if `everyone` is True"""
+        with self._wakeup:
+            self._wakeups += 1
+            if everyone:
+                self._wakeup.notify_all()
+            else:
+                self._wakeup.notify()
+
+    def start(self, concurrency: Optional[int] = None):
+        """Starts the job runners. The concurrency defaults to the config,
+        and with zero, the jobs are left for the `lncrawl worker` processes."""
         if self.running:
             return
+        if concurrency is None:
+            concurrency = ctx.config.crawler.runner_concurrency
+        if concurrency <= 0:
+            logger.info("Scheduler is disabled in this process")
+            return
+        self.concurrency = concurrency
         self._signal = Event()
         self._thread(run_cleaner, ctx.config.crawler.cleaner_cooldown)
-        for _ in range(ctx.config.crawler.runner_concurrency):
-            self._thread(run_jobs, ctx.config.crawler.runner_cooldown)
-        self._thread(run_artifact_maker, ctx.config.crawler.runner_cooldown)
+        for _ in range(concurrency):
+            self._thread(run_jobs, ctx.config.crawler.runner_poll_interval, dispatch=True)
+        self._thread(run_artifact_maker, ctx.config.crawler.runner_poll_interval, dispatch=True)
         self._thread(reset_runner, ctx.config.crawler.runner_reset_interval)
-        logger.info("Scheduler started")
+        self._thread(heartbeat, max(1, ctx.config.crawler.runner_lease_time // 3))
+        self._thread(watch_jobs, ctx.config.crawler.runner_poll_interval, immediate=True)
+        logger.info(f"Scheduler started with {concurrency} runners | {self.worker_id}")
 
     def stop(self):
         if not self.running:
             return
         self._signal.set()
+        self.notify(everyone=True)
         JobRunner.cancel_all()
         for t in self._threads:
             t.join()
         self._threads.clear()
+        ctx.jobs._release(self.worker_id)
         logger.info("Scheduler stoppped")
 
     def stop_job(self, job_id: str):
         JobRunner.cancel(job_id)
 
-    def _thread(self, run: Callable[[Event], None], interval: int) -> None:
+    def finished(self, job_ids: List[str]) -> None:
+        """Called when the jobs are completed by the progress of their children"""
+        self.notify(everyone=True)  # the dependent jobs can start now
+        JobRunner.finished(job_ids)
+
+    def _thread(
+        self,
+        run: Callable[[Event], Any],
+        interval: int,
+        dispatch: bool = False,
+        immediate: bool = False,
+    ) -> None:
+        if dispatch:
+            target, args = self._dispatch, [run, interval]
+        else:
+            target, args = self._loop, [run, interval, immediate]
         t = Thread(
-            target=self._loop,
-            args=[run, interval],
+            target=target,
+            args=args,
             daemon=True,  # does not block exit
         )
         t.start()
         self._threads.append(t)
 
-    def _loop(self, run: Callable[[Event], None], interval: int) -> None:
+    def _loop(self, run: Callable[[Event], None], interval: int, immediate: bool = False) -> None:
         while self.running:
             try:
-                self._signal.wait(interval)
+                if not immediate:
+                    self._signal.wait(interval)
+                immediate = False
                 if self._signal.is_set():
                     return
                 run(self._signal)
@@ -89,3 +174,23 @@ class JobScheduler:
                 return
             except Exception:
                 logger.error('Unexpected error in scheduler', exc_info=True)
+
+    def _dispatch(self, run: Callable[[Event], bool], interval: int) -> None:
+        """Runs jobs back to back while there are any, and otherwise waits
+        for a notification, or the poll interval as a safety net."""
+        while self.running:
+            with self._wakeup:
+                wakeups = self._wakeups
+            try:
+                if run(self._signal):
+                    self.notify()  # there may be more jobs for an idle runner
+                    continue
+            except KeyboardInterrupt:
+                self._signal.set()
+            except AbortedException:
+                return
+            except Exception:
+                logger.error('Unexpected error in scheduler', exc_info=True)
+            with self._wakeup:
+                if self._wakeups == wakeups and self.running:
+                    self._wakeup.wait(interval)
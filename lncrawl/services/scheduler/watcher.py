@@ -0,0 +1,63 @@
+import logging
+import select
+from threading import Event
+
+from ...context import ctx
+from ..jobs.service import JOBS_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+# how often to check the sqlite database for changes
+_SQLITE_INTERVAL = 0.5  # seconds
+
+
+def watch_jobs(signal: Event) -> None:
+    """Wakes up an idle runner when the jobs are changed by another process,
+    e.g. created by the server, instead of waiting for the poll interval.
+    Other databases are left to the poll interval."""
+    dialect = ctx.db.engine.dialect.name
+    if dialect == 'sqlite':
+        _watch_sqlite(signal)
+    elif dialect == 'postgresql':
+        _watch_postgres(signal)
+
+
+def _watch_sqlite(signal: Event) -> None:
+    # `data_version` changes when another connection commits to the database
+    conn = ctx.db.engine.raw_connection()
+    try:
+        version = None
+        while not signal.wait(_SQLITE_INTERVAL):
+            cursor = conn.cursor()
+            cursor.execute('PRAGMA data_version')
+            current = cursor.fetchone()[0]
+            cursor.close()
+            if version is not None and current != version:
+                ctx.scheduler.notify()
+            version = current
+    finally:
+        conn.close()
+
+
+def _watch_postgres(signal: Event) -> None:
+    conn = ctx.db.engine.raw_connection()
+    try:
+        dbapi = conn.driver_connection
+        if not hasattr(dbapi, 'poll'):
+            logger.debug('Job notifications are not supported by the database driver')
+            signal.wait()
+            return
+        dbapi.autocommit = True
+        cursor = dbapi.cursor()
+        cursor.execute(f'LISTEN {JOBS_CHANNEL}')
+        cursor.close()
+        while not signal.is_set():
+            if not select.select([dbapi], [], [], 1)[0]:
+                continue
+            dbapi.poll()
+            if dbapi.notifies:
+                dbapi.notifies.clear()
+                ctx.scheduler.notify()
+    finally:
+        conn.invalidate()  # not to be reused in autocommit mode
+        conn.close()
@@ -136,6 +136,7 @@ class SecretService:
         if not host:
             raise ServerErrors.invalid_url
         self.add(user_id, host, login.model_dump_json())
+        ctx.crawler.pool.discard(user_id)
 
     def get_login(self, user_id: str, url: str) -> Optional[LoginData]:
         host = extract_host(url)
@@ -1,16 +1,18 @@
 import logging
+import time
 from pathlib import Path
-from threading import Event
-from typing import Dict, List, Optional, Type
+from threading import Event, Lock
+from typing import Dict, List, Optional, Set, Type
 
 from ...context import ctx
 from ...core.crawler import Crawler
 from ...core.taskman import TaskManager
 from ...exceptions import ServerErrors
-from ...server.models import CrawlerIndex, CrawlerInfo, SourceItem
+from ...server.models import (CrawlerIndex, CrawlerInfo, ScanCache,
+                              ScannedCrawler, SourceItem)
 from ...utils.fts_store import FTSStore
 from ...utils.text_tools import normalize
-from ...utils.url_tools import extract_base, extract_host, normalize_url
+from ...utils.url_tools import extract_base, extract_host
 from . import utils
 
 logger = logging.getLogger(__name__)
@@ -22,8 +24,14 @@ class Sources:
         self._store: FTSStore
         self._index: CrawlerIndex
         self._taskman: TaskManager
+        self._scan_cache: ScanCache
+        self._lock = Lock()
+        self._loaded_all = False                      # True once all crawlers are being scanned
+        self._imported: Set[Path] = set()             # Files scanned so far
+        self._index_hosts: Dict[str, List[CrawlerInfo]] = {}  # Map of host -> indexed crawlers
         self.rejected: Dict[str, str] = {}            # Map of host -> rejection reason
-        self.crawlers: Dict[str, Type[Crawler]] = {}  # Map of host/id -> crawler
+        self.scans: Dict[str, ScannedCrawler] = {}    # Map of host/id -> latest crawler scan
+        self.crawlers: Dict[str, Type[Crawler]] = {}  # Map of id -> imported crawler
 
     @property
     def version(self) -> int:
@@ -45,28 +53,64 @@ class Sources:
         if hasattr(self, '_index'):
             del self._index
         self.rejected.clear()
+        self.scans.clear()
         self.crawlers.clear()
+        self._imported.clear()
+        self._index_hosts.clear()
+        self._loaded_all = False
 
-    def load(self, sync_remote=True):
+    def load(self, sync_remote=True, lazy=False):
+        """Loads the source index, and imports the crawlers in background.
+
+        Unchanged files are not imported again: their crawlers are restored from the
+        scan cache, and imported only when one of them is requested.
+
+        In lazy mode, crawlers are scanned only when needed: `get_crawler` imports
+        the file of the requested host from the index, and `list` scans all.
+        """
         self._signal = Event()
         self._store = FTSStore()
         self._taskman = TaskManager(10)
+        self._scan_cache = utils.load_scan_cache()
 
         # load offline sources first
         self.load_index(utils.load_offline_source(sync_remote))
 
         # dynamically import all crawlers
-        self._taskman.submit_task(
-            self.load_crawlers,
-            *ctx.config.crawler.local_sources.glob('**/*.py'),
-            *ctx.config.crawler.user_sources.glob('**/*.py'),
-        )
+        if not lazy:
+            self.load_all()
 
         # run background task get online update
         if sync_remote:
             self._taskman.submit_task(self.update)
 
+    def load_all(self):
+        with self._lock:
+            if self._loaded_all:
+                return
+            self._loaded_all = True
+        self._taskman.submit_task(self.scan_all)
+
+    def scan_all(self) -> None:
+        start = time.perf_counter()
+        files = [
+            *ctx.config.crawler.local_sources.glob('**/*.py'),
+            *ctx.config.crawler.user_sources.glob('**/*.py'),
+        ]
+        self.load_crawlers(*files)
+
+        # forget the scans of removed files
+        paths = set(str(file.absolute()) for file in files)
+        with self._lock:
+            removed = [path for path in self._scan_cache.files if path not in paths]
+            for path in removed:
+                del self._scan_cache.files[path]
+            if removed:
+                utils.save_scan_cache(self._scan_cache)
+        logger.debug(f'Scanned {len(files)} source files in {time.perf_counter() - start:.3f}s')
+
     def ensure_load(self):
+        self.load_all()
         self._taskman.as_completed(
             disable_bar=True,
             signal=self._signal,
@@ -81,59 +125,105 @@ class Sources:
             host = extract_host(url)
             self.rejected[host] = reason
 
+        # map hosts to the indexed crawlers
+        hosts: Dict[str, List[CrawlerInfo]] = {}
+        for info in index.crawlers.values():
+            for url in info.base_urls:
+                hosts.setdefault(extract_host(url), []).append(info)
+        self._index_hosts = hosts
+
     def load_crawlers(self, *files: Path) -> List[CrawlerInfo]:
+        with self._lock:
+            files = tuple(f for f in files if f.absolute() not in self._imported)
+            self._imported.update(f.absolute() for f in files)
+
+        # restore the unchanged files from the scan cache
+        scans: List[ScannedCrawler] = []
+        pending: List[Path] = []
+        for file in files:
+            cached = utils.get_cached_scan(self._scan_cache, file)
+            if cached:
+                scans.extend(cached.crawlers)
+            else:
+                pending.append(file)
+
+        # import the new or modified files
         futures = [
             self._taskman.submit_task(
                 utils.import_crawlers,
                 file
             )
-            for file in files
-        ]
-        return [
-            self.add_crawler(crawler)
-            for crawlers in self._taskman.resolve_as_generator(
-                futures,
-                disable_bar=True,
-                signal=self._signal,
-            )
-            if crawlers
-            for crawler in crawlers
-            if issubclass(crawler, Crawler)
+            for file in pending
         ]
+        imported: List[Type[Crawler]] = []
+        file_scans: Dict[str, List[ScannedCrawler]] = {}
+        for crawlers in self._taskman.resolve_as_generator(
+            futures,
+            disable_bar=True,
+            signal=self._signal,
+        ):
+            for crawler in crawlers or []:
+                if not issubclass(crawler, Crawler):
+                    continue
+                scan = utils.scan_crawler(crawler)
+                scans.append(scan)
+                imported.append(crawler)
+                file_scans.setdefault(scan.file, []).append(scan)
+
+        infos = [self.add_scan(scan, index_keys=False) for scan in scans]
+        for crawler in imported:
+            self._set_crawler(crawler)
+        self._store.insert_pairs(
+            (key, scan.id)
+            for scan in scans
+            for key in scan.keys
+        )
+
+        # remember the scans of the files having crawlers
+        if file_scans:
+            with self._lock:
+                for path, found in file_scans.items():
+                    self._scan_cache.files[path] = utils.scan_file(Path(path), found)
+                utils.save_scan_cache(self._scan_cache)
+        return infos
 
     def add_crawler(self, crawler: Type[Crawler]) -> CrawlerInfo:
-        sid = getattr(crawler, '__id__')        # crawler id
-        file = getattr(crawler, '__file__')     # file path
-        urls = getattr(crawler, 'base_url')     # always a list
-        version = getattr(crawler, 'version')   # last edit time
+        info = self.add_scan(utils.scan_crawler(crawler))
+        self._set_crawler(crawler)
+        return info
 
+    def add_scan(self, scan: ScannedCrawler, index_keys=True) -> CrawlerInfo:
         # add to index if not available
-        if sid in self._index.crawlers:
-            info = self._index.crawlers[sid]
+        if scan.id in self._index.crawlers:
+            info = self._index.crawlers[scan.id]
         else:
-            logger.info(f'Found non-indexed crawler: {crawler.__name__}')
-            info = utils.create_crawler_info(crawler)
-            self._index.crawlers[sid] = info
+            logger.info(f'Found non-indexed crawler: {scan.name}')
+            info = utils.create_crawler_info(scan)
+            self._index.crawlers[scan.id] = info
 
-        # update crawlers list with the latest crawler
+        # update scans with the latest crawler
         def _set(key: str):
-            if key in self.crawlers:
-                if version < getattr(self.crawlers[key], 'version'):
+            if key in self.scans:
+                if scan.version < self.scans[key].version:
                     return  # skip if current crawler is the latest
-            self.crawlers[key] = crawler
+            self.scans[key] = scan
 
-        _set(sid)
-        for url in urls:
+        _set(scan.id)
+        for url in scan.base_urls:
             _set(extract_host(url))
 
         # add keys for searching
-        self._store.insert(sid, sid)
-        self._store.insert(normalize(file), sid)
-        self._store.insert(normalize(crawler.__name__), sid)
-        for url in urls:
-            self._store.insert(normalize_url(url), sid)
+        if index_keys:
+            self._store.insert_keys(scan.keys, scan.id)
         return info
 
+    def _set_crawler(self, crawler: Type[Crawler]) -> None:
+        # keep the crawler only if it is from the latest scanned file
+        sid = getattr(crawler, '__id__')
+        scan = self.scans.get(sid)
+        if scan and scan.file == getattr(crawler, '__file__'):
+            self.crawlers[sid] = crawler
+
     def update(self) -> None:
         assert self._index
         logger.info('Sync online sources')
@@ -167,7 +257,7 @@ class Sources:
             unit='source',
             signal=self._signal,
         ):
-            if dst_file:
+            if dst_file and self._loaded_all:
                 self.load_crawlers(dst_file)
         logger.info('Source synced.')
 
@@ -194,8 +284,7 @@ class Sources:
 
         result: List[SourceItem] = []
         for info in infos:
-            crawler = self.crawlers.get(info.id)
-            if not crawler:
+            if info.id not in self.scans:
                 continue
 
             if can_search is not None and info.can_search != can_search:
@@ -236,7 +325,6 @@ class Sources:
                     contributors=info.contributors,
                     # Excluded fields
                     info=info,
-                    crawler=crawler,
                 )
                 result.append(item)
         return result
@@ -244,8 +332,8 @@ class Sources:
     def get_info(self, query: str) -> Optional[CrawlerInfo]:
         if query in self._index.crawlers:
             return self._index.crawlers[query]
-        elif query in self.crawlers:
-            id = getattr(self.crawlers[query], '__id__')
+        elif query in self.scans:
+            id = self.scans[query].id
             return self._index.crawlers[id]
         else:
             ids = self._store.search(normalize(query))
@@ -253,8 +341,32 @@ class Sources:
                 return None
             return self._index.crawlers[ids[0]]
 
+    def import_host(self, host: str) -> bool:
+        """Imports the crawler files of the host from the index. Returns False if
+        the host is not in the index."""
+        infos = self._index_hosts.get(host)
+        if not infos:
+            return False
+        start = time.perf_counter()
+        roots = [
+            ctx.config.crawler.user_sources.parent,
+            ctx.config.crawler.local_sources.parent,
+        ]
+        with self._lock:
+            for info in infos:
+                for root in roots:
+                    file = (root / info.file_path).absolute()
+                    if file in self._imported or not file.is_file():
+                        continue
+                    self._imported.add(file)
+                    for crawler in utils.import_crawlers(file):
+                        self.add_crawler(crawler)
+        logger.debug(f'Imported crawler for {host} in {time.perf_counter() - start:.3f}s')
+        return True
+
     def get_crawler(self, url: str) -> Type[Crawler]:
-        self.ensure_load()
+        if self._loaded_all:
+            self.ensure_load()
         if not self._index:
             raise ServerErrors.source_not_loaded
 
@@ -263,13 +375,33 @@ class Sources:
             raise ServerErrors.invalid_url
         if host in self.rejected:
             raise ServerErrors.host_rejected.with_extra(self.rejected[host])
-        if host not in self.crawlers:
+        if host not in self.scans:
+            if not self.import_host(host) or host not in self.scans:
+                self.ensure_load()  # may be a crawler missing in the index
+        if host not in self.scans:
             raise ServerErrors.no_crawler.with_extra(host)
 
-        constructor = self.crawlers[host]
+        constructor = self.load_crawler(self.scans[host].id)
         setattr(constructor, 'url', url)
         return constructor
 
+    def load_crawler(self, id: str) -> Type[Crawler]:
+        """Returns the crawler class by id. Imports the crawler file if the crawler
+        was restored from the scan cache."""
+        scan = self.scans.get(id)
+        if not scan:
+            raise ServerErrors.no_crawler.with_extra(id)
+        crawler = self.crawlers.get(id)
+        if crawler and getattr(crawler, '__file__') == scan.file:
+            return crawler
+        with self._lock:
+            for crawler in utils.import_crawlers(Path(scan.file)):
+                self._set_crawler(crawler)
+        crawler = self.crawlers.get(id)
+        if not crawler or getattr(crawler, '__file__') != scan.file:
+            raise ServerErrors.no_crawler.with_extra(scan.file)
+        return crawler
+
     def init_crawler(
         self,
         constructor: Type[Crawler],
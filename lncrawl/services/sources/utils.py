@@ -5,13 +5,18 @@ import io
 import json
 import logging
 import shutil
+import sys
+from functools import lru_cache
 from pathlib import Path
-from typing import Generator, Type
+from typing import Generator, List, Optional, Type
 
 from ...context import ctx
 from ...core.crawler import Crawler
-from ...server.models import CrawlerIndex, CrawlerInfo
-from ...utils.url_tools import validate_url
+from ...server.models import (CrawlerIndex, CrawlerInfo, ScanCache,
+                              ScannedCrawler, ScannedFile)
+from ...utils.file_tools import file_md5
+from ...utils.text_tools import normalize
+from ...utils.url_tools import normalize_url, validate_url
 
 logger = logging.getLogger(__name__)
 
@@ -64,6 +69,75 @@ def load_offline_source(check_user=True) -> CrawlerIndex:
     return user_index
 
 
+def load_scan_cache() -> ScanCache:
+    app_version = ctx.config.app.version
+    file = ctx.config.crawler.scan_cache_file
+    try:
+        if file.is_file():
+            cache = ScanCache.model_validate_json(file.read_text(encoding='utf-8'))
+            if cache.app == app_version:
+                return cache
+    except Exception as e:
+        logger.info(f"Discarding crawler scan cache: {repr(e)}")
+    return ScanCache(app=app_version)
+
+
+def save_scan_cache(cache: ScanCache) -> None:
+    file = ctx.config.crawler.scan_cache_file
+    file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = file.with_suffix('.tmp')
+    tmp_file.write_text(cache.model_dump_json(), encoding='utf-8')
+    tmp_file.replace(file)
+
+
+def get_cached_scan(cache: ScanCache, file: Path) -> Optional[ScannedFile]:
+    '''Returns the cached scan of the file if it is unchanged since the scan'''
+    scan = cache.files.get(str(file.absolute()))
+    if not scan:
+        return None
+    try:
+        stat = file.stat()
+    except OSError:
+        return None
+    if scan.mtime != stat.st_mtime_ns or scan.size != stat.st_size:
+        return None
+    return scan
+
+
+def scan_file(file: Path, crawlers: List[ScannedCrawler]) -> ScannedFile:
+    stat = file.stat()
+    return ScannedFile(
+        mtime=stat.st_mtime_ns,
+        size=stat.st_size,
+        crawlers=crawlers,
+    )
+
+
+def scan_crawler(crawler: Type[Crawler]) -> ScannedCrawler:
+    '''Extracts the metadata of an imported crawler'''
+    sid = getattr(crawler, '__id__')
+    file = getattr(crawler, '__file__')
+    urls = getattr(crawler, 'base_url')
+    return ScannedCrawler(
+        id=sid,
+        name=crawler.__name__,
+        module=crawler.__module__,
+        file=file,
+        version=int(getattr(crawler, 'version')),
+        base_urls=urls,
+        has_mtl=bool(getattr(crawler, 'has_mtl')),
+        has_manga=bool(getattr(crawler, 'has_manga')),
+        can_login=bool(getattr(crawler, 'can_login')),
+        can_search=bool(getattr(crawler, 'can_search')),
+        keys=[
+            sid,
+            normalize(file),
+            normalize(crawler.__name__),
+            *[normalize_url(url) for url in urls],
+        ],
+    )
+
+
 def can_do(crawler: Type[Crawler], prop_name: str):
     '''Checks if crawler has implemented the given property name'''
     if not hasattr(crawler, prop_name):
@@ -87,6 +161,25 @@ def batch_import_crawlers(*files: Path):
     )
 
 
+@lru_cache(maxsize=None)
+def _source_md5(file: str) -> str:
+    return file_md5(file)
+
+
+def parser_fingerprint(crawler: Type[Crawler], file: Path) -> str:
+    """Hash of the source files that parse the pages of the crawler:
+    its own file, and the files of the templates and the Crawler it extends."""
+    md5 = hashlib.md5(file_md5(file).encode())
+    for cls in crawler.__mro__[1:]:
+        if not issubclass(cls, Crawler):
+            continue
+        module = sys.modules.get(cls.__module__)
+        source = getattr(module, '__file__', None)
+        if source and Path(source).absolute() != file:
+            md5.update(_source_md5(source).encode())
+    return md5.hexdigest()
+
+
 def import_crawlers(file: Path) -> Generator[Type[Crawler], None, None]:
     # validate the file
     if not file.is_file():
@@ -151,25 +244,26 @@ def import_crawlers(file: Path) -> Generator[Type[Crawler], None, None]:
         setattr(crawler, "__file__", str(file))
         setattr(crawler, '__module_obj__', module)
         setattr(crawler, "version", int(max(stat.st_mtime, stat.st_ctime)))
+        setattr(crawler, "fingerprint", parser_fingerprint(crawler, file))
 
         yield crawler
 
 
-def create_crawler_info(crawler: Type[Crawler]):
+def create_crawler_info(scan: ScannedCrawler):
     root = ctx.config.crawler.local_sources.parent
-    file = Path(getattr(crawler, '__file__'))
+    file = Path(scan.file)
     file_path = file.relative_to(root).as_posix()
     language = file_path.split("/")[1]
     return CrawlerInfo(
         language=language,
         file_path=file_path,
-        id=getattr(crawler, '__id__'),
-        md5=getattr(crawler, '__module__'),
-        version=int(getattr(crawler, 'version')),
-        base_urls=getattr(crawler, 'base_url'),
-        has_mtl=getattr(crawler, 'has_mtl'),
-        has_manga=getattr(crawler, 'has_manga'),
-        can_login=getattr(crawler, 'can_login'),
-        can_search=getattr(crawler, 'can_search'),
+        id=scan.id,
+        md5=scan.module,
+        version=scan.version,
+        base_urls=scan.base_urls,
+        has_mtl=scan.has_mtl,
+        has_manga=scan.has_manga,
+        can_login=scan.can_login,
+        can_search=scan.can_search,
         url=f"file:///{Path(file).resolve().as_posix()}",
     )
@@ -1,14 +1,14 @@
-from typing import List
+from typing import Dict, List
 
 from sqlalchemy import delete as sa_delete
-from sqlalchemy import insert as sa_insert
-from sqlalchemy import update as sa_update
-from sqlmodel import case, col, func, select
+from sqlmodel import col, func, select
 
 from ..context import ctx
 from ..dao import User, UserRole, Volume
 from ..exceptions import ServerErrors
 from ..models.volume import Volume as ModelVolume
+from ..utils.text_tools import generate_uuid
+from ..utils.time_utils import current_timestamp
 
 
 class VolumeService:
@@ -64,63 +64,48 @@ class VolumeService:
                 raise ServerErrors.no_such_volume
             return volume
 
-    def sync(self, novel_id: str, volumes: List[ModelVolume]):
+    def sync(self, novel_id: str, volumes: List[ModelVolume]) -> Dict[str, int]:
+        """Updates the volumes of the novel to the crawled ones.
+        Returns the number of rows inserted, updated and deleted."""
         with ctx.db.session() as sess:
             wanted = {
-                v.id: v for v in volumes
+                v.id: (v.title, v.chapter_count)
+                for v in volumes
             }
-            existing = {
-                v.serial: v
-                for v in sess.exec(
-                    select(Volume)
-                    .where(Volume.novel_id == novel_id)
-                ).all()
-            }
-
-            wk = set(wanted.keys())
-            ek = set(existing.keys())
-            to_insert = wk - ek
-            to_delete = ek - wk
-            to_update = ek & wk
-
-            if to_insert:
-                sess.exec(
-                    sa_insert(Volume),
-                    params=[
-                        Volume(
-                            serial=s,
-                            novel_id=novel_id,
-                            title=wanted[s].title,
-                            extra=dict(wanted[s].extra),
-                            chapter_count=wanted[s].chapter_count,
-                        ).model_dump()
-                        for s in to_insert
-                    ]
-                )
-
-            if to_update:
-                title_updates = {}
-                count_updates = {}
-                for s in to_update:
-                    r = existing[s]
-                    title = wanted[s].title
-                    count = wanted[s].chapter_count
-                    if r.title != title:
-                        title_updates[r.id] = title
-                    if r.chapter_count != count:
-                        count_updates[r.id] = count
-                if title_updates:
-                    sess.exec(
-                        sa_update(Volume)
-                        .where(col(Volume.id).in_(title_updates.keys()))
-                        .values(title=case(title_updates, value=Volume.id))
-                    )
-                if count_updates:
-                    sess.exec(
-                        sa_update(Volume)
-                        .where(col(Volume.id).in_(count_updates.keys()))
-                        .values(chapter_count=case(count_updates, value=Volume.id))
-                    )
+            changed = set()
+            to_delete = []
+            for serial, title, chapter_count in sess.exec(
+                select(Volume.serial, Volume.title, Volume.chapter_count)
+                .where(Volume.novel_id == novel_id)
+            ):
+                item = wanted.pop(serial, None)
+                if item is None:
+                    to_delete.append(serial)
+                elif item != (title, chapter_count):
+                    changed.add(serial)
+            to_insert = set(wanted.keys())
+
+            now = current_timestamp()
+            ctx.db.upsert(
+                sess,
+                Volume,
+                (
+                    {
+                        'id': generate_uuid(),
+                        'created_at': now,
+                        'updated_at': now,
+                        'extra': dict(v.extra),
+                        'novel_id': novel_id,
+                        'serial': v.id,
+                        'title': v.title,
+                        'chapter_count': v.chapter_count,
+                    }
+                    for v in volumes
+                    if v.id in to_insert or v.id in changed
+                ),
+                keys=['novel_id', 'serial'],
+                update=['updated_at', 'title', 'chapter_count'],
+            )
 
             if to_delete:
                 sess.exec(
@@ -130,3 +115,9 @@ class VolumeService:
                 )
 
             sess.commit()
+
+        return {
+            'inserted': len(to_insert),
+            'updated': len(changed),
+            'deleted': len(to_delete),
+        }
@@ -1,6 +1,5 @@
 import time
-from concurrent.futures import Future
-from typing import List, Optional
+from typing import Optional
 from urllib.parse import parse_qs, urlencode, urlparse
 
 from bs4 import BeautifulSoup, Tag
@@ -74,23 +73,24 @@ class NovelMTLTemplate(SearchableBrowserTemplate, ChapterOnlyBrowserTemplate):
             max_page = int(last_page_qs["page"][0])
             wjm = last_page_qs["wjm"][0]
 
-            futures: List[Future] = []
-            for i in range(max_page + 1):
+            def _page_url(i: int) -> str:
                 payload = {
                     "page": i,
                     "wjm": wjm,
                     "_": self.cur_time,
                     "X-Requested-With": "XMLHttpRequest",
                 }
-                url = f"{self.home_url}e/extend/fy.php?{urlencode(payload)}"
-                f = self.executor.submit(self.get_soup, url)
-                futures.append(f)
-
-            self.resolve_futures(futures, desc="TOC", unit="page")
-            for i, future in enumerate(futures):
-                if not future.done():
-                    raise LNException(f"Failed to get page {i + 1}")
-                soup = future.result()
+                return f"{self.home_url}e/extend/fy.php?{urlencode(payload)}"
+
+            for soup in self.map_bounded(
+                self.get_soup,
+                map(_page_url, range(max_page + 1)),
+                ordered=True,
+                fail_fast=True,
+                total=max_page + 1,
+                desc="TOC",
+                unit="page",
+            ):
                 yield from soup.select("ul.chapter-list li a")
         else:
             yield from soup.select("ul.chapter-list li a")
@@ -119,15 +119,16 @@ class NovelPubTemplate(SearchableBrowserTemplate, ChapterOnlyBrowserTemplate):
                 if v > page_count:
                     page_count = v
 
-        futures = [self.executor.submit(lambda x: x, soup)]
-        futures += [
-            self.executor.submit(self.get_soup, f"{chapter_page}/page-{p}")
-            for p in range(2, page_count + 1)
-        ]
-        self.resolve_futures(futures, desc="TOC", unit="page")
-
-        for f in futures:
-            soup = f.result()
+        yield from soup.select("ul.chapter-list li a")
+        for soup in self.map_bounded(
+            self.get_soup,
+            (f"{chapter_page}/page-{p}" for p in range(2, page_count + 1)),
+            ordered=True,
+            fail_fast=True,
+            total=page_count - 1,
+            desc="TOC",
+            unit="page",
+        ):
             yield from soup.select("ul.chapter-list li a")
 
     def select_chapter_tags_in_browser(self):
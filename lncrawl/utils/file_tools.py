@@ -1,10 +1,11 @@
+import hashlib
 import logging
 import os
 import re
 import shlex
 import subprocess
 from pathlib import Path
-from typing import Union
+from typing import Optional, Union
 
 from .platforms import Platform
 
@@ -67,6 +68,39 @@ def folder_size(folder: Union[str, Path]) -> int:
         return 0
 
 
+def file_md5(file: Union[str, Path]) -> str:
+    """Return the MD5 hash of the file contents in hex."""
+    md5 = hashlib.md5()
+    with open(file, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """
+    Return the image format of a file from its first few bytes, e.g. "JPEG" or "PNG",
+    in the names used by PIL. Returns None if it does not look like an image.
+    """
+    if head.startswith(b"\xff\xd8\xff"):
+        return "JPEG"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "PNG"
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return "GIF"
+    if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+        return "WEBP"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"avif", b"avis", b"heic", b"heix", b"mif1"):
+        return "AVIF"
+    if head.startswith(b"BM"):
+        return "BMP"
+    if head.startswith((b"II*\x00", b"MM\x00*")):
+        return "TIFF"
+    if head.startswith(b"\x00\x00\x01\x00"):
+        return "ICO"
+    return None
+
+
 def safe_filename(name: str) -> str:
     name = __re_invalid_name.sub(' ', name)
     name = name.strip(" .")[:255]
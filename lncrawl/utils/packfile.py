@@ -0,0 +1,327 @@
+"""
+An append-only file of many small records, with an index of their offsets.
+
+The folder of a pack contains:
+- `{name}.idx`: A header, followed by an entry of (key, offset, length, crc32)
+  for every write. The last entry of a key wins, and an entry of length 0
+  removes the key.
+- `{name}-{generation}.pack`: The records, one after another.
+- `{name}.lock`: Serializes the writers of all processes.
+
+The records are written before their index entries, so the readers never see an
+entry of a record that is not written yet. The readers keep the pack mapped in
+memory, and read the new index entries as the index grows.
+
+A compaction writes the live records into a new generation of the pack, and then
+replaces the index, which names the generation in its header.
+"""
+import logging
+import mmap
+import os
+import secrets
+import struct
+import threading
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None  # type:ignore
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b'LNPACK01'
+_HEADER = struct.Struct('<8sQ')  # magic, generation
+_ENTRY = struct.Struct('<IQII')  # key, offset, length, crc32
+
+# offset, length, crc32
+Entry = Tuple[int, int, int]
+
+
+def _lock_file(f) -> None:
+    if fcntl:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        return
+    # locks the first byte, which works on the empty file too
+    f.seek(0)
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            pass  # gave up after 10 seconds, try again
+
+
+def _unlock_file(f) -> None:
+    if fcntl:
+        fcntl.flock(f, fcntl.LOCK_UN)
+        return
+    f.seek(0)
+    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class PackFile:
+    def __init__(self, folder: Path, name: str = 'content') -> None:
+        self.folder = folder
+        self.name = name
+        self.index_file = folder / f'{name}.idx'
+        self.lock_file = folder / f'{name}.lock'
+        self._lock = threading.RLock()
+        self._entries: Dict[int, Entry] = {}
+        self._generation = 0
+        self._index_id: Optional[Tuple[int, int]] = None  # inode of the loaded index
+        self._index_size = 0
+        self._map: Optional[mmap.mmap] = None
+
+    def pack_file(self, generation: int) -> Path:
+        return self.folder / f'{self.name}-{generation:016x}.pack'
+
+    def close(self) -> None:
+        with self._lock:
+            self._reset()
+
+    # ------------------------------------------------------------------------- #
+    # Reading
+    # ------------------------------------------------------------------------- #
+
+    def _reset(self) -> None:
+        if self._map:
+            self._map.close()
+        self._map = None
+        self._entries = {}
+        self._generation = 0
+        self._index_id = None
+        self._index_size = 0
+
+    def _read_entries(self, data: bytes) -> int:
+        """Reads the whole entries of the index, returns the end of the last one"""
+        end = len(data) // _ENTRY.size * _ENTRY.size
+        for key, offset, length, crc in _ENTRY.iter_unpack(data[:end]):
+            if length:
+                self._entries[key] = (offset, length, crc)
+            else:
+                self._entries.pop(key, None)
+        return end
+
+    def _refresh(self) -> bool:
+        """Loads the changes of the index. Returns False if there is no index."""
+        try:
+            stat = self.index_file.stat()
+        except FileNotFoundError:
+            self._reset()
+            return False
+        index_id = (stat.st_ino, stat.st_dev)
+        same = index_id == self._index_id
+        if same and self._index_size <= stat.st_size < self._index_size + _ENTRY.size:
+            return True  # no new entries
+
+        with open(self.index_file, 'rb') as f:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                self._reset()
+                return False
+            magic, generation = _HEADER.unpack(header)
+            if magic != _MAGIC:
+                raise ValueError(f'Not a pack index: {self.index_file}')
+            if same and generation == self._generation:
+                f.seek(self._index_size)
+            else:
+                self._reset()
+                self._generation = generation
+                self._index_id = index_id
+                self._index_size = _HEADER.size
+            data = f.read()
+        self._index_size += self._read_entries(data)
+        return True
+
+    def _read(self, entry: Entry) -> Optional[bytes]:
+        offset, length, crc = entry
+        if not self._map or offset + length > len(self._map):
+            if self._map:
+                self._map.close()
+                self._map = None
+            with open(self.pack_file(self._generation), 'rb') as f:
+                if os.fstat(f.fileno()).st_size >= offset + length:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if not self._map:
+                return None
+        data = self._map[offset:offset + length]
+        if zlib.crc32(data) != crc:
+            return None
+        return data
+
+    def get(self, key: int) -> Optional[bytes]:
+        with self._lock:
+            if not self._refresh():
+                return None
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            try:
+                data = self._read(entry)
+            except FileNotFoundError:
+                # compacted by another process meanwhile
+                self._reset()
+                entry = self._entries.get(key) if self._refresh() else None
+                if not entry:
+                    return None
+                data = self._read(entry)
+        if data is None:
+            logger.warning(f'Corrupted record {key} in {self.folder}')
+        return data
+
+    def exists(self, key: int) -> bool:
+        with self._lock:
+            return self._refresh() and key in self._entries
+
+    def keys(self) -> List[int]:
+        with self._lock:
+            self._refresh()
+            return sorted(self._entries.keys())
+
+    def size(self, key: int) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(key) if self._refresh() else None
+            return entry[1] if entry else None
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            if not self._refresh():
+                return {'records': 0, 'size': 0, 'live': 0}
+            try:
+                size = self.pack_file(self._generation).stat().st_size
+            except FileNotFoundError:
+                size = 0
+            return {
+                'records': len(self._entries),
+                'size': size,
+                'live': sum(length for _, length, _ in self._entries.values()),
+            }
+
+    # ------------------------------------------------------------------------- #
+    # Writing
+    # ------------------------------------------------------------------------- #
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            self.folder.mkdir(parents=True, exist_ok=True)
+            with open(self.lock_file, 'a+b') as lock:
+                _lock_file(lock)
+                try:
+                    if not self._refresh():
+                        self._create()
+                    elif self.index_file.stat().st_size != self._index_size:
+                        # drop the partial entry of an interrupted write
+                        os.truncate(self.index_file, self._index_size)
+                    yield
+                finally:
+                    _unlock_file(lock)
+
+    def _create(self) -> None:
+        generation = secrets.randbits(64)
+        self.pack_file(generation).touch()
+        self._replace_index(generation, b'')
+
+    def _replace_index(self, generation: int, entries: bytes) -> None:
+        tmp_file = self.index_file.with_name(f'{self.index_file.name}.tmp{os.getpid()}')
+        try:
+            tmp_file.write_bytes(_HEADER.pack(_MAGIC, generation) + entries)
+            os.replace(tmp_file, self.index_file)
+        finally:
+            tmp_file.unlink(missing_ok=True)
+        self._reset()
+        self._refresh()
+
+    def _append_index(self, entries: bytes) -> None:
+        if not entries:
+            return
+        with open(self.index_file, 'ab') as f:
+            f.write(entries)
+        self._index_size += self._read_entries(entries)
+
+    def _append(self, items: Iterable[Tuple[int, bytes]]) -> None:
+        # must be called with the lock
+        entries = bytearray()
+        with open(self.pack_file(self._generation), 'ab') as f:
+            offset = f.seek(0, os.SEEK_END)
+            for key, data in items:
+                if not data:
+                    raise ValueError('Empty record')
+                f.write(data)
+                entries += _ENTRY.pack(key, offset, len(data), zlib.crc32(data))
+                offset += len(data)
+        self._append_index(bytes(entries))
+
+    def put_many(self, items: Iterable[Tuple[int, bytes]]) -> None:
+        """Appends the records, replacing the old ones of the same keys"""
+        with self._locked():
+            self._append(items)
+
+    def put(self, key: int, data: bytes) -> None:
+        self.put_many([(key, data)])
+
+    def rewrite_many(self, keys: Iterable[int], rewrite: Callable[[bytes], Optional[bytes]]) -> int:
+        """Replaces the records of the keys by `rewrite(data)`, unless it returns None.
+        The records are read and written under the lock of the writers, so that a
+        record written meanwhile by another writer is never reverted.
+        Returns the number of records replaced."""
+        with self._locked():
+            items = []
+            for key in keys:
+                entry = self._entries.get(key)
+                data = self._read(entry) if entry else None
+                if not data:
+                    continue
+                new_data = rewrite(data)
+                if new_data:
+                    items.append((key, new_data))
+            self._append(items)
+            return len(items)
+
+    def delete(self, key: int) -> None:
+        with self._locked():
+            if key in self._entries:
+                self._append_index(_ENTRY.pack(key, 0, 0, 0))
+
+    def compact(self, min_waste: float = 0.5) -> int:
+        """Rewrites the pack without the replaced and removed records, if they take up
+        more than `min_waste` of its size. Returns the number of bytes reclaimed."""
+        with self._locked():
+            size = self.pack_file(self._generation).stat().st_size
+            live = sum(length for _, length, _ in self._entries.values())
+            if size - live <= size * min_waste:
+                return 0
+
+            generation = secrets.randbits(64)
+            new_file = self.pack_file(generation)
+            entries = bytearray()
+            try:
+                with open(new_file, 'wb') as f:
+                    offset = 0
+                    for key, entry in sorted(self._entries.items(), key=lambda x: x[1][0]):
+                        data = self._read(entry)
+                        if data is None:
+                            logger.warning(f'Dropping corrupted record {key} in {self.folder}')
+                            continue
+                        f.write(data)
+                        entries += _ENTRY.pack(key, offset, len(data), entry[2])
+                        offset += len(data)
+                self._replace_index(generation, bytes(entries))
+            except BaseException:
+                new_file.unlink(missing_ok=True)
+                raise
+
+            # the other readers may still have it open on windows
+            for file in self.folder.glob(f'{self.name}-*.pack'):
+                if file != new_file:
+                    try:
+                        file.unlink()
+                    except OSError:
+                        pass
+            return size - offset
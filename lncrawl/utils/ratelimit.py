@@ -1,46 +1,165 @@
 import logging
 import time
+from contextlib import contextmanager
+from threading import Condition, Event, Lock
+from typing import Dict, Generator, Optional
+
+from ..exceptions import AbortedException
 
 logger = logging.getLogger(__name__)
 
+# how often the waiting threads check the abort signal
+_SIGNAL_INTERVAL = 1.0  # seconds
+
 
 class RateLimiter(object):
-    """A helper class for a controlling number of requests per seconds.
-    It is being used along with the TaskManager class.
+    """A token bucket for controlling the number of requests per second,
+    and optionally the number of requests running at the same time.
+
+    The threads waiting for a slot sleep on a condition variable and are woken
+    up by the release. The tokens are reserved in the order of arrival, so the
+    waiters are served first come first served without polling.
 
     Args:
-    - ratelimit (float, optional): Number of requests per seconds.
+    - ratelimit (float, optional): Number of requests per seconds. Default: no limit.
+    - concurrency (int, optional): Number of requests at a time. Default: no limit.
+    - burst (int, optional): Number of requests allowed at once after being idle. Default: 1.
     """
 
-    def __init__(self, ratelimit: float):
-        if ratelimit <= 0:
-            raise ValueError("ratelimit should be a non-zero positive number")
-        self.period = 1 / ratelimit
+    def __init__(
+        self,
+        ratelimit: float = 0,
+        concurrency: int = 0,
+        burst: int = 1,
+    ):
+        if ratelimit < 0:
+            raise ValueError("ratelimit should be a positive number")
+        self._cond = Condition(Lock())
+        self._next = 0.0  # the earliest time for the next token
+        self._active = 0
+        self._waiting = 0
         self._closed = False
+        self.period = 1 / ratelimit if ratelimit else 0.0
+        self.concurrency = max(0, concurrency)
+        self.burst = max(1, burst)
+        self.requests = 0
+        self.waited = 0.0
+
+    @property
+    def ratelimit(self) -> float:
+        return 1 / self.period if self.period else 0
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            return {
+                'ratelimit': round(self.ratelimit, 4),
+                'concurrency': self.concurrency,
+                'active': self._active,
+                'waiting': self._waiting,
+                'requests': self.requests,
+                'waited': round(self.waited, 3),
+            }
+
+    def configure(
+        self,
+        ratelimit: Optional[float] = None,
+        concurrency: Optional[int] = None,
+    ) -> None:
+        """Changes the limits, waking up the waiters if any"""
+        with self._cond:
+            if ratelimit is not None:
+                self.period = 1 / ratelimit if ratelimit > 0 else 0.0
+            if concurrency is not None:
+                self.concurrency = max(0, concurrency)
+            self._cond.notify_all()
+
+    def acquire(self, signal: Optional[Event] = None) -> bool:
+        """Waits for a free slot and the next token.
+        Returns False if the signal is set or the limiter is closed meanwhile."""
+        started = time.monotonic()
+        with self._cond:
+            self._waiting += 1
+            while self.concurrency and self._active >= self.concurrency:
+                if self._closed or (signal and signal.is_set()):
+                    self._waiting -= 1
+                    return False
+                self._cond.wait(_SIGNAL_INTERVAL)
+            self._active += 1
+            now = time.monotonic()
+            at = max(now - (self.burst - 1) * self.period, self._next)
+            self._next = at + self.period
+
+        delay = at - now
+        if delay > 0 and not self._closed:
+            if signal:
+                signal.wait(delay)
+            else:
+                time.sleep(delay)
+        with self._cond:
+            self._waiting -= 1
+            self.requests += 1
+            self.waited += time.monotonic() - started
+        if self._closed or (signal and signal.is_set()):
+            self.release()
+            return False
+        return True
 
-    def _now(self):
-        if hasattr(time, "monotonic"):
-            return time.monotonic()
-        return time.time()
+    def pause(self, seconds: float) -> None:
+        """Gives no tokens for the given time, e.g. after a `Retry-After`"""
+        with self._cond:
+            self._next = max(self._next, time.monotonic() + seconds)
 
-    def __enter__(self):
-        self._time = self._now()
-        return self
+    def release(self) -> None:
+        with self._cond:
+            if self._active > 0:
+                self._active -= 1
+            self._cond.notify()
 
-    def __exit__(self, type, value, traceback):
-        if self._closed:
-            return
-        d = (self._time + self.period) - self._now()
-        self._time = self._now()
-        if d > 0:
-            time.sleep(d)
+    @contextmanager
+    def limit(self, signal: Optional[Event] = None) -> Generator[bool, None, None]:
+        """Holds a slot inside the block. Yields False if it was aborted."""
+        acquired = self.acquire(signal)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self.release()
 
     def shutdown(self):
-        self._closed = True
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
 
-    def wrap(self, fn):
+    def wrap(self, fn, signal: Optional[Event] = None):
         def inner(*args, **kwargs):
-            with self:
+            with self.limit(signal) as acquired:
+                if not acquired:
+                    raise AbortedException()
                 return fn(*args, **kwargs)
 
         return inner
+
+
+# --------------------------------------------------------------------------- #
+# Shared limiters for the hosts
+# --------------------------------------------------------------------------- #
+
+_host_lock = Lock()
+_host_limiters: Dict[str, RateLimiter] = {}
+
+
+def host_limiter(host: Optional[str]) -> RateLimiter:
+    """Returns the limiter shared by all requests to the host in this process"""
+    host = (host or '').lower()
+    with _host_lock:
+        limiter = _host_limiters.get(host)
+        if not limiter:
+            limiter = _host_limiters[host] = RateLimiter()
+        return limiter
+
+
+def host_limiter_stats() -> Dict[str, Dict[str, float]]:
+    with _host_lock:
+        limiters = dict(_host_limiters)
+    return {host: limiter.stats for host, limiter in limiters.items()}
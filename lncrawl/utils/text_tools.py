@@ -3,6 +3,7 @@ import unicodedata
 import uuid
 
 import zstd
+import zstandard
 
 
 def normalize(text: str) -> str:
@@ -21,6 +22,13 @@ def text_decompress(compressed: bytes) -> bytes:
     return zstd.decompress(compressed)
 
 
+def dictionary_id(compressed: bytes) -> int:
+    """The id of the dictionary used to compress the data, or 0 if none"""
+    if not is_compressed(compressed):
+        return 0
+    return zstandard.get_frame_parameters(compressed).dict_id
+
+
 def generate_md5(*texts) -> str:
     md5 = hashlib.md5()
     for text in texts: